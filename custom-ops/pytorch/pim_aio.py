@@ -0,0 +1,190 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import asyncio
+import queue
+import threading
+import torch
+import pim_api
+from .pim_gemm import PimGemmFunction
+from .pim_eltwise import PimEltwiseFunction
+from .pim_relu import PimReluFunction
+from .pim_weight_streaming import HAS_COPY_MEMORY
+
+_ADD = torch.tensor([0], dtype=torch.int32)
+_MUL = torch.tensor([1], dtype=torch.int32)
+
+
+def _resolve(future, result, error):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def _post(loop, future, result, error):
+    """Resolves future on its loop, futures of loops closed meanwhile are dropped"""
+    try:
+        loop.call_soon_threadsafe(_resolve, future, result, error)
+    except RuntimeError:
+        pass
+
+
+def _copy_type(dst, src):
+    kinds = ('DEVICE' if src.device.type != 'cpu' else 'HOST', 'DEVICE' if dst.device.type != 'cpu' else 'HOST')
+    return getattr(pim_api, '{}_TO_{}'.format(*kinds))
+
+
+def _copy(dst, src):
+    if HAS_COPY_MEMORY and dst.is_contiguous() and src.is_contiguous() and dst.dtype == src.dtype \
+            and dst.size() == src.size():
+        pim_api.copy_memory(dst.data_ptr(), src.data_ptr(), dst.numel() * dst.element_size(), _copy_type(dst, src))
+    else:
+        dst.copy_(src)
+    return dst
+
+
+class PimAioExecutor:
+    """Runs PIM ops off the event loop and resolves asyncio futures once they completed.
+
+    A submit thread issues ops in submission order, without blocking where the
+    op takes a block flag. A completion thread waits for every group of issued
+    ops with a single PimSynchronize and resolves their futures on the loops
+    they were awaited from, so one loop can keep many requests in flight.
+    """
+
+    def __init__(self):
+        self._submitted = queue.SimpleQueue()
+        self._issued = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.num_ops = 0
+        self.num_syncs = 0
+        self._submitter = threading.Thread(target=self._submit_loop, name='PimAioSubmit', daemon=True)
+        self._completer = threading.Thread(target=self._complete_loop, name='PimAioComplete', daemon=True)
+        self._submitter.start()
+        self._completer.start()
+
+    def run(self, fn, *args, **kwargs):
+        """asyncio future of fn(*args, **kwargs), must be called from a running loop"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('PimAioExecutor is closed')
+            self._submitted.put((fn, args, kwargs, loop, future))
+        return future
+
+    def stats(self):
+        """Ops run and synchronizations needed for them"""
+        return {'num_ops': self.num_ops, 'num_syncs': self.num_syncs}
+
+    def close(self):
+        """Finish the ops already submitted and stop both threads"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._submitted.put(None)
+        self._submitter.join()
+        self._completer.join()
+
+    def _submit_loop(self):
+        while True:
+            item = self._submitted.get()
+            if item is None:
+                self._issued.put(None)
+                return
+            fn, args, kwargs, loop, future = item
+            try:
+                with torch.no_grad():
+                    result = fn(*args, **kwargs)
+            except Exception as e:
+                _post(loop, future, None, e)
+                continue
+            self._issued.put((loop, future, result))
+
+    def _complete_loop(self):
+        stop = False
+        while not stop:
+            group = [self._issued.get()]
+            while True:
+                try:
+                    group.append(self._issued.get_nowait())
+                except queue.Empty:
+                    break
+            if None in group:
+                stop = True
+                group = [item for item in group if item is not None]
+            if not group:
+                continue
+
+            error = None
+            try:
+                pim_api.PimSynchronize(None)
+            except Exception as e:
+                error = e
+            self.num_ops += len(group)
+            self.num_syncs += 1
+            for loop, future, result in group:
+                _post(loop, future, result, error)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_executor():
+    """Executor shared by the module level functions, created on first use"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = PimAioExecutor()
+        return _default
+
+
+async def execute_gemm(inputs, weights, bias=None, act=pim_api.NONE, gemm_order=pim_api.I_X_W):
+    """act(inputs x weights + bias) of (batch, channel, h, w) tensors"""
+    return await get_executor().run(PimGemmFunction.apply, inputs, weights, bias, act, gemm_order, False)
+
+
+async def add(input1, input2):
+    return await get_executor().run(PimEltwiseFunction.apply, input1, input2, _ADD)
+
+
+async def mul(input1, input2):
+    return await get_executor().run(PimEltwiseFunction.apply, input1, input2, _MUL)
+
+
+async def relu(input):
+    return await get_executor().run(PimReluFunction.apply, input)
+
+
+async def copy(dst, src):
+    """Copies src into dst between host and device memory, returns dst"""
+    return await get_executor().run(_copy, dst, src)
+
+
+async def call(module, *args, **kwargs):
+    """module(*args, **kwargs), e.g. of a PimDense or PimFusedFFN layer"""
+    return await get_executor().run(module, *args, **kwargs)
+
+
+class AioModule:
+    """Awaitable front end of a module: output = await AioModule(dense)(inputs)"""
+
+    def __init__(self, module, executor=None):
+        self.module = module
+        self.executor = executor
+
+    async def __call__(self, *args, **kwargs):
+        executor = self.executor or get_executor()
+        return await executor.run(self.module, *args, **kwargs)
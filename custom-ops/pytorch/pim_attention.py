@@ -0,0 +1,117 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import math
+import torch
+import torch.nn as nn
+from torch.autograd import Function
+import pim_api
+from .pim_utils import pim_gemm, alloc_output, host_op
+from .pim_metrics import timed, attention_shape, attention_bucket
+
+
+class PimKVCache:
+    """Key and value cache of (batch, heads, capacity, head_dim) tensors, heads are the gemm channels.
+
+    append() writes new rows in place after the first length rows. When the
+    capacity is exceeded it is doubled, which reallocates and copies the
+    cache once per doubling. Rows beyond length are zero and are masked out
+    by PimAttentionDecodeFunction.
+    """
+
+    def __init__(self, batch, num_heads, head_dim, capacity=256, device=None, dtype=torch.float16):
+        self.length = 0
+        self.keys = torch.zeros((batch, num_heads, capacity, head_dim), device=device, dtype=dtype)
+        self.values = torch.zeros_like(self.keys)
+
+    @property
+    def capacity(self):
+        return self.keys.size(2)
+
+    def _grow(self, needed):
+        capacity = max(2 * self.capacity, needed)
+        for name in ['keys', 'values']:
+            old = getattr(self, name)
+            new = old.new_zeros(old.size()[:2] + (capacity, old.size(3)))
+            new[:, :, :self.length] = old[:, :, :self.length]
+            setattr(self, name, new)
+
+    def append(self, key, value):
+        """Add (batch, heads, rows, head_dim) key and value rows"""
+        end = self.length + key.size(2)
+        if end > self.capacity:
+            self._grow(end)
+        self.keys[:, :, self.length:end] = key
+        self.values[:, :, self.length:end] = value
+        self.length = end
+
+    def reset(self):
+        self.length = 0
+
+
+class PimAttentionDecodeFunction(Function):
+    @staticmethod
+    @timed('attention', attention_shape, attention_bucket)
+    def forward(ctx, query, keys, values, length, scale=None, block=True):
+        """softmax(query x keys^T * scale) x values over the first length cache rows.
+
+        query is (batch, heads, rows, head_dim), its rows are the last rows of
+        the cache and attend causally. Both gemms run over the full cache
+        capacity with heads as channels, keys through the transposed weight
+        flag; positions beyond length are masked in the host softmax.
+        """
+        batch, heads, num_rows, head_dim = query.size()
+        capacity = keys.size(2)
+        if scale is None:
+            scale = 1.0 / math.sqrt(head_dim)
+
+        host_op('Attention softmax')
+        pim_query = (query * scale).to(keys.dtype).contiguous()
+        scores = alloc_output((batch, heads, num_rows, capacity), query.device)
+        pim_gemm(scores, pim_query, keys.transpose(2, 3), None, pim_api.NONE, pim_api.I_X_W, True)
+
+        # row i is cache position length - num_rows + i and sees the positions up to it
+        positions = torch.arange(capacity, device=query.device)
+        limits = torch.arange(length - num_rows + 1, length + 1, device=query.device)
+        masked = positions[None, :] >= limits[:, None]
+        probs = torch.softmax(scores.float().masked_fill(masked, float('-inf')), dim=-1).to(values.dtype)
+
+        out_tensor = alloc_output((batch, heads, num_rows, head_dim), query.device)
+        pim_gemm(out_tensor, probs, values, None, pim_api.NONE, pim_api.I_X_W, block)
+        return out_tensor
+
+    @staticmethod
+    def backward(ctx, grad_out):
+        raise NotImplementedError
+
+
+class PimAttentionDecode(nn.Module):
+    """Attention of new query rows over a PimKVCache, the QK^T and PV gemvs run on PIM.
+
+    forward(query, key, value) takes (batch, heads, rows, head_dim) tensors,
+    appends key and value to the cache and returns the attention output of the
+    query rows. Call reset() before a new sequence.
+    """
+
+    def __init__(self, batch: int, num_heads: int, head_dim: int, capacity: int = 256,
+                 device=None, dtype=torch.float16, scale: float = None) -> None:
+        super(PimAttentionDecode, self).__init__()
+        self.scale = scale
+        self.cache = PimKVCache(batch, num_heads, head_dim, capacity, device, dtype)
+
+    def __repr__(self):
+        return "PIM attention decode layer"
+
+    def reset(self):
+        self.cache.reset()
+
+    def forward(self, query, key, value):
+        self.cache.append(key, value)
+        return PimAttentionDecodeFunction.apply(query, self.cache.keys, self.cache.values, self.cache.length,
+                                                self.scale)
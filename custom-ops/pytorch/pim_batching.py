@@ -0,0 +1,169 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import collections
+import threading
+import time
+from concurrent.futures import Future
+import torch
+from .pim_fused_ffn import PimFusedFFNFunction
+
+
+class _Request:
+    __slots__ = ('inputs', 'future', 'arrival')
+
+    def __init__(self, inputs, future, arrival):
+        self.inputs = inputs
+        self.future = future
+        self.arrival = arrival
+
+
+class PimBatcher:
+    """Thread-safe front end which batches concurrent calls of a row-wise op into one PIM execute.
+
+    fn must compute every row along dim independently, e.g. a PimDense layer.
+    The first queued call waits at most max_delay seconds for more calls,
+    calls are concatenated along dim up to max_batch rows, run through fn in a
+    worker thread and the output rows are handed back to each caller.
+    Calls whose other dims, dtype or device differ are put into separate batches.
+    """
+
+    def __init__(self, fn, max_batch=16, max_delay=0.001, dim=0):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.dim = dim
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._num_batches = 0
+        self._num_requests = 0
+        self._num_rows = 0
+        self._batch_sizes = collections.Counter()
+        self._batch_rows = collections.Counter()
+        self._total_delay = 0.0
+        self._max_delay = 0.0
+        self._worker = threading.Thread(target=self._run, name='PimBatcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, inputs):
+        """Queue a call, the returned future resolves to fn's output rows of inputs"""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('PimBatcher is closed')
+            self._queue.append(_Request(inputs, future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def __call__(self, inputs):
+        return self.submit(inputs).result()
+
+    def stats(self):
+        """Number of batches and calls, calls and rows per batch and time calls spent queued, in seconds"""
+        with self._cond:
+            return {
+                'num_batches': self._num_batches,
+                'num_requests': self._num_requests,
+                'mean_batch_size': self._num_requests / self._num_batches if self._num_batches else 0.0,
+                'batch_size_histogram': dict(sorted(self._batch_sizes.items())),
+                'mean_batch_rows': self._num_rows / self._num_batches if self._num_batches else 0.0,
+                'batch_rows_histogram': dict(sorted(self._batch_rows.items())),
+                'mean_queue_delay': self._total_delay / self._num_requests if self._num_requests else 0.0,
+                'max_queue_delay': self._max_delay,
+            }
+
+    def close(self):
+        """Run the calls still queued and stop the worker"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _key(self, inputs):
+        sizes = list(inputs.size())
+        del sizes[self.dim]
+        return sizes, inputs.dtype, inputs.device
+
+    def _rows(self, request):
+        return request.inputs.size(self.dim)
+
+    def _collect(self):
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            if not self._queue:
+                return None
+
+            deadline = self._queue[0].arrival + self.max_delay
+            while not self._closed and sum(self._rows(r) for r in self._queue) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            key = self._key(self._queue[0].inputs)
+            batch, rows, skipped = [], 0, []
+            while self._queue:
+                request = self._queue[0]
+                if self._key(request.inputs) != key:
+                    skipped.append(self._queue.popleft())
+                    continue
+                if batch and rows + self._rows(request) > self.max_batch:
+                    break
+                batch.append(self._queue.popleft())
+                rows += self._rows(request)
+            self._queue.extendleft(reversed(skipped))
+
+            start = time.perf_counter()
+            self._num_batches += 1
+            self._num_requests += len(batch)
+            self._num_rows += rows
+            self._batch_sizes[len(batch)] += 1
+            self._batch_rows[rows] += 1
+            for request in batch:
+                self._total_delay += start - request.arrival
+                self._max_delay = max(self._max_delay, start - request.arrival)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            try:
+                with torch.no_grad():
+                    if len(batch) == 1:
+                        outputs = [self.fn(batch[0].inputs)]
+                    else:
+                        stacked = torch.cat([r.inputs for r in batch], self.dim)
+                        outputs = torch.split(self.fn(stacked), [self._rows(r) for r in batch], self.dim)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            for request, output in zip(batch, outputs):
+                request.future.set_result(output)
+
+
+def dense_batcher(dense, max_batch=16, max_delay=0.001):
+    """Batches (h, in_features) inputs of a PimDense layer along h"""
+    return PimBatcher(dense, max_batch, max_delay, dim=0)
+
+
+def fused_ffn_batcher(fc1_w, fc1_bias, fc2_w, fc2_bias, max_batch=16, max_delay=0.001):
+    """Batches (batch, channel, h, in_w) inputs of PimFusedFFNFunction along h, biases must not depend on h"""
+    return PimBatcher(lambda inputs: PimFusedFFNFunction.apply(inputs, fc1_w, fc1_bias, fc2_w, fc2_bias),
+                      max_batch, max_delay, dim=2)
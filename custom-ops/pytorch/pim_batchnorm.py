@@ -0,0 +1,145 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import torch
+import torch.nn as nn
+from torch.autograd import Function
+import pim_api
+from .pim_utils import HAS_FAST_PATH, alloc_output, get_recorder
+
+
+class PimBatchNormFunction(Function):
+    @staticmethod
+    def forward(ctx, input, beta, gamma, mean, variance, epsilon):
+        """Batch norm of an (n, c, h, w) or (n, c) input, parameters are c element fp16 host tensors"""
+        if input.ndim not in [2, 4]:
+            print('Input dimension not supported in BatchNorm')
+            return
+        if get_recorder() is not None:
+            raise RuntimeError('PimBatchNorm can not be captured')
+
+        n, c = input.size()[:2]
+        h, w = input.size()[2:] if input.ndim == 4 else (1, 1)
+        input = input.contiguous()
+        out_tensor = alloc_output(input.size(), input.device)
+
+        if HAS_FAST_PATH:
+            pim_api.batchnorm_forward(out_tensor.data_ptr(), input.data_ptr(), n, c, h, w, beta.data_ptr(),
+                                      gamma.data_ptr(), mean.data_ptr(), variance.data_ptr(), epsilon)
+            return out_tensor
+
+        dev_input = pim_api.PimCreateBo(n, c, h, w, pim_api.PIM_FP16, pim_api.MEM_TYPE_DEVICE, input.data_ptr(), False)
+        dev_output = pim_api.PimCreateBo(
+            n, c, h, w, pim_api.PIM_FP16, pim_api.MEM_TYPE_DEVICE, out_tensor.data_ptr(), False)
+        pim_input = pim_api.PimCreateBo(n, c, h, w, pim_api.PIM_FP16, pim_api.MEM_TYPE_PIM, 0, False)
+        pim_output = pim_api.PimCreateBo(n, c, h, w, pim_api.PIM_FP16, pim_api.MEM_TYPE_PIM, 0, False)
+        params = [pim_api.PimCreateBo(1, c, 1, 1, pim_api.PIM_FP16, pim_api.MEM_TYPE_HOST, t.data_ptr(), False)
+                  for t in [beta, gamma, mean, variance]]
+
+        pim_api.PimCopyMemory(pim_input, dev_input, pim_api.DEVICE_TO_PIM)
+        pim_api.PimExecuteBN(pim_output, pim_input, params[0], params[1], params[2], params[3], epsilon, None, True)
+        pim_api.PimCopyMemory(dev_output, pim_output, pim_api.PIM_TO_DEVICE)
+
+        for bo in [dev_input, dev_output, pim_input, pim_output] + params:
+            pim_api.PimDestroyBo(bo)
+        return out_tensor
+
+    @staticmethod
+    def backward(ctx, grad_out):
+        raise NotImplementedError
+
+
+class PimBatchNorm(nn.Module):
+    """Inference mode batch norm on PIM.
+
+    Running statistics and affine parameters are folded once into a per-channel
+    scale and shift, kept as fp16 host tensors next to the module and handed to
+    PimExecuteBN with zero mean, unit variance and zero epsilon. Call refresh()
+    after changing the statistics or parameters. Following element-wise
+    multiplications and additions with per-channel constants can be folded into
+    the same scale and shift with fold_eltwise().
+    """
+
+    def __init__(self, num_features: int, eps: float = 1e-5, affine: bool = True, device=None, dtype=None) -> None:
+        factory_kwargs = {'device': device, 'dtype': dtype}
+        super(PimBatchNorm, self).__init__()
+        self.num_features = num_features
+        self.eps = eps
+        if affine:
+            self.weight = nn.Parameter(torch.ones(num_features, **factory_kwargs))
+            self.bias = nn.Parameter(torch.zeros(num_features, **factory_kwargs))
+        else:
+            self.register_parameter('weight', None)
+            self.register_parameter('bias', None)
+        self.register_buffer('running_mean', torch.zeros(num_features, **factory_kwargs))
+        self.register_buffer('running_var', torch.ones(num_features, **factory_kwargs))
+        self._scale = None
+        self._shift = None
+        self._folds = []
+        self._zeros = torch.zeros(num_features, dtype=torch.float16)
+        self._ones = torch.ones(num_features, dtype=torch.float16)
+
+    @classmethod
+    def from_batchnorm(cls, bn) -> 'PimBatchNorm':
+        """PimBatchNorm with the statistics and parameters of a nn.BatchNorm1d/2d"""
+        pim_bn = cls(bn.num_features, bn.eps, affine=bn.affine, device='meta')
+        pim_bn.running_mean = bn.running_mean
+        pim_bn.running_var = bn.running_var
+        if bn.affine:
+            pim_bn.weight = bn.weight
+            pim_bn.bias = bn.bias
+        return pim_bn
+
+    def __repr__(self):
+        return "PIM BatchNorm Layer"
+
+    def refresh(self):
+        """Recompute scale and shift from the running statistics, affine parameters and folded ops"""
+        with torch.no_grad():
+            scale = torch.rsqrt(self.running_var.float() + self.eps)
+            shift = -self.running_mean.float() * scale
+            if self.weight is not None:
+                scale = scale * self.weight.float()
+                shift = shift * self.weight.float() + self.bias.float()
+            scale, shift = scale.cpu(), shift.cpu()
+            for operation, operand in self._folds:
+                if operation:
+                    scale, shift = scale * operand, shift * operand
+                else:
+                    shift = shift + operand
+        self._scale = scale.to(torch.float16).contiguous()
+        self._shift = shift.to(torch.float16).contiguous()
+        return self
+
+    def scale_shift(self):
+        if self._scale is None:
+            self.refresh()
+        return self._scale, self._shift
+
+    def fold_eltwise(self, eltwise, operand):
+        """Fold a following PimEltwise add or mul with a per-channel constant into scale and shift.
+
+        operand holds num_features values, e.g. shaped (c,) or (1, c, 1, 1).
+        The eltwise layer can be dropped from the model afterwards.
+        """
+        operand = operand.detach().reshape(-1).to('cpu', torch.float32)
+        if operand.numel() != self.num_features:
+            raise ValueError('Only per-channel operands of {} values can be folded'.format(self.num_features))
+        self._folds.append((bool(eltwise.operation), operand))
+        return self.refresh()
+
+    def fold_chain(self, chain):
+        """Fold a list of (PimEltwise, per-channel operand) pairs in execution order"""
+        for eltwise, operand in chain:
+            self.fold_eltwise(eltwise, operand)
+        return self
+
+    def forward(self, input):
+        scale, shift = self.scale_shift()
+        return PimBatchNormFunction.apply(input, shift, scale, self._zeros, self._ones, 0.0)
@@ -0,0 +1,164 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import weakref
+import numpy as np
+import pim_api
+
+# DLPack device types and dtype codes
+DL_CPU = 1
+DL_CUDA = 2
+DL_ROCM = 10
+DL_INT = 0
+DL_FLOAT = 2
+
+_DLPACK_DTYPES = {pim_api.PIM_FP16: (DL_FLOAT, 16, 1), pim_api.PIM_INT8: (DL_INT, 8, 1)}
+_TYPESTRS = {pim_api.PIM_FP16: ('<f2', '=f2', 'f2'), pim_api.PIM_INT8: ('|i1', 'i1')}
+_FORMATS = {pim_api.PIM_FP16: ('e',), pim_api.PIM_INT8: ('b',)}
+_ITEMSIZE = {pim_api.PIM_FP16: 2, pim_api.PIM_INT8: 1}
+
+
+def _destroy_bo(bo):
+    pim_api.PimDestroyBo(bo)
+
+
+class OwnedPimBo:
+    """Owning wrapper of a PimBo.
+
+    The bo is destroyed when close() is called, at the end of a with block or
+    when the wrapper is garbage collected, whichever comes first. The object the
+    bo memory was borrowed from is kept alive as long as the bo exists.
+    Closing a bo invalidates tensors which were imported from it through DLPack.
+    """
+
+    def __init__(self, bo, source=None):
+        self.bo = bo
+        self.source = source
+        self._finalizer = weakref.finalize(self, _destroy_bo, bo)
+
+    @property
+    def closed(self):
+        return not self._finalizer.alive
+
+    def close(self):
+        self._finalizer()
+        self.source = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __dlpack__(self, stream=None):
+        if self.closed:
+            raise ValueError('PimBo is already destroyed')
+        return pim_api.PimBoToDLPack(self.bo, self)
+
+    def __dlpack_device__(self):
+        return self.bo.__dlpack_device__()
+
+    def __repr__(self):
+        state = 'closed' if self.closed else str(self.bo.mem_type)
+        return 'OwnedPimBo({})'.format(state)
+
+
+def _current_device():
+    dev = np.array([0], dtype=np.uint32)
+    pim_api.PimGetDevice(dev)
+    return int(dev[0])
+
+
+def _is_contiguous(shape, strides, itemsize):
+    """strides are given in bytes, None means row-major"""
+    if strides is None:
+        return True
+    expected = itemsize
+    for size, stride in zip(reversed(shape), reversed(strides)):
+        if size != 1 and stride != expected:
+            return False
+        expected *= size
+    return True
+
+
+def _nchw(shape):
+    if len(shape) > 4:
+        shape = (int(np.prod(shape[:len(shape) - 3])),) + tuple(shape[-3:])
+    return (1,) * (4 - len(shape)) + tuple(int(s) for s in shape)
+
+
+def _create(ptr, shape, mem, prec, desc, mflag, transposed, source):
+    if desc is not None:
+        bo = pim_api.PimCreateBo(desc, mem, mflag, ptr, transposed)
+        if bo.size > int(np.prod(shape)) * _ITEMSIZE[prec]:
+            _destroy_bo(bo)
+            raise ValueError('Buffer is smaller than the bo described by desc')
+    else:
+        n, c, h, w = _nchw(shape)
+        bo = pim_api.PimCreateBo(n, c, h, w, prec, mem, ptr, transposed)
+    return OwnedPimBo(bo, source)
+
+
+def from_dlpack(obj, prec=pim_api.PIM_FP16, desc=None, mflag=pim_api.ELT_OP, transposed=False):
+    """Zero copy bo over an object implementing __dlpack__.
+    CPU tensors give MEM_TYPE_HOST bo's and GPU tensors of the current PIM device give MEM_TYPE_DEVICE bo's.
+    """
+    device_type, device_id = obj.__dlpack_device__()
+    if device_type == DL_CPU:
+        mem = pim_api.MEM_TYPE_HOST
+        capsule = obj.__dlpack__()
+    elif device_type in (DL_CUDA, DL_ROCM):
+        mem = pim_api.MEM_TYPE_DEVICE
+        if device_id != _current_device():
+            raise ValueError('Tensor is on device {}, PIM device is {}'.format(device_id, _current_device()))
+        capsule = obj.__dlpack__(stream=None)
+    else:
+        raise ValueError('Unsupported DLPack device type {}'.format(device_type))
+
+    info = pim_api.PimDLPackInfo(capsule)
+    if info['dtype'] != _DLPACK_DTYPES[prec]:
+        raise TypeError('DLPack dtype {} does not match {}'.format(info['dtype'], prec))
+    itemsize = _ITEMSIZE[prec]
+    strides = None if info['strides'] is None else [s * itemsize for s in info['strides']]
+    if not _is_contiguous(info['shape'], strides, itemsize):
+        raise ValueError('Tensor must be contiguous')
+
+    # the unconsumed capsule keeps the producer's memory alive
+    return _create(info['data'], info['shape'], mem, prec, desc, mflag, transposed, (obj, capsule))
+
+
+def from_cuda_array_interface(obj, prec=pim_api.PIM_FP16, desc=None, mflag=pim_api.ELT_OP, transposed=False):
+    """Zero copy MEM_TYPE_DEVICE bo over an object implementing __cuda_array_interface__"""
+    cai = obj.__cuda_array_interface__
+    if cai['typestr'] not in _TYPESTRS[prec]:
+        raise TypeError('Array typestr {} does not match {}'.format(cai['typestr'], prec))
+    if not _is_contiguous(cai['shape'], cai.get('strides'), _ITEMSIZE[prec]):
+        raise ValueError('Array must be contiguous')
+    ptr = cai['data'][0]
+    return _create(ptr, cai['shape'], pim_api.MEM_TYPE_DEVICE, prec, desc, mflag, transposed, obj)
+
+
+def from_buffer(obj, prec=pim_api.PIM_FP16, desc=None, mflag=pim_api.ELT_OP, transposed=False):
+    """Zero copy MEM_TYPE_HOST bo over an object implementing the buffer protocol"""
+    view = memoryview(obj)
+    if view.format not in _FORMATS[prec]:
+        raise TypeError('Buffer format {} does not match {}'.format(view.format, prec))
+    if not view.c_contiguous:
+        raise ValueError('Buffer must be C contiguous')
+    ptr = np.frombuffer(view, dtype=np.uint8).__array_interface__['data'][0] if view.nbytes else 0
+    return _create(ptr, view.shape, pim_api.MEM_TYPE_HOST, prec, desc, mflag, transposed, (obj, view))
+
+
+def as_pim_bo(obj, prec=pim_api.PIM_FP16, desc=None, mflag=pim_api.ELT_OP, transposed=False):
+    """Zero copy bo over obj, picking the first interchange protocol it implements"""
+    if hasattr(obj, '__cuda_array_interface__'):
+        return from_cuda_array_interface(obj, prec, desc, mflag, transposed)
+    if hasattr(obj, '__dlpack__'):
+        return from_dlpack(obj, prec, desc, mflag, transposed)
+    return from_buffer(obj, prec, desc, mflag, transposed)
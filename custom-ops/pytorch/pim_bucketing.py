@@ -0,0 +1,117 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import bisect
+import collections
+import threading
+import torch
+from .pim_utils import host_op
+
+
+class PimBucketing:
+    """Rounds the h dimension of gemm operands up to a fixed set of buckets.
+
+    Operands are copied into per thread staging buffers which are reused across
+    calls; rows beyond the real h are zero. Gemm rows are computed
+    independently, so the rows which bias and activation turn into non zero
+    values for the padding are dropped again by unpad(). h larger than the
+    largest bucket is passed through unpadded and counted as a miss.
+    """
+
+    def __init__(self, buckets):
+        if not buckets:
+            raise ValueError('At least one bucket is required')
+        self.buckets = sorted(set(int(b) for b in buckets))
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset_stats()
+
+    def bucket(self, h):
+        """Smallest bucket holding h rows, None if h exceeds all buckets"""
+        i = bisect.bisect_left(self.buckets, h)
+        return self.buckets[i] if i < len(self.buckets) else None
+
+    def _staging(self, key, size, dtype, device):
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        if key not in buffers:
+            buffers[key] = [torch.zeros(size, dtype=dtype, device=device), 0]
+        return buffers[key]
+
+    def pad(self, tensor, dim, name='input'):
+        """(tensor zero padded along dim to its bucket, original size along dim).
+
+        name separates staging buffers of operands with the same shape, only
+        'input' operands are counted in the stats.
+        """
+        h = tensor.size(dim)
+        target = self.bucket(h)
+        if name == 'input':
+            with self._lock:
+                self._calls += 1
+                self._rows += h
+                if target is None:
+                    self._misses += 1
+                else:
+                    self._bucket_calls[target] += 1
+                    self._padded_rows += target - h
+        if target is None or target == h:
+            return tensor, h
+
+        host_op('Bucketing padding copy')
+        size = list(tensor.size())
+        size[dim] = target
+        entry = self._staging((name, tuple(size), dim, tensor.dtype, tensor.device), size, tensor.dtype, tensor.device)
+        staging, filled = entry
+        staging.narrow(dim, 0, h).copy_(tensor)
+        if filled > h:
+            staging.narrow(dim, h, filled - h).zero_()
+        entry[1] = h
+        return staging, h
+
+    def pad_bias(self, bias, dim, h, ndim, name='bias'):
+        """Pads a bias with the full ndim output shape, broadcast biases are returned as they are"""
+        if bias is None or bias.ndim != ndim or bias.size(dim) != h:
+            return bias
+        return self.pad(bias, dim, name)[0]
+
+    @staticmethod
+    def unpad(tensor, h, dim):
+        if tensor.size(dim) == h:
+            return tensor
+        tensor = tensor.narrow(dim, 0, h)
+        return tensor if tensor.is_contiguous() else tensor.contiguous()
+
+    def stats(self):
+        """Calls, share of calls served by a bucket and share of computed rows which were padding"""
+        with self._lock:
+            computed = self._rows + self._padded_rows
+            return {
+                'calls': self._calls,
+                'hit_rate': (self._calls - self._misses) / self._calls if self._calls else 0.0,
+                'misses': self._misses,
+                'padding_waste': self._padded_rows / computed if computed else 0.0,
+                'bucket_calls': dict(sorted(self._bucket_calls.items())),
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._calls = 0
+            self._misses = 0
+            self._rows = 0
+            self._padded_rows = 0
+            self._bucket_calls = collections.Counter()
+
+
+def as_bucketing(bucketing):
+    """None, a PimBucketing or a list of bucket sizes"""
+    if bucketing is None or isinstance(bucketing, PimBucketing):
+        return bucketing
+    return PimBucketing(bucketing)
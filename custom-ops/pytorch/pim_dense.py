@@ -11,51 +11,63 @@ import torch
 import torch.nn as nn
 from torch.autograd import Function
 import pim_api
+from .pim_utils import pim_gemm, matrix_layout, outer_packed, alloc_output, fold_residual, broadcast_bias, \
+    broadcast_cache, weight_tile_cache
+from .pim_prepare import prepare
+from .pim_bucketing import as_bucketing
+from .pim_gemv import PimGemvCache, gemv, HAS_GEMV
+from .pim_tiling import plan_gemm, num_calls
+from .pim_metrics import timed, gemm_shape, dense_bucket
 
 class PimDenseFunction(Function):
     @staticmethod
-    def forward(ctx, inputs, weights, bias, gemm_order=pim_api.I_X_W, block=True):
+    @timed('dense', gemm_shape, dense_bucket)
+    def forward(ctx, inputs, weights, bias, gemm_order=pim_api.I_X_W, block=True, gemv_cache=None, residual=None):
 
         if inputs.ndim  not in [2,3]:
             print('Input dimension not supported in Dense')
             return
 
-        transposed = False
         num_batch = 1
-        num_channels = 1
 
         #weight is always 2D in dense
         in_w = weights.size()[0]
         out_w = weights.size()[1]
+        pim_weights = weights[None, None]
 
         if inputs.ndim == 2:
            inout_h = inputs.size()[0]
-           out_tensor = torch.zeros(
-                (inout_h, out_w), dtype=torch.float16, device=inputs.device)
+           out_tensor = alloc_output((inout_h, out_w), inputs.device, zero=True)
+           pim_inputs = inputs[None, None]
+           pim_out = out_tensor[None, None]
 
         if inputs.ndim == 3:
            num_batch = inputs.size()[0]
            inout_h = inputs.size()[1]
-           out_tensor = torch.zeros(
-                (num_channels, inout_h, out_w), dtype=torch.float16, device=inputs.device)
-
-        #print(num_batch, num_channels, inout_h, in_w, out_w)
-        bias_data = 0
-        if bias is not None:
-            bias_data = bias.data_ptr()
-
-        pim_gemm_desc = pim_api.PimCreateGemmDesc(num_batch, num_channels, inout_h, in_w, inout_h, out_w, pim_api.PIM_FP16, gemm_order)
-        device_input = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_INPUT, inputs.data_ptr(), transposed)
-        device_weight = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_WEIGHT, weights.data_ptr(), transposed)
-        device_bias = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_BIAS, bias_data,transposed )
-        device_output = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_OUTPUT, out_tensor.data_ptr(), transposed)
-        pim_api.PimExecuteGemm(device_output, device_input, device_weight, device_bias, pim_api.NONE, gemm_order, None, block)
-
-        pim_api.PimDestroyBo(device_input)
-        pim_api.PimDestroyBo(device_weight)
-        pim_api.PimDestroyBo(device_bias)
-        pim_api.PimDestroyBo(device_output)
-        pim_api.PimDestroyGemmDesc(pim_gemm_desc)
+           out_tensor = alloc_output((num_batch, inout_h, out_w), inputs.device, zero=True)
+           if matrix_layout(inputs) == 'dense' and outer_packed(inputs):
+               # all batches share the weight, fold them into the gemm rows
+               pim_inputs = inputs.view(1, 1, num_batch * inout_h, in_w)
+               pim_out = out_tensor.view(1, 1, num_batch * inout_h, out_w)
+           else:
+               pim_inputs = inputs[:, None]
+               pim_weights = pim_weights.expand(num_batch, 1, in_w, out_w)
+               pim_out = out_tensor[:, None]
+
+        if bias is not None and bias.ndim > 1:
+            if bias.size()[:-1].numel() == 1:
+                # one row of out_w values, broadcast over all rows
+                bias = bias.reshape(-1)
+            else:
+                bias = broadcast_bias(bias, out_tensor).reshape(pim_out.size())
+        if residual is not None:
+            residual = residual.expand(out_tensor.size()).reshape(pim_out.size())
+        bias, _ = fold_residual(bias, residual, pim_api.NONE)
+
+        #print(num_batch, inout_h, in_w, out_w)
+        if gemv_cache is None or not gemv(pim_out, pim_inputs, pim_weights, bias, pim_api.NONE, gemm_order,
+                                          gemv_cache, block):
+            pim_gemm(pim_out, pim_inputs, pim_weights, bias, pim_api.NONE, gemm_order, block)
 
         return out_tensor
 
@@ -65,21 +77,48 @@ class PimDenseFunction(Function):
 
 class PimDense(nn.Module):
     """A nn.module wrapper for py_pim_dense function.
+
+    weight_layout 'in_out' stores weight as (in_features, out_features), 'out_in'
+    stores it as (out_features, in_features) like nn.Linear and runs it with the
+    PIM transposed weight flag, without a transposed copy.
+    bucketing, a PimBucketing or a list of bucket sizes, pads the h dimension
+    of inputs up to the next bucket.
+    With gemv set, single row inputs run on a copy of the weight converted
+    once on first use, see PimGemvCache. The copy stays resident next to the
+    weight, so it is off by default.
+    forward(inputs, residual) returns inputs x weight + bias + residual, the
+    residual is accumulated through the gemm bias slot.
     """
 
     def __init__(self, in_features: int, out_features: int, bias: bool = True,
-                  device=None, dtype=None) -> None:
+                  device=None, dtype=None, weight_layout: str = 'in_out', bucketing=None, gemv=False) -> None:
         factory_kwargs = {'device': device, 'dtype': dtype}
         super(PimDense, self).__init__()
+        if weight_layout not in ['in_out', 'out_in']:
+            raise ValueError('weight_layout must be in_out or out_in')
         self.in_features = in_features
         self.out_features = out_features
-        self.weight = nn.Parameter(torch.empty((in_features,out_features), **factory_kwargs))
+        self.weight_layout = weight_layout
+        self.bucketing = as_bucketing(bucketing)
+        self.gemv = PimGemvCache() if gemv else None
+        if weight_layout == 'out_in':
+            self.weight = nn.Parameter(torch.empty((out_features, in_features), **factory_kwargs))
+        else:
+            self.weight = nn.Parameter(torch.empty((in_features,out_features), **factory_kwargs))
         if bias:
             self.bias = nn.Parameter(torch.empty(out_features, **factory_kwargs))
         else:
             self.register_parameter('bias', None)
         self.reset_parameters()
 
+    @classmethod
+    def from_linear(cls, linear: nn.Linear, bucketing=None, gemv=False) -> 'PimDense':
+        """PimDense sharing weight and bias storage with an existing nn.Linear"""
+        dense = cls(linear.in_features, linear.out_features, bias=linear.bias is not None,
+                    device='meta', dtype=linear.weight.dtype, weight_layout='out_in', bucketing=bucketing, gemv=gemv)
+        dense.weight = linear.weight
+        dense.bias = linear.bias
+        return dense
 
     def reset_parameters(self) -> None:
         pass
@@ -87,5 +126,44 @@ class PimDense(nn.Module):
     def __repr__(self):
         return "PIM dense layer"
 
-    def forward(self, inputs):
-        return PimDenseFunction.apply(inputs, self.weight, self.bias, pim_api.I_X_W, True)
\ No newline at end of file
+    def pim_weight(self):
+        """weight as (in_features, out_features), a view for the out_in layout"""
+        if self.weight_layout == 'out_in':
+            return self.weight.t()
+        return self.weight
+
+    def warm(self, shape):
+        """Tile plan, converted or tiled weight and expanded bias of a forward on inputs of shape.
+
+        Only the leading dims of shape are used, they give the gemm rows.
+        Returns the tile plan.
+        """
+        h = shape[-2] if len(shape) > 1 else 1
+        if self.bucketing is not None:
+            h = self.bucketing.bucket(h) or h
+        rows = h * int(torch.Size(shape[:-2]).numel())
+        weights = self.pim_weight()[None, None]
+        plan = plan_gemm(1, 1, rows, self.in_features, self.out_features)
+        if num_calls(plan) > 1:
+            weight_tile_cache.get(weights, plan)
+        elif rows == 1 and self.gemv is not None and HAS_GEMV and matrix_layout(weights) is not None:
+            self.gemv.get(weights, matrix_layout(weights) == 'transposed', pim_api.I_X_W)
+        if self.bias is not None and rows > 1 and self.bias.numel() == self.out_features:
+            broadcast_cache.get(self.bias, torch.Size((1, 1, rows, self.out_features)))
+        return plan
+
+    def prepare(self, h_values, dummy=True):
+        """Warm up (h, in_features) inputs for every h, returns cold and warm times per shape"""
+        return prepare(self, [(h, self.in_features) for h in h_values], dtype=self.weight.dtype,
+                       device=self.weight.device, dummy=dummy)
+
+    def forward(self, inputs, residual=None):
+        if self.bucketing is None:
+            return PimDenseFunction.apply(inputs, self.pim_weight(), self.bias, pim_api.I_X_W, True, self.gemv,
+                                          residual)
+        dim = inputs.ndim - 2
+        inputs, h = self.bucketing.pad(inputs, dim)
+        bias = self.bucketing.pad_bias(self.bias, dim, h, inputs.ndim)
+        residual = self.bucketing.pad_bias(residual, dim, h, inputs.ndim, 'residual')
+        out = PimDenseFunction.apply(inputs, self.pim_weight(), bias, pim_api.I_X_W, True, self.gemv, residual)
+        return self.bucketing.unpad(out, h, dim)
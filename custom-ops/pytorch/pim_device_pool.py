@@ -0,0 +1,290 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import traceback
+import numpy as np
+import pim_api
+from .pim_shm import open_segment, unlink_segment
+
+_names = itertools.count()
+
+
+class SharedArray:
+    """numpy array in POSIX shared memory, handed to pool workers by name instead of pickled.
+
+    Arrays created by a process are unlinked by its close(), attached ones
+    only drop their mapping.
+    """
+
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(int(s) for s in shape)
+        self.dtype = np.dtype(dtype)
+        self._owner = name is None
+        if self._owner:
+            name = 'pimpool_{}_{}'.format(os.getpid(), next(_names))
+            nbytes = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+            self._shm = open_segment(name, create=True, size=nbytes)
+        else:
+            self._shm = open_segment(name)
+        self.array = np.ndarray(self.shape, self.dtype, buffer=self._shm.buf)
+
+    @classmethod
+    def attach(cls, spec):
+        name, shape, dtype = spec
+        return cls(shape, dtype, name)
+
+    @property
+    def spec(self):
+        """(name, shape, dtype) to attach to the array from another process"""
+        return self._shm.name, self.shape, self.dtype.str
+
+    def close(self, unlink=None):
+        """Drop the mapping, and remove the segment if unlink or if this process created it"""
+        if self._shm is None:
+            return
+        self.array = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # views of the array are still alive, the mapping stays until they are gone
+            pass
+        if unlink is None:
+            unlink = self._owner
+        if unlink:
+            unlink_segment(self._shm)
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _next_block(index, ranges, lock):
+    """(block, stolen) for worker index: the front of its own range, else the back half of the largest one"""
+    with lock:
+        start, end = ranges[2 * index], ranges[2 * index + 1]
+        if start < end:
+            ranges[2 * index] = start + 1
+            return start, False
+        victim = max(range(len(ranges) // 2), key=lambda w: ranges[2 * w + 1] - ranges[2 * w])
+        start, end = ranges[2 * victim], ranges[2 * victim + 1]
+        if start >= end:
+            return None, False
+        middle = start + (end - start) // 2
+        ranges[2 * victim + 1] = middle
+        ranges[2 * index], ranges[2 * index + 1] = middle + 1, end
+        return middle, True
+
+
+def _run_job(index, job, ranges, lock):
+    fn, inputs, broadcast, out, num_rows, block_rows = job
+    inputs = [SharedArray.attach(spec) for spec in inputs]
+    broadcast = [SharedArray.attach(spec) for spec in broadcast]
+    out = SharedArray.attach(out) if out is not None else None
+    produced, blocks, steals = [], 0, 0
+    try:
+        while True:
+            block, stolen = _next_block(index, ranges, lock)
+            if block is None:
+                break
+            blocks += 1
+            steals += stolen
+            rows = slice(block * block_rows, min(num_rows, (block + 1) * block_rows))
+            result = np.asarray(fn(*[a.array[rows] for a in inputs], *[b.array for b in broadcast]))
+            if out is not None:
+                out.array[rows] = result
+                continue
+            segment = SharedArray(result.shape, result.dtype)
+            segment.array[...] = result
+            produced.append((block, segment.spec))
+            # the parent unlinks the segment after assembling the result
+            segment.close(unlink=False)
+    except Exception:
+        # stop the other workers too
+        with lock:
+            for i in range(len(ranges) // 2):
+                ranges[2 * i + 1] = ranges[2 * i]
+        return produced, blocks, steals, traceback.format_exc()
+    finally:
+        for array in inputs + broadcast + ([out] if out is not None else []):
+            array.close()
+    return produced, blocks, steals, None
+
+
+def _worker(index, device, rt_type, precision, jobs, results, ranges, lock):
+    status = pim_api.PimInitialize(rt_type, precision)
+    if status == 0:
+        status = pim_api.PimSetDevice(device)
+    results.put(('ready', index, status))
+    if status != 0:
+        return
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, job = job
+        results.put(('done', index, job_id) + _run_job(index, job, ranges, lock))
+    pim_api.PimDeinitialize()
+
+
+class PimDevicePool:
+    """One worker process per PIM device for NumPy workloads.
+
+    Each worker initializes the runtime and pins itself to its device with
+    PimSetDevice. map_rows() splits arrays into row blocks, which the workers
+    take from their own contiguous range first and then steal from the
+    busiest one. Arrays travel through shared memory, only their names are
+    pickled, and results are assembled in row order.
+    """
+
+    def __init__(self, devices=1, rt_type=pim_api.RT_TYPE_HIP, precision=pim_api.PIM_FP16, timeout=60.0):
+        self.devices = list(range(devices)) if isinstance(devices, int) else list(devices)
+        context = multiprocessing.get_context('spawn')
+        self._lock = context.Lock()
+        self._ranges = context.Array('q', 2 * len(self.devices), lock=False)
+        self._results = context.Queue()
+        self._jobs = [context.Queue() for _ in self.devices]
+        self._workers = [context.Process(target=_worker, name='PimDevicePool-{}'.format(device), daemon=True,
+                                         args=(i, device, rt_type, precision, self._jobs[i], self._results,
+                                               self._ranges, self._lock))
+                         for i, device in enumerate(self.devices)]
+        self._job_ids = itertools.count()
+        self._map_lock = threading.Lock()
+        self.last_stats = None
+        for worker in self._workers:
+            worker.start()
+
+        failed = []
+        for _ in self._workers:
+            _, index, status = self._get(timeout)
+            if status != 0:
+                failed.append(self.devices[index])
+        if failed:
+            self.close()
+            raise RuntimeError('PIM runtime initialization failed on devices {}'.format(failed))
+
+    def _get(self, timeout=None):
+        """Next worker message, RuntimeError if a worker died meanwhile"""
+        while True:
+            try:
+                return self._results.get(timeout=1.0 if timeout is None else min(timeout, 1.0))
+            except queue.Empty:
+                dead = [w.name for w in self._workers if not w.is_alive()]
+                if dead:
+                    raise RuntimeError('PimDevicePool workers exited: {}'.format(', '.join(dead)))
+                if timeout is not None:
+                    timeout -= 1.0
+                    if timeout <= 0:
+                        raise TimeoutError('PimDevicePool workers did not respond')
+
+    def empty(self, shape, dtype):
+        """SharedArray to fill in place and pass to map_rows without a copy, e.g. as out"""
+        return SharedArray(shape, dtype)
+
+    def map_rows(self, fn, inputs, broadcast=(), out=None, block_rows=1024):
+        """fn applied to row blocks of inputs on all devices, results concatenated in row order.
+
+        fn(*input_blocks, *broadcast) runs in a worker with the runtime set to
+        its device and returns the rows of the result, it must be picklable,
+        e.g. a module level function. inputs are arrays with the same number
+        of rows; broadcast arrays, e.g. weights, are passed whole to every
+        call. Plain arrays are copied into shared memory once per call,
+        SharedArray's from empty() are used as they are. With out, a
+        SharedArray, results are written into it directly.
+        """
+        if out is not None and not isinstance(out, SharedArray):
+            raise ValueError('out must be a SharedArray from PimDevicePool.empty()')
+        temporary = []
+
+        def shared(array):
+            if isinstance(array, SharedArray):
+                return array
+            array = np.ascontiguousarray(array)
+            copy = SharedArray(array.shape, array.dtype)
+            copy.array[...] = array
+            temporary.append(copy)
+            return copy
+
+        with self._map_lock:
+            try:
+                inputs = [shared(a) for a in inputs]
+                broadcast = [shared(b) for b in broadcast]
+                num_rows = inputs[0].shape[0]
+                if any(a.shape[0] != num_rows for a in inputs):
+                    raise ValueError('inputs must have the same number of rows')
+                return self._map(fn, inputs, broadcast, out, num_rows, block_rows)
+            finally:
+                for array in temporary:
+                    array.close()
+
+    def _map(self, fn, inputs, broadcast, out, num_rows, block_rows):
+        num_blocks = (num_rows + block_rows - 1) // block_rows
+        workers = len(self._workers)
+        with self._lock:
+            for i in range(workers):
+                self._ranges[2 * i] = num_blocks * i // workers
+                self._ranges[2 * i + 1] = num_blocks * (i + 1) // workers
+
+        job_id = next(self._job_ids)
+        job = (fn, [a.spec for a in inputs], [b.spec for b in broadcast], out.spec if out is not None else None,
+               num_rows, block_rows)
+        for jobs in self._jobs:
+            jobs.put((job_id, job))
+
+        produced, errors = [], []
+        stats = {'blocks': [0] * workers, 'steals': [0] * workers}
+        for _ in range(workers):
+            _, index, _, segments, blocks, steals, error = self._get()
+            produced += segments
+            stats['blocks'][index] = blocks
+            stats['steals'][index] = steals
+            if error is not None:
+                errors.append('device {}:\n{}'.format(self.devices[index], error))
+        self.last_stats = stats
+
+        segments = [SharedArray.attach(spec) for _, spec in sorted(produced)]
+        try:
+            if errors:
+                raise RuntimeError('PimDevicePool job failed on ' + '\n'.join(errors))
+            if out is not None:
+                return out.array
+            if not segments:
+                return np.empty((0,))
+            first = segments[0].array
+            result = np.empty((num_rows,) + first.shape[1:], dtype=first.dtype)
+            row = 0
+            for segment in segments:
+                result[row:row + len(segment.array)] = segment.array
+                row += len(segment.array)
+            return result
+        finally:
+            for segment in segments:
+                segment.close(unlink=True)
+
+    def close(self):
+        for jobs, worker in zip(self._jobs, self._workers):
+            if worker.is_alive():
+                jobs.put(None)
+        for worker in self._workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
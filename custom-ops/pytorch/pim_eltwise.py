@@ -11,31 +11,43 @@ import torch
 import torch.nn as nn
 from torch.autograd import Function
 import pim_api
+from .pim_utils import HAS_FAST_PATH, alloc_output, get_pim_scratch, get_recorder, host_op
+from . import pim_metrics
 
 # Todo , broadcasting logic
 
 
-class PimEltwiseFunction(Function):
-    @staticmethod
-    def forward(ctx, input1, input2, operation):
+def eltwise_into(out_tensor, input1, input2, operation):
+    """out_tensor = input1 + input2 (operation 0) or input1 * input2 (operation 1) of contiguous same size tensors.
 
-        if input1.size() != input2.size():
-            if operation == 0:
-                return torch.add(input1, input2)
-            if operation == 1:
-                return torch.mul(input1, input2)
+    out_tensor may be one of the inputs, they are copied to PIM before the result is copied back.
+    """
+    length = torch.numel(input1)
+
+    op_type = pim_api.OP_ELT_ADD if operation == 0 else pim_api.OP_ELT_MUL
+    pim_metrics.add('executes', 'add' if operation == 0 else 'mul')
+    pim_metrics.add('copy_bytes', 'DEVICE_TO_PIM', 4 * length)
+    pim_metrics.add('copy_bytes', 'PIM_TO_DEVICE', 2 * length)
+    recorder = get_recorder()
+    if recorder is not None:
+        recorder.eltwise(out_tensor, input1, input2, length, op_type)
+        return out_tensor
 
-        length = torch.numel(input1)
-        out_tensor = torch.empty(
-            input1.size(), dtype=torch.float16, device=input1.device)
+    scratch = get_pim_scratch()
+    if HAS_FAST_PATH and scratch is None:
+        pim_api.eltwise_forward(out_tensor.data_ptr(), input1.data_ptr(), input2.data_ptr(), length, op_type)
+        return out_tensor
 
-        dev_input1 = pim_api.PimCreateBo(
-            1, 1, 1, length, pim_api.PIM_FP16, pim_api.MEM_TYPE_DEVICE, input1.data_ptr(), False)
-        dev_input2 = pim_api.PimCreateBo(
-            1, 1, 1, length, pim_api.PIM_FP16, pim_api.MEM_TYPE_DEVICE, input2.data_ptr(), False)
-        dev_output = pim_api.PimCreateBo(
-            1, 1, 1, length, pim_api.PIM_FP16, pim_api.MEM_TYPE_DEVICE, out_tensor.data_ptr(), False)
+    dev_input1 = pim_api.PimCreateBo(
+        1, 1, 1, length, pim_api.PIM_FP16, pim_api.MEM_TYPE_DEVICE, input1.data_ptr(), False)
+    dev_input2 = pim_api.PimCreateBo(
+        1, 1, 1, length, pim_api.PIM_FP16, pim_api.MEM_TYPE_DEVICE, input2.data_ptr(), False)
+    dev_output = pim_api.PimCreateBo(
+        1, 1, 1, length, pim_api.PIM_FP16, pim_api.MEM_TYPE_DEVICE, out_tensor.data_ptr(), False)
 
+    if scratch is not None:
+        pim_input1, pim_input2, pim_output = [scratch.get(length, i) for i in range(3)]
+    else:
         pim_input1 = pim_api.PimCreateBo(
             1, 1, 1, length, pim_api.PIM_FP16, pim_api.MEM_TYPE_PIM, 0, False)
         pim_input2 = pim_api.PimCreateBo(
@@ -43,22 +55,48 @@ class PimEltwiseFunction(Function):
         pim_output = pim_api.PimCreateBo(
             1, 1, 1, length, pim_api.PIM_FP16, pim_api.MEM_TYPE_PIM, 0, False)
 
-        pim_api.PimCopyMemory(pim_input1, dev_input1, pim_api.DEVICE_TO_PIM)
-        pim_api.PimCopyMemory(pim_input2, dev_input2, pim_api.DEVICE_TO_PIM)
+    pim_api.PimCopyMemory(pim_input1, dev_input1, pim_api.DEVICE_TO_PIM)
+    pim_api.PimCopyMemory(pim_input2, dev_input2, pim_api.DEVICE_TO_PIM)
 
-        if operation == 0:
-            pim_api.PimExecuteAdd(pim_output, pim_input1, pim_input2, None, 1)
-        else:
-            pim_api.PimExecuteMul(pim_output, pim_input1, pim_input2, None, 1)
+    if operation == 0:
+        pim_api.PimExecuteAdd(pim_output, pim_input1, pim_input2, None, 1)
+    else:
+        pim_api.PimExecuteMul(pim_output, pim_input1, pim_input2, None, 1)
 
-        pim_api.PimCopyMemory(dev_output, pim_output, pim_api.PIM_TO_DEVICE)
-        pim_api.PimDestroyBo(dev_input1)
-        pim_api.PimDestroyBo(dev_input2)
-        pim_api.PimDestroyBo(dev_output)
+    pim_api.PimCopyMemory(dev_output, pim_output, pim_api.PIM_TO_DEVICE)
+    pim_api.PimDestroyBo(dev_input1)
+    pim_api.PimDestroyBo(dev_input2)
+    pim_api.PimDestroyBo(dev_output)
+    if scratch is None:
         pim_api.PimDestroyBo(pim_input1)
         pim_api.PimDestroyBo(pim_input2)
         pim_api.PimDestroyBo(pim_output)
-        return out_tensor
+    return out_tensor
+
+
+def add_residual(out, residual):
+    """out += residual through a PIM add into out itself, residual is broadcast to the size of out"""
+    if residual.size() != out.size() or not residual.is_contiguous():
+        host_op('Copy of a residual')
+        residual = residual.expand(out.size()).contiguous()
+    return eltwise_into(out, out, residual, 0)
+
+
+class PimEltwiseFunction(Function):
+    @staticmethod
+    @pim_metrics.timed('eltwise', pim_metrics.length_shape, pim_metrics.length_bucket)
+    def forward(ctx, input1, input2, operation):
+
+        if input1.size() != input2.size():
+            host_op('Broadcasting element-wise op')
+            pim_metrics.add('fallbacks', 'eltwise')
+            if operation == 0:
+                return torch.add(input1, input2)
+            if operation == 1:
+                return torch.mul(input1, input2)
+
+        out_tensor = alloc_output(input1.size(), input1.device)
+        return eltwise_into(out_tensor, input1, input2, operation)
 
     @staticmethod
     def backward(ctx, grad_out):
@@ -11,13 +11,16 @@ import torch
 import torch.nn as nn
 from torch.autograd import Function
 import pim_api
+from .pim_utils import pim_gemm, alloc_output, fold_residual
+from .pim_bucketing import as_bucketing
+from .pim_metrics import timed, ffn_shape, ffn_bucket
 
 
 class PimFusedFFNFunction(Function):
     @staticmethod
-    def forward(ctx, inputs, fc1_w, fc1_bias, fc2_w, fc2_bias, gemm_order=pim_api.I_X_W, block=True):
+    @timed('fused_ffn', ffn_shape, ffn_bucket)
+    def forward(ctx, inputs, fc1_w, fc1_bias, fc2_w, fc2_bias, gemm_order=pim_api.I_X_W, block=True, residual=None):
 
-        transposed = False
         input_dims = inputs.ndim
         if inputs.ndim not in [4]:
             print("Input dimension not supported in Gemm")
@@ -33,40 +36,18 @@ class PimFusedFFNFunction(Function):
         inout_h = inputs.size()[2]
         in_w = inputs.size()[3]
         out_w = fc1_w.size()[3]
-        out_tensor = torch.empty(
-                (batch, channel, inout_h, out_w), dtype=torch.float16, device=inputs.device)
-
-        pim_gemm_desc = pim_api.PimCreateGemmDesc(batch, channel, inout_h, in_w, inout_h, out_w, pim_api.PIM_FP16, gemm_order)
-        device_input = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_INPUT, inputs.data_ptr(), transposed)
-        device_weight = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_WEIGHT, fc1_w.data_ptr(), transposed)
-        device_bias = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_BIAS, fc1_bias.data_ptr(), transposed)
-        device_output = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_OUTPUT, out_tensor.data_ptr(), transposed)
-        pim_api.PimExecuteGemm(device_output, device_input, device_weight, device_bias, pim_api.ACT_RELU, gemm_order, None, block)
-
-        pim_api.PimDestroyBo(device_weight)
-        pim_api.PimDestroyBo(device_input)
-        pim_api.PimDestroyBo(device_bias)
-        pim_api.PimDestroyBo(device_output)
-        pim_api.PimDestroyGemmDesc(pim_gemm_desc)
+        out_tensor = alloc_output((batch, channel, inout_h, out_w), inputs.device)
+
+        pim_gemm(out_tensor, inputs, fc1_w, fc1_bias, pim_api.ACT_RELU, gemm_order, block)
 
         #--second ffn-------------
         in_w = fc1_w.size()[3]
         out_w = fc2_w.size()[3]
-        o2 = torch.empty(
-            (batch, channel, inout_h, out_w), dtype=torch.float16, device=inputs.device)
-
-        pim_gemm_desc = pim_api.PimCreateGemmDesc(batch, channel, inout_h, in_w, inout_h, out_w, pim_api.PIM_FP16, gemm_order);
-        device_input = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_INPUT, out_tensor.data_ptr(), transposed);
-        device_weight = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_WEIGHT, fc2_w.data_ptr(), transposed);
-        device_bias = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_BIAS, fc2_bias.data_ptr(), transposed);
-        device_output = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_OUTPUT, o2.data_ptr(), transposed);
-        pim_api.PimExecuteGemm(device_output, device_input, device_weight, device_bias, pim_api.NONE, gemm_order, None, block);
-
-        pim_api.PimDestroyBo(device_weight)
-        pim_api.PimDestroyBo(device_input)
-        pim_api.PimDestroyBo(device_bias)
-        pim_api.PimDestroyBo(device_output)
-        pim_api.PimDestroyGemmDesc(pim_gemm_desc)
+        o2 = alloc_output((batch, channel, inout_h, out_w), inputs.device)
+        if residual is not None:
+            fc2_bias, _ = fold_residual(fc2_bias, residual.expand(o2.size()), pim_api.NONE)
+
+        pim_gemm(o2, out_tensor, fc2_w, fc2_bias, pim_api.NONE, gemm_order, block)
 
         return o2
 
@@ -75,18 +56,31 @@ class PimFusedFFNFunction(Function):
         raise NotImplementedError
 
 
-class PimFusedFFN(nn.Linear):
+class PimFusedFFN(nn.Module):
     """A nn.module wrapper for py_pim_dense function.
+
+    bucketing, a PimBucketing or a list of bucket sizes, pads inout_h of x up to the next bucket.
+    A residual is accumulated through the bias slot of the second gemm.
     """
 
-    def __init__(self, device=None, dtype=None) -> None:
+    def __init__(self, device=None, dtype=None, bucketing=None) -> None:
         super(PimFusedFFN, self).__init__()
+        self.bucketing = as_bucketing(bucketing)
 
     def reset_parameters(self) -> None:
-        super(PimFusedFFN, self).reset_parameters()
+        pass
 
     def __repr__(self):
         return "PIM Fused FFN layer"
 
-    def forward(self, x, batched_fc1_w, batched_fc1_bias, batched_fc2_w, batched_fc2_bias, gemm_order=pim_api.I_X_W, block=True):
-        return PimFusedFFNFunction.apply(x, batched_fc1_w, batched_fc1_bias, batched_fc2_w, batched_fc2_bias, gemm_order, block)
+    def forward(self, x, batched_fc1_w, batched_fc1_bias, batched_fc2_w, batched_fc2_bias, gemm_order=pim_api.I_X_W, block=True,
+                residual=None):
+        if self.bucketing is None:
+            return PimFusedFFNFunction.apply(x, batched_fc1_w, batched_fc1_bias, batched_fc2_w, batched_fc2_bias, gemm_order, block,
+                                             residual)
+        x, h = self.bucketing.pad(x, 2)
+        fc1_bias = self.bucketing.pad_bias(batched_fc1_bias, 2, h, 4, 'fc1_bias')
+        fc2_bias = self.bucketing.pad_bias(batched_fc2_bias, 2, h, 4, 'fc2_bias')
+        residual = self.bucketing.pad_bias(residual, 2, h, 4, 'residual')
+        out = PimFusedFFNFunction.apply(x, batched_fc1_w, fc1_bias, batched_fc2_w, fc2_bias, gemm_order, block, residual)
+        return self.bucketing.unpad(out, h, 2)
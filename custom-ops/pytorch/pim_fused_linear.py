@@ -0,0 +1,56 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+from typing import List
+import torch
+import torch.nn as nn
+from .pim_dense import PimDense
+
+
+class PimFusedLinear(PimDense):
+    """Projections sharing one input, e.g. q/k/v or gate/up, as a single wide PimDense.
+
+    The weights of all projections are concatenated along out_features in one
+    buffer, so a call runs one gemm with the summed out_w and streams the input
+    once. forward returns a tuple of split views of the output, one per
+    projection, without copies.
+    """
+
+    def __init__(self, in_features: int, out_features: List[int], bias: bool = True,
+                 device=None, dtype=None, weight_layout: str = 'in_out', bucketing=None, gemv=False) -> None:
+        self.split_sizes = [int(size) for size in out_features]
+        super(PimFusedLinear, self).__init__(in_features, sum(self.split_sizes), bias=bias, device=device,
+                                             dtype=dtype, weight_layout=weight_layout, bucketing=bucketing, gemv=gemv)
+
+    @classmethod
+    def from_linears(cls, linears: List[nn.Linear], bucketing=None, gemv=False) -> 'PimFusedLinear':
+        """PimFusedLinear holding a copy of the concatenated weights and biases of nn.Linear layers.
+
+        Layers without bias contribute zeros if any other layer has one.
+        """
+        in_features = linears[0].in_features
+        if any(linear.in_features != in_features for linear in linears):
+            raise ValueError('Fused linear layers must have the same in_features')
+        weight = linears[0].weight
+        has_bias = any(linear.bias is not None for linear in linears)
+        fused = cls(in_features, [linear.out_features for linear in linears], bias=has_bias,
+                    device=weight.device, dtype=weight.dtype, weight_layout='out_in', bucketing=bucketing, gemv=gemv)
+        with torch.no_grad():
+            torch.cat([linear.weight for linear in linears], dim=0, out=fused.weight)
+            if has_bias:
+                torch.cat([linear.bias if linear.bias is not None else
+                           torch.zeros(linear.out_features, dtype=weight.dtype, device=weight.device)
+                           for linear in linears], out=fused.bias)
+        return fused
+
+    def __repr__(self):
+        return "PIM fused linear layer {}".format(self.split_sizes)
+
+    def forward(self, inputs):
+        return torch.split(super(PimFusedLinear, self).forward(inputs), self.split_sizes, dim=-1)
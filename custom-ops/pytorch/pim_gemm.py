@@ -11,12 +11,18 @@ import torch
 import torch.nn as nn
 from torch.autograd import Function
 import pim_api
+from .pim_utils import pim_gemm, alloc_output, fold_residual
+from .pim_eltwise import add_residual
+from .pim_bucketing import as_bucketing
+from .pim_gemv import PimGemvCache, gemv
+from .pim_metrics import timed, gemm_shape, gemm_bucket
 
 class PimGemmFunction(Function):
     @staticmethod
-    def forward(ctx, inputs, weights, bias, act, gemm_order=pim_api.I_X_W, block=True):
+    @timed('gemm', gemm_shape, gemm_bucket)
+    def forward(ctx, inputs, weights, bias, act, gemm_order=pim_api.I_X_W, block=True, gemv_cache=None,
+                residual=None):
 
-        transposed = False
         if inputs.ndim not in [4]:
             print("Input dimension not supported in Gemm")
             return
@@ -31,22 +37,16 @@ class PimGemmFunction(Function):
         in_w = inputs.size()[3]
         out_w = weights.size()[3]
 
-        out_tensor = torch.empty(
-            (batch, channel, inout_h, out_w), dtype=torch.float16, device=inputs.device)
+        out_tensor = alloc_output((batch, channel, inout_h, out_w), inputs.device)
 
         #print('Custom op pimgemm descriptor (n, c, inout_h, in_w, out_w)', batch, channel, inout_h, in_w, out_w)
-        pim_gemm_desc = pim_api.PimCreateGemmDesc(batch, channel, inout_h, in_w, inout_h, out_w, pim_api.PIM_FP16, gemm_order)
-        device_input = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_INPUT, inputs.data_ptr(), transposed)
-        device_weight = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_WEIGHT, weights.data_ptr(), transposed)
-        device_bias = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_BIAS, bias.data_ptr(), transposed)
-        device_output = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_OUTPUT, out_tensor.data_ptr(), transposed)
-        pim_api.PimExecuteGemm(device_output, device_input, device_weight, device_bias, act, gemm_order, None, block)
-
-        pim_api.PimDestroyBo(device_input)
-        pim_api.PimDestroyBo(device_weight)
-        pim_api.PimDestroyBo(device_bias)
-        pim_api.PimDestroyBo(device_output)
-        pim_api.PimDestroyGemmDesc(pim_gemm_desc)
+        if residual is not None:
+            residual = residual.expand(out_tensor.size())
+        bias, residual = fold_residual(bias, residual, act)
+        if gemv_cache is None or not gemv(out_tensor, inputs, weights, bias, act, gemm_order, gemv_cache, block):
+            pim_gemm(out_tensor, inputs, weights, bias, act, gemm_order, block)
+        if residual is not None:
+            add_residual(out_tensor, residual)
 
         return out_tensor
 
@@ -55,9 +55,19 @@ class PimGemmFunction(Function):
         raise NotImplementedError
 
 class PimGemm(nn.Module):
+    """bucketing, a PimBucketing or a list of bucket sizes, pads inout_h of inputs up to the next bucket.
 
-    def __init__(self,device=None, dtype=None) -> None:
+    With gemv set, (1, 1, 1, in_w) inputs run on a converted copy of the
+    weight, kept in a PimGemvCache across calls with the same weight. The
+    copy stays resident next to the weight, so it is off by default.
+    A residual is added to the output, through the gemm bias slot unless an
+    activation is applied, and otherwise by a PIM add into the output.
+    """
+
+    def __init__(self,device=None, dtype=None, bucketing=None, gemv=False) -> None:
         super(PimGemm, self).__init__()
+        self.bucketing = as_bucketing(bucketing)
+        self.gemv = PimGemvCache() if gemv else None
 
     def reset_parameters(self) -> None:
         super(PimGemm, self).reset_parameters()
@@ -65,5 +75,11 @@ class PimGemm(nn.Module):
     def __repr__(self):
         return "PIM Gemm layer"
 
-    def forward(self, inputs, weight, bias, act, gemm_order=pim_api.I_X_W, block=True):
-        return PimPimGemmFunction.apply(inputs, weight, bias, act, gemm_order, block)
+    def forward(self, inputs, weight, bias, act, gemm_order=pim_api.I_X_W, block=True, residual=None):
+        if self.bucketing is None:
+            return PimGemmFunction.apply(inputs, weight, bias, act, gemm_order, block, self.gemv, residual)
+        inputs, h = self.bucketing.pad(inputs, 2)
+        bias = self.bucketing.pad_bias(bias, 2, h, 4)
+        residual = self.bucketing.pad_bias(residual, 2, h, 4, 'residual')
+        out = PimGemmFunction.apply(inputs, weight, bias, act, gemm_order, block, self.gemv, residual)
+        return self.bucketing.unpad(out, h, 2)
@@ -0,0 +1,111 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import collections
+import threading
+import weakref
+import torch
+import pim_api
+from .pim_tiling import plan_gemm, num_calls
+from .pim_utils import get_recorder, matrix_layout
+from . import pim_metrics
+
+# weights converted once for single row gemms, absent in older pim_api builds
+HAS_GEMV = hasattr(pim_api, 'PimGemvWeight')
+
+_Entry = collections.namedtuple('_Entry', ['source', 'version', 'prepared'])
+
+
+class PimGemvCache:
+    """Weights of a layer converted for the single row gemm path.
+
+    Entries are keyed by weight address, shape, layout and gemm order, and are
+    re-converted when the weight tensor is replaced or modified in place.
+    They only hold a weak reference to the weight and are dropped with it,
+    so e.g. streamed weights do not stay alive through their converted copy.
+    Changes through .data are not tracked, call clear() after them.
+    """
+
+    def __init__(self, maxsize=4):
+        self.maxsize = maxsize
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries = collections.OrderedDict()
+            self.conversions = 0
+            self.calls = 0
+
+    def __getstate__(self):
+        return {'maxsize': self.maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(state['maxsize'])
+
+    def _drop(self, key, ref):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.source is ref:
+                del self._entries[key]
+
+    def get(self, weights, transposed, gemm_order):
+        """PimGemvWeight of a (1, 1, in_w, out_w) weight view"""
+        source = weights._base if weights._base is not None else weights
+        in_w, out_w = weights.size()[-2:]
+        key = (weights.data_ptr(), in_w, out_w, transposed, gemm_order)
+        with self._lock:
+            self.calls += 1
+            entry = self._entries.get(key)
+            if entry is not None and entry.source() is source and entry.version == source._version:
+                self._entries.move_to_end(key)
+                return entry.prepared
+            prepared = pim_api.PimGemvWeight(weights.data_ptr(), in_w, out_w, transposed, gemm_order)
+            self.conversions += 1
+            ref = weakref.ref(source, lambda ref, key=key: self._drop(key, ref))
+            self._entries[key] = _Entry(ref, source._version, prepared)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return prepared
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'conversions': self.conversions, 'entries': len(self._entries)}
+
+
+def gemv_eligible(out, inputs, weights, bias):
+    """True if a (batch, channel, h, w) gemm is a single fp16 row within single call limits"""
+    if not HAS_GEMV or get_recorder() is not None:
+        return False
+    if inputs.ndim != 4 or weights.ndim != 4 or inputs.size()[:3] != (1, 1, 1) or weights.size()[:2] != (1, 1):
+        return False
+    if inputs.dtype != torch.float16 or weights.dtype != torch.float16:
+        return False
+    in_w, out_w = weights.size()[-2:]
+    if num_calls(plan_gemm(1, 1, 1, in_w, out_w)) != 1:
+        return False
+    if inputs.stride()[-1] != 1 or out.stride()[-1] != 1 or matrix_layout(weights) is None:
+        return False
+    return bias is None or (bias.numel() == out_w and bias.is_contiguous())
+
+
+def gemv(out, inputs, weights, bias, act, gemm_order, cache, block=True):
+    """out = act(inputs x weights + bias) for a single row with prepared weights.
+
+    Returns False without running anything if the gemm does not qualify, the
+    caller then takes the regular gemm path.
+    """
+    if not gemv_eligible(out, inputs, weights, bias):
+        return False
+    prepared = cache.get(weights, matrix_layout(weights) == 'transposed', gemm_order)
+    bias_data = 0 if bias is None else bias.data_ptr()
+    pim_metrics.add('executes', 'gemv')
+    prepared.forward(out.data_ptr(), inputs.data_ptr(), bias_data, act, 0, block)
+    return True
@@ -0,0 +1,126 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import torch
+import pim_api
+from .pim_utils import set_output_allocator, set_recorder
+
+# native command lists, absent in older pim_api builds
+HAS_COMMAND_LIST = hasattr(pim_api, 'PimCommandList')
+
+
+def _storage(tensor):
+    if hasattr(tensor, 'untyped_storage'):
+        return tensor.untyped_storage()
+    return tensor.storage()
+
+
+class _Recorder:
+    """Forwards the custom ops to a native command list and keeps every tensor it references alive"""
+
+    def __init__(self, commands):
+        self.commands = commands
+        self.tensors = []
+        # storages of the graph inputs and op outputs, whose data changes on every replay
+        self.dynamic = set()
+
+    def _keep(self, *tensors):
+        self.tensors.extend(t for t in tensors if t is not None)
+
+    def add_dynamic(self, tensor):
+        self.dynamic.add(_storage(tensor).data_ptr())
+
+    def is_dynamic(self, tensor):
+        """True if tensor lies in a graph input or op output, a host computation on it would not be replayed"""
+        return _storage(tensor).data_ptr() in self.dynamic
+
+    def dense(self, out, inputs, weights, bias, batch, channel, inout_h, in_w, out_w, act, gemm_order, transposed,
+              block):
+        self._keep(out, inputs, weights, bias)
+        bias_data = 0 if bias is None else bias.data_ptr()
+        self.commands.dense(out.data_ptr(), inputs.data_ptr(), weights.data_ptr(), bias_data, batch, channel,
+                            inout_h, in_w, out_w, act, gemm_order, transposed, 0, block)
+
+    def eltwise(self, out, input1, input2, length, op):
+        self._keep(out, input1, input2)
+        self.commands.eltwise(out.data_ptr(), input1.data_ptr(), input2.data_ptr(), length, op)
+
+    def relu(self, out, input, length):
+        self._keep(out, input)
+        self.commands.relu(out.data_ptr(), input.data_ptr(), length)
+
+
+class PimGraph:
+    """Recorded sequence of PIM custom ops, re-issued from C++ by replay().
+
+    capture() runs fn once and records every PIM op it issues. Device buffers
+    of the example inputs become patchable slots, so replay() can be called on
+    other tensors of the same shape, dtype and strides. Outputs and temporaries
+    are static: replay() writes into the tensors capture() returned.
+    fn may only consist of PIM custom ops, host computations on op data raise
+    RuntimeError during capture, other torch ops are not recorded.
+    """
+
+    def __init__(self):
+        if not HAS_COMMAND_LIST:
+            raise RuntimeError('pim_api was built without PimCommandList')
+        self.commands = pim_api.PimCommandList()
+        self.recorder = _Recorder(self.commands)
+        self.signature = None
+        self.outputs = None
+        self._previous_allocator = None
+
+    def __len__(self):
+        return len(self.commands)
+
+    def _allocate(self, size, dtype, device, zero):
+        if self._previous_allocator is not None:
+            tensor = self._previous_allocator(size, dtype, device, zero)
+        elif zero:
+            tensor = torch.zeros(size, dtype=dtype, device=device)
+        else:
+            tensor = torch.empty(size, dtype=dtype, device=device)
+        self.recorder.tensors.append(tensor)
+        self.recorder.add_dynamic(tensor)
+        return tensor
+
+    def capture(self, fn, *inputs):
+        if self.signature is not None:
+            raise RuntimeError('PimGraph is already captured')
+        for t in inputs:
+            self.commands.add_slot(t.data_ptr(), t.numel() * t.element_size())
+            self.recorder.add_dynamic(t)
+        self.signature = [(t.size(), t.stride(), t.dtype, t.device) for t in inputs]
+
+        self._previous_allocator = set_output_allocator(self._allocate)
+        previous_recorder = set_recorder(self.recorder)
+        try:
+            self.outputs = fn(*inputs)
+        finally:
+            set_recorder(previous_recorder)
+            set_output_allocator(self._previous_allocator)
+        return self.outputs
+
+    def replay(self, *inputs):
+        if self.signature is None:
+            raise RuntimeError('PimGraph is not captured')
+        if len(inputs) != len(self.signature):
+            raise ValueError('Expected {} inputs, got {}'.format(len(self.signature), len(inputs)))
+        for i, (t, signature) in enumerate(zip(inputs, self.signature)):
+            if (t.size(), t.stride(), t.dtype, t.device) != signature:
+                raise ValueError('Input {} does not match the captured size, stride, dtype or device'.format(i))
+        self.commands.replay([t.data_ptr() for t in inputs])
+        return self.outputs
+
+
+def capture(fn, *example_inputs):
+    """PimGraph of the PIM ops fn issues for inputs like example_inputs"""
+    graph = PimGraph()
+    graph.capture(fn, *example_inputs)
+    return graph
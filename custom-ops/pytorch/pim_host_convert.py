@@ -0,0 +1,127 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import numpy as np
+import pim_api
+
+# multithreaded host conversion helpers, absent in older pim_api builds
+HAS_HOST_CONVERT = hasattr(pim_api, 'convert_fp32_to_fp16')
+
+
+def _address(array):
+    return array.__array_interface__['data'][0]
+
+
+def _source(src, dtypes):
+    """src as a C-contiguous numpy array without a copy where possible, e.g. of a CPU tensor or memmap"""
+    src = np.ascontiguousarray(src)
+    if src.dtype not in dtypes:
+        raise ValueError('Expected {} data, got {}'.format(' or '.join(str(np.dtype(d)) for d in dtypes), src.dtype))
+    return src
+
+
+def _destination(out, shape, dtype):
+    """out checked to be a writable C-contiguous array of shape and dtype, or a new one"""
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if out.shape != tuple(shape) or out.dtype != dtype:
+        raise ValueError('out must be a {} array of shape {}'.format(np.dtype(dtype), tuple(shape)))
+    if not out.flags['C_CONTIGUOUS'] or not out.flags['WRITEABLE']:
+        raise ValueError('out must be writable and C-contiguous')
+    return out
+
+
+def to_fp16(src, out=None, threads=0):
+    """fp32 src as fp16, written into out (e.g. a np.memmap) if given. threads 0 uses all cores."""
+    src = _source(src, [np.float32])
+    out = _destination(out, src.shape, np.float16)
+    if HAS_HOST_CONVERT:
+        pim_api.convert_fp32_to_fp16(_address(out), _address(src), src.size, threads)
+    else:
+        out[...] = src
+    return out
+
+
+def to_int8(src, out=None, scale=None, threads=0):
+    """(int8 data, scale) of fp32 src quantized symmetrically, scale defaults to max(|src|) / 127"""
+    src = _source(src, [np.float32])
+    out = _destination(out, src.shape, np.int8)
+    if scale is None:
+        absmax = pim_api.abs_max_fp32(_address(src), src.size, threads) if HAS_HOST_CONVERT else \
+            float(np.abs(src).max(initial=0.0))
+        scale = absmax / 127.0 if absmax > 0.0 else 1.0
+    if HAS_HOST_CONVERT:
+        pim_api.convert_fp32_to_int8(_address(out), _address(src), src.size, scale, threads)
+    else:
+        out[...] = np.clip(np.rint(src / np.float32(scale)), -128, 127)
+    return out, scale
+
+
+def transpose(src, out=None, threads=0):
+    """src with its last two dims swapped, as a C-contiguous array"""
+    src = np.ascontiguousarray(src)
+    if src.ndim < 2 or src.itemsize not in [1, 2, 4]:
+        raise ValueError('Expected a matrix of 1, 2 or 4 byte elements')
+    rows, cols = src.shape[-2:]
+    out = _destination(out, src.shape[:-2] + (cols, rows), src.dtype)
+    if HAS_HOST_CONVERT:
+        pim_api.transpose(_address(out), _address(src), src.size // max(rows * cols, 1), rows, cols, src.itemsize,
+                          threads)
+    else:
+        out[...] = np.swapaxes(src, -1, -2)
+    return out
+
+
+def _weight_dims(weight, transposed):
+    """(n, c, in_w, out_w) of a 2-D or 4-D weight"""
+    n, c = weight.shape[:-2] if weight.ndim == 4 else (1, 1)
+    in_w, out_w = weight.shape[-2:]
+    if transposed:
+        in_w, out_w = out_w, in_w
+    return n, c, in_w, out_w
+
+
+def packed_weight_shape(n, c, in_w, out_w, gemm_order=pim_api.I_X_W):
+    """(n, c, h, w) of the zero padded GEMM_WEIGHT buffer the runtime expects for the gemm"""
+    if HAS_HOST_CONVERT:
+        return pim_api.packed_weight_shape(n, c, in_w, out_w, gemm_order)
+    desc = pim_api.PimCreateGemmDesc(n, c, 1, in_w, 1, out_w, pim_api.PIM_FP16, gemm_order)
+    shape = desc.wei_bshape
+    pim_api.PimDestroyGemmDesc(desc)
+    return shape.n, shape.c, shape.h, shape.w
+
+
+def pack_gemm_weight(weight, out=None, transposed=False, gemm_order=pim_api.I_X_W, threads=0):
+    """fp16 GEMM_WEIGHT data of a fp32 or fp16 weight, padded with zeros to packed_weight_shape.
+
+    weight is (in_w, out_w) or (n, c, in_w, out_w) for I_X_W, the unpadded
+    GEMM_WEIGHT shape of the gemm; with transposed it is the transpose, e.g.
+    the (out_features, in_features) weight of a nn.Linear. The result is
+    written into out if given, e.g. a np.memmap of a converted checkpoint.
+    """
+    weight = _source(weight, [np.float32, np.float16])
+    if weight.ndim not in [2, 4]:
+        raise ValueError('Expected a 2-D or 4-D weight')
+    n, c, in_w, out_w = _weight_dims(weight, transposed)
+    shape = packed_weight_shape(n, c, in_w, out_w, gemm_order)
+    out = _destination(out, shape, np.float16)
+    if HAS_HOST_CONVERT:
+        pim_api.pack_gemm_weight(_address(out), _address(weight), weight.dtype == np.float32, n, c, in_w, out_w,
+                                 transposed, gemm_order, threads)
+        return out
+
+    desc = pim_api.PimCreateGemmDesc(n, c, 1, in_w, 1, out_w, pim_api.PIM_FP16, gemm_order)
+    real = desc.wei_bshape_r
+    pim_api.PimDestroyGemmDesc(desc)
+    matrices = weight.reshape((n * c,) + weight.shape[-2:])
+    if transposed:
+        matrices = np.swapaxes(matrices, -1, -2)
+    out[...] = 0
+    out.reshape((n * c,) + tuple(shape[-2:]))[:, :real.h, :real.w] = matrices.reshape(n * c, real.h, real.w)
+    return out
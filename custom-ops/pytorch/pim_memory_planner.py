@@ -0,0 +1,281 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+from collections import namedtuple
+import torch
+from torch.multiprocessing.reductions import StorageWeakRef
+import pim_api
+from .pim_utils import set_output_allocator, set_pim_scratch
+
+# one output/temporary tensor of the traced forward pass.
+# birth is its allocation index, death the index of the first allocation made after it was freed
+PlannedTensor = namedtuple('PlannedTensor', ['size', 'dtype', 'zero', 'nbytes', 'birth', 'death', 'offset'])
+
+ALIGNMENT = 256
+PIM_ELEMENT = 2  # PIM scratch bo's are FP16
+
+
+def align(nbytes, alignment=ALIGNMENT):
+    return (nbytes + alignment - 1) // alignment * alignment
+
+
+def _storage(tensor):
+    if hasattr(tensor, 'untyped_storage'):
+        return tensor.untyped_storage()
+    return tensor.storage()
+
+
+def assign_offsets(tensors, alignment=ALIGNMENT):
+    """Greedy by size placement, each tensor takes the lowest gap not used by a tensor alive at the same time"""
+    offsets = [0] * len(tensors)
+    placed = []
+    for i in sorted(range(len(tensors)), key=lambda i: (-tensors[i].nbytes, tensors[i].birth)):
+        t = tensors[i]
+        busy = sorted((offsets[j], offsets[j] + align(tensors[j].nbytes, alignment)) for j in placed
+                      if tensors[j].birth < t.death and t.birth < tensors[j].death)
+        offset = 0
+        for start, stop in busy:
+            if offset + t.nbytes <= start:
+                break
+            offset = max(offset, stop)
+        offsets[i] = offset
+        placed.append(i)
+    return offsets
+
+
+class _RecordingAllocator:
+    """Allocates fresh tensors and records size and lifetime of each"""
+
+    def __init__(self):
+        self.records = []
+        self.refs = []
+        self.device = None
+
+    def _retire(self):
+        clock = len(self.records)
+        for i, ref in enumerate(self.refs):
+            if ref is not None and ref.expired():
+                self.records[i]['death'] = clock
+                self.refs[i] = None
+
+    def __call__(self, size, dtype, device, zero):
+        self._retire()
+        device = torch.device(device)
+        if self.device is None:
+            self.device = device
+        elif device != self.device:
+            raise RuntimeError('Memory planner supports one device, got {} and {}'.format(self.device, device))
+
+        nbytes = size.numel() * torch.empty((), dtype=dtype).element_size()
+        base = torch.zeros(nbytes, dtype=torch.uint8, device=device) if zero else \
+            torch.empty(nbytes, dtype=torch.uint8, device=device)
+        tensor = base.view(dtype).view(size)
+        self.records.append({'size': size, 'dtype': dtype, 'zero': zero, 'nbytes': nbytes,
+                             'birth': len(self.records), 'death': None})
+        self.refs.append(StorageWeakRef(_storage(tensor)))
+        return tensor
+
+    def finish(self):
+        self._retire()
+        # still alive at the end of the forward pass: model outputs
+        end = len(self.records) + 1
+        return [dict(r, death=end if r['death'] is None else r['death']) for r in self.records]
+
+
+class _RecordingScratch:
+    """PIM scratch pool of the trace run, measures the largest per op footprint"""
+
+    def __init__(self, alignment):
+        self.alignment = alignment
+        self.bos = {}
+        self.footprint = {}
+
+    def get(self, length, index):
+        key = (length, index)
+        if key not in self.bos:
+            self.bos[key] = pim_api.PimCreateBo(1, 1, 1, length, pim_api.PIM_FP16, pim_api.MEM_TYPE_PIM, 0, False)
+        self.footprint[length] = max(self.footprint.get(length, 0), index + 1)
+        return self.bos[key]
+
+    def arena_bytes(self):
+        return max([n * align(length * PIM_ELEMENT, self.alignment) for length, n in self.footprint.items()] + [0])
+
+    def close(self):
+        for bo in self.bos.values():
+            pim_api.PimDestroyBo(bo)
+        self.bos = {}
+
+
+class _PimArenaScratch:
+    """PIM scratch bo's carved out of one PIM arena bo.
+
+    Scratch bo's only live during a single op, so every op places its bo's at
+    the start of the arena.
+    """
+
+    def __init__(self, nbytes, alignment):
+        self.alignment = alignment
+        self.nbytes = nbytes
+        self.arena = None
+        if nbytes:
+            self.arena = pim_api.PimCreateBo(1, 1, 1, nbytes // PIM_ELEMENT, pim_api.PIM_FP16,
+                                             pim_api.MEM_TYPE_PIM, 0, False)
+        self.bos = {}
+
+    def get(self, length, index):
+        key = (length, index)
+        if key not in self.bos:
+            offset = index * align(length * PIM_ELEMENT, self.alignment)
+            if self.arena is None or offset + length * PIM_ELEMENT > self.nbytes:
+                raise RuntimeError('PIM scratch of {} elements does not fit the planned PIM arena'.format(length))
+            self.bos[key] = pim_api.PimCreateBo(1, 1, 1, length, pim_api.PIM_FP16, pim_api.MEM_TYPE_PIM,
+                                                self.arena.data_ptr + offset, False)
+        return self.bos[key]
+
+    def close(self):
+        for bo in self.bos.values():
+            pim_api.PimDestroyBo(bo)
+        self.bos = {}
+        if self.arena is not None:
+            pim_api.PimDestroyBo(self.arena)
+            self.arena = None
+
+
+class _ArenaAllocator:
+    """Hands out the planned arena views in the order they were recorded"""
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.next = 0
+
+    def __call__(self, size, dtype, device, zero):
+        tensors = self.plan.tensors
+        if self.next >= len(tensors):
+            raise RuntimeError('Forward pass makes more allocations than the memory plan, re-plan for these inputs')
+        t = tensors[self.next]
+        if t.size != size or t.dtype != dtype or torch.device(device) != self.plan.device:
+            raise RuntimeError('Allocation {} is {} {} but the memory plan has {} {}, re-plan for these inputs'.format(
+                self.next, tuple(size), dtype, tuple(t.size), t.dtype))
+        self.next += 1
+        tensor = self.plan.arena[t.offset:t.offset + t.nbytes].view(dtype).view(size)
+        if zero:
+            tensor.zero_()
+        return tensor
+
+
+class PimMemoryPlan:
+    """Fixed device and PIM buffers of one forward pass.
+
+    Outputs of run() are views into the arena and are overwritten by the next
+    run, copy them if they have to outlive it.
+    """
+
+    def __init__(self, model, tensors, device, pim_bytes, alignment=ALIGNMENT):
+        self.model = model
+        self.tensors = tensors
+        self.device = device
+        self.alignment = alignment
+        self.arena_bytes = max([t.offset + align(t.nbytes, alignment) for t in tensors] + [0])
+        self.arena = torch.empty(self.arena_bytes, dtype=torch.uint8, device=device) if device is not None else None
+        self.scratch = _PimArenaScratch(pim_bytes, alignment)
+
+    @property
+    def pim_arena_bytes(self):
+        return self.scratch.nbytes
+
+    @property
+    def naive_bytes(self):
+        """device bytes allocated by the forward pass without a plan"""
+        return sum(align(t.nbytes, self.alignment) for t in self.tensors)
+
+    @property
+    def peak_bytes(self):
+        """largest sum of simultaneously live tensors, the lower bound of arena_bytes"""
+        peak = 0
+        for t in self.tensors:
+            peak = max(peak, sum(align(u.nbytes, self.alignment) for u in self.tensors
+                                 if u.birth <= t.birth < u.death))
+        return peak
+
+    def validate(self):
+        """Raise RuntimeError if two tensors alive at the same time overlap or a tensor leaves the arena"""
+        for i, t in enumerate(self.tensors):
+            if t.offset % self.alignment or t.offset + t.nbytes > self.arena_bytes:
+                raise RuntimeError('Tensor {} at offset {} does not fit the arena'.format(i, t.offset))
+            for j in range(i + 1, len(self.tensors)):
+                u = self.tensors[j]
+                live = t.birth < u.death and u.birth < t.death
+                disjoint = t.offset + t.nbytes <= u.offset or u.offset + u.nbytes <= t.offset
+                if live and not disjoint and t.nbytes and u.nbytes:
+                    raise RuntimeError('Tensors {} and {} are alive at the same time and overlap'.format(i, j))
+        return True
+
+    def report(self):
+        lines = ['device arena {} bytes, unplanned {} bytes, peak live {} bytes, PIM arena {} bytes'.format(
+            self.arena_bytes, self.naive_bytes, self.peak_bytes, self.pim_arena_bytes)]
+        lines.append('{:>5} {:>12} {:>10} {:>6} {:>6} {:>12}  {}'.format(
+            'id', 'offset', 'bytes', 'birth', 'death', 'dtype', 'size'))
+        for i, t in enumerate(self.tensors):
+            lines.append('{:>5} {:>12} {:>10} {:>6} {:>6} {:>12}  {}'.format(
+                i, t.offset, t.nbytes, t.birth, t.death, str(t.dtype).replace('torch.', ''), tuple(t.size)))
+        return '\n'.join(lines)
+
+    def __enter__(self):
+        self._allocator = _ArenaAllocator(self)
+        self._previous = (set_output_allocator(self._allocator), set_pim_scratch(self.scratch))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        set_output_allocator(self._previous[0])
+        set_pim_scratch(self._previous[1])
+        if exc_type is None and self._allocator.next != len(self.tensors):
+            raise RuntimeError('Forward pass made {} of {} planned allocations, re-plan for these inputs'.format(
+                self._allocator.next, len(self.tensors)))
+
+    def run(self, *inputs, **kwargs):
+        with self:
+            return self.model(*inputs, **kwargs)
+
+    def close(self):
+        self.scratch.close()
+        self.arena = None
+
+
+class PimMemoryPlanner:
+    """Plans the output, temporary and PIM scratch buffers of the PIM custom ops of a model.
+
+    plan() traces one forward pass, records the size and lifetime of every
+    buffer and assigns offsets in a single preallocated arena, reusing the
+    memory of buffers which are no longer alive. Allocations of non PIM ops
+    are left to torch.
+    """
+
+    def __init__(self, model, alignment=ALIGNMENT):
+        self.model = model
+        self.alignment = alignment
+
+    def plan(self, *example_inputs, **kwargs):
+        allocator = _RecordingAllocator()
+        scratch = _RecordingScratch(self.alignment)
+        previous = (set_output_allocator(allocator), set_pim_scratch(scratch))
+        try:
+            output = self.model(*example_inputs, **kwargs)
+        finally:
+            set_output_allocator(previous[0])
+            set_pim_scratch(previous[1])
+            scratch.close()
+        records = allocator.finish()
+        del output
+
+        tensors = [PlannedTensor(offset=0, **r) for r in records]
+        offsets = assign_offsets(tensors, self.alignment)
+        tensors = [t._replace(offset=o) for t, o in zip(tensors, offsets)]
+        plan = PimMemoryPlan(self.model, tensors, allocator.device, scratch.arena_bytes(), self.alignment)
+        plan.validate()
+        return plan
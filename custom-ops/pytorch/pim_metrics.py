@@ -0,0 +1,314 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import functools
+import math
+import os
+import tempfile
+import threading
+import time
+from time import perf_counter_ns
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pim_api
+
+# upper bounds of the latency buckets in ns, 2 us to ~4 s. They double from 1 << _SHIFT,
+# so observe() finds the bucket with a shift and bit_length(); slots beyond them count as +Inf.
+_SHIFT = 11
+BOUNDS_NS = [1 << (_SHIFT + i) for i in range(22)]
+_SLOTS = 64
+
+_enabled = True
+_shards = []
+_shards_lock = threading.Lock()
+
+
+class _Shard(threading.local):
+    """Metrics of the current thread. Only the owning thread writes them, so updates need no lock."""
+
+    def __init__(self):
+        # (op, shape) -> counts per slot, then the sum in ns
+        self.latency = {}
+        # (name, label) -> value
+        self.counters = {}
+        with _shards_lock:
+            _shards.append((self.latency, self.counters))
+
+
+_local = _Shard()
+
+
+def set_enabled(enabled):
+    """Turn collection on or off, returns the previous setting"""
+    global _enabled
+    previous = _enabled
+    _enabled = bool(enabled)
+    return previous
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    with _shards_lock:
+        for latency, counters in _shards:
+            latency.clear()
+            counters.clear()
+    _rate_state['executes'] = (time.monotonic(), {})
+
+
+def bucket(size):
+    """size rounded up to a power of two"""
+    return 1 << (size - 1).bit_length() if size > 1 else size
+
+
+def observe(op, shape, start_ns):
+    """Add the latency of a call started at perf_counter_ns() start_ns to the histogram of op and shape.
+
+    shape is a hashable key, bucketed with the bucket_of function registered for op by timed().
+    """
+    elapsed = perf_counter_ns() - start_ns
+    latency = _local.latency
+    histogram = latency.get((op, shape))
+    if histogram is None:
+        histogram = latency[(op, shape)] = [0] * (_SLOTS + 1)
+    histogram[(elapsed >> _SHIFT).bit_length()] += 1
+    histogram[-1] += elapsed
+
+
+def add(name, label, value=1):
+    """Increase counter name{label}, e.g. add('copy_bytes', 'DEVICE_TO_PIM', nbytes)"""
+    if not _enabled:
+        return
+    counters = _local.counters
+    key = (name, label)
+    counters[key] = counters.get(key, 0) + value
+
+
+def timed(op, shape_of, bucket_of):
+    """Decorator of a Function.forward, records its latency under op and shape_of(*args).
+
+    shape_of only grabs raw torch.Size's, they are turned into shape buckets by
+    bucket_of(shape) when the metrics are read, to keep the per call cost low.
+    """
+    _bucketers[op] = bucket_of
+
+    def decorate(forward):
+        @functools.wraps(forward)
+        def timed_forward(ctx, *args):
+            if not _enabled:
+                return forward(ctx, *args)
+            start = perf_counter_ns()
+            out = forward(ctx, *args)
+            observe(op, shape_of(*args), start)
+            return out
+        return timed_forward
+    return decorate
+
+
+# op -> function turning a recorded shape into its shape bucket
+_bucketers = {}
+
+
+def _rows(size):
+    return math.prod(size[:-1])
+
+
+def gemm_shape(inputs, weights, *args):
+    return inputs.shape, weights.shape
+
+
+def gemm_bucket(shape):
+    """(batch * channel, h, in_w, out_w) buckets of a 4-D gemm"""
+    inputs, weights = shape
+    return bucket(inputs[0] * inputs[1]), bucket(inputs[2]), bucket(inputs[3]), bucket(weights[-1])
+
+
+def dense_bucket(shape):
+    """(rows, in_w, out_w) buckets of a dense layer"""
+    inputs, weights = shape
+    return bucket(_rows(inputs)), bucket(inputs[-1]), bucket(weights[-1])
+
+
+def ffn_shape(inputs, fc1_w, fc1_bias, fc2_w, *args):
+    return inputs.shape, fc2_w.shape
+
+
+def ffn_bucket(shape):
+    """(batch * channel, h, in_w, hidden, out_w) buckets of a fused FFN"""
+    inputs, fc2_w = shape
+    return gemm_bucket((inputs, fc2_w[-2:-1])) + (bucket(fc2_w[-1]),)
+
+
+def attention_shape(query, keys, *args):
+    return query.shape, keys.shape
+
+
+def attention_bucket(shape):
+    """(batch * heads, rows, head_dim, cache capacity) buckets of an attention call"""
+    query, keys = shape
+    return bucket(query[0] * query[1]), bucket(query[2]), bucket(query[3]), bucket(keys[2])
+
+
+def length_shape(input, *args):
+    return input.shape
+
+
+def length_bucket(shape):
+    return (bucket(math.prod(shape)),)
+
+
+def snapshot():
+    """Merged latency histograms and counters of all threads.
+
+    Histograms are keyed by (op, shape bucket) and hold the counts per bucket
+    of BOUNDS_NS, the +Inf count and the sum in ns.
+    """
+    latency, counters = {}, {}
+    with _shards_lock:
+        shards = list(_shards)
+    for shard_latency, shard_counters in shards:
+        for (op, shape), histogram in list(shard_latency.items()):
+            bucket_of = _bucketers.get(op)
+            key = (op, bucket_of(shape) if bucket_of is not None else shape)
+            merged = latency.setdefault(key, [0] * (len(BOUNDS_NS) + 2))
+            for i, value in enumerate(list(histogram[:-1])):
+                merged[min(i, len(BOUNDS_NS))] += value
+            merged[-1] += histogram[-1]
+        for key, value in list(shard_counters.items()):
+            counters[key] = counters.get(key, 0) + value
+    return latency, counters
+
+
+def quantile(q, op, shape=None):
+    """Upper bucket bound in seconds below which q of the calls of op (and shape) finished, None without calls"""
+    latency, _ = snapshot()
+    merged = None
+    for (key_op, key_shape), histogram in latency.items():
+        if key_op == op and (shape is None or key_shape == shape):
+            merged = histogram if merged is None else [a + b for a, b in zip(merged, histogram)]
+    if merged is None:
+        return None
+    counts = merged[:-1]
+    total = sum(counts)
+    if not total:
+        return None
+    seen = 0
+    for i, count in enumerate(counts):
+        seen += count
+        if seen >= q * total:
+            return BOUNDS_NS[i] * 1e-9 if i < len(BOUNDS_NS) else float('inf')
+    return float('inf')
+
+
+# last render time and execute totals, for executes per second between renders
+_rate_state = {'executes': (time.monotonic(), {})}
+
+
+def _labels(**labels):
+    return '{' + ','.join('{}="{}"'.format(k, v) for k, v in labels.items()) + '}'
+
+
+def _memory_lines():
+    if not hasattr(pim_api, 'PimGetBoStats'):
+        return []
+    lines = ['# HELP pim_memory_bytes Bytes of live PimBo allocations per memory type',
+             '# TYPE pim_memory_bytes gauge']
+    for mem_type, nbytes in pim_api.PimGetBoStats()['live_bytes'].items():
+        lines.append('pim_memory_bytes{} {}'.format(_labels(mem_type=getattr(mem_type, 'name', mem_type)), nbytes))
+    return lines
+
+
+def render():
+    """All metrics in Prometheus text exposition format"""
+    latency, counters = snapshot()
+    lines = ['# HELP pim_op_latency_seconds Latency of PIM custom op calls per op and shape bucket',
+             '# TYPE pim_op_latency_seconds histogram']
+    for (op, shape), histogram in sorted(latency.items()):
+        shape = 'x'.join(str(s) for s in shape)
+        cumulative = 0
+        for bound, count in zip(BOUNDS_NS + [None], histogram[:-1]):
+            cumulative += count
+            le = '+Inf' if bound is None else repr(bound * 1e-9)
+            lines.append('pim_op_latency_seconds_bucket{} {}'.format(_labels(op=op, shape=shape, le=le), cumulative))
+        lines.append('pim_op_latency_seconds_sum{} {!r}'.format(_labels(op=op, shape=shape), histogram[-1] * 1e-9))
+        lines.append('pim_op_latency_seconds_count{} {}'.format(_labels(op=op, shape=shape), cumulative))
+
+    descriptions = {
+        'executes': ('pim_executes_total', 'PIM executes issued per op', 'op'),
+        'copy_bytes': ('pim_copy_bytes_total', 'Bytes copied per PimMemCpyType direction', 'direction'),
+        'fallbacks': ('pim_fallbacks_total', 'Calls computed by torch instead of PIM per op', 'op'),
+    }
+    for name, (metric, description, label) in descriptions.items():
+        lines += ['# HELP {} {}'.format(metric, description), '# TYPE {} counter'.format(metric)]
+        for (key_name, value_label), value in sorted(counters.items()):
+            if key_name == name:
+                lines.append('{}{} {}'.format(metric, _labels(**{label: value_label}), value))
+
+    now = time.monotonic()
+    executes = {label: value for (name, label), value in counters.items() if name == 'executes'}
+    previous_time, previous = _rate_state['executes']
+    lines += ['# HELP pim_executes_per_second PIM executes per second since the previous export or reset',
+              '# TYPE pim_executes_per_second gauge']
+    for op, value in sorted(executes.items()):
+        rate = (value - previous.get(op, 0)) / (now - previous_time) if now > previous_time else 0.0
+        lines.append('pim_executes_per_second{} {!r}'.format(_labels(op=op), rate))
+    _rate_state['executes'] = (now, executes)
+
+    lines += _memory_lines()
+    return '\n'.join(lines) + '\n'
+
+
+def write(path):
+    """Atomically replace path with the current metrics, e.g. for a node exporter textfile collector"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.pim_metrics')
+    with os.fdopen(fd, 'w') as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+class PimMetricsFileExporter:
+    """Writes the metrics to path every interval seconds from a daemon thread"""
+
+    def __init__(self, path, interval=15.0):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='PimMetricsFileExporter', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            write(self.path)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        write(self.path)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host='127.0.0.1'):
+    """Serve the metrics over HTTP for Prometheus scrapes, returns the server; call shutdown() to stop"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name='PimMetricsServer', daemon=True).start()
+    return server
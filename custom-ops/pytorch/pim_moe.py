@@ -0,0 +1,100 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import math
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from .pim_fused_ffn import PimFusedFFNFunction
+from .pim_utils import alloc_output
+
+
+class PimMoEFFN(nn.Module):
+    """Mixture of expert FFNs run as one channel batched PimFusedFFN call, channel = expert.
+
+    Tokens are grouped by their assigned experts into a (1, num_experts,
+    capacity, in_features) buffer. Each expert takes at most capacity tokens,
+    capacity_factor * tokens * top_k / num_experts rounded up unless capacity
+    is given; first choices of all tokens are placed before second choices and
+    assignments beyond capacity are dropped. Expert outputs are combined with
+    the router weights.
+    """
+
+    def __init__(self, in_features: int, hidden_features: int, num_experts: int, out_features: int = None,
+                 capacity_factor: float = 1.25, capacity: int = None, device=None, dtype=None) -> None:
+        factory_kwargs = {'device': device, 'dtype': dtype}
+        super(PimMoEFFN, self).__init__()
+        out_features = out_features or in_features
+        self.in_features = in_features
+        self.hidden_features = hidden_features
+        self.out_features = out_features
+        self.num_experts = num_experts
+        self.capacity_factor = capacity_factor
+        self.capacity = capacity
+        self.fc1_weight = nn.Parameter(torch.empty((1, num_experts, in_features, hidden_features), **factory_kwargs))
+        self.fc1_bias = nn.Parameter(torch.empty((1, num_experts, 1, hidden_features), **factory_kwargs))
+        self.fc2_weight = nn.Parameter(torch.empty((1, num_experts, hidden_features, out_features), **factory_kwargs))
+        self.fc2_bias = nn.Parameter(torch.empty((1, num_experts, 1, out_features), **factory_kwargs))
+        self.dropped = None
+        self.reset_parameters()
+
+    def reset_parameters(self) -> None:
+        for weight, bias in [(self.fc1_weight, self.fc1_bias), (self.fc2_weight, self.fc2_bias)]:
+            bound = 1 / math.sqrt(weight.size()[2])
+            nn.init.uniform_(weight, -bound, bound)
+            nn.init.uniform_(bias, -bound, bound)
+
+    def __repr__(self):
+        return "PIM MoE FFN layer"
+
+    @staticmethod
+    def route(router_logits, top_k=2):
+        """(expert_indices, expert_weights) of the top_k experts, weights renormalized over the chosen experts"""
+        weights, indices = torch.topk(F.softmax(router_logits.float(), dim=-1), top_k, dim=-1)
+        return indices, weights / weights.sum(dim=-1, keepdim=True)
+
+    def expert_capacity(self, num_assignments):
+        if self.capacity is not None:
+            return self.capacity
+        return max(1, math.ceil(self.capacity_factor * num_assignments / self.num_experts))
+
+    def forward(self, inputs, expert_indices, expert_weights):
+        """inputs (..., in_features), expert_indices and expert_weights (..., top_k)"""
+        leading = inputs.size()[:-1]
+        tokens = inputs.reshape(-1, self.in_features)
+        top_k = expert_indices.size()[-1]
+        expert_indices = expert_indices.reshape(-1, top_k)
+        expert_weights = expert_weights.reshape(-1, top_k)
+        num_tokens = tokens.size()[0]
+
+        # choice major order, so all first choices claim capacity before second choices
+        flat_expert = expert_indices.t().reshape(-1)
+        flat_token = torch.arange(num_tokens, device=tokens.device).repeat(top_k)
+        flat_weight = expert_weights.t().reshape(-1)
+        capacity = self.expert_capacity(flat_expert.numel())
+
+        position = torch.cumsum(F.one_hot(flat_expert, self.num_experts), dim=0) - 1
+        position = position.gather(1, flat_expert[:, None])[:, 0]
+        keep = position < capacity
+        self.dropped = (~keep).sum()
+        flat_expert, flat_token, flat_weight, position = \
+            flat_expert[keep], flat_token[keep], flat_weight[keep], position[keep]
+
+        # padding rows stay zero and are never gathered back
+        dispatched = alloc_output((1, self.num_experts, capacity, self.in_features), tokens.device, zero=True)
+        dispatched[0, flat_expert, position] = tokens[flat_token].to(dispatched.dtype)
+
+        # per expert biases are broadcast over the capacity rows
+        expert_out = PimFusedFFNFunction.apply(dispatched, self.fc1_weight, self.fc1_bias, self.fc2_weight,
+                                               self.fc2_bias)
+
+        combined = alloc_output((num_tokens, self.out_features), tokens.device, zero=True)
+        gathered = expert_out[0, flat_expert, position] * flat_weight[:, None].to(expert_out.dtype)
+        combined.index_add_(0, flat_token, gathered)
+        return combined.view(leading + (self.out_features,))
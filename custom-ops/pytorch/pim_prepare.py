@@ -0,0 +1,83 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import time
+import torch
+import pim_api
+
+
+def _synchronize(device):
+    if device.type == 'cuda':
+        torch.cuda.synchronize(device)
+
+
+def _model_device(model):
+    for t in list(model.parameters()) + list(model.buffers()):
+        if t.device.type != 'meta':
+            return t.device
+    return torch.device('cuda')
+
+
+def _timed(fn, device):
+    _synchronize(device)
+    start = time.perf_counter()
+    fn()
+    _synchronize(device)
+    return time.perf_counter() - start
+
+
+def pin_host_weights(model):
+    """Moves the host parameters and buffers of model into pinned memory in place, returns the pinned bytes"""
+    if not torch.cuda.is_available():
+        return 0
+    pinned = 0
+    for t in list(model.parameters()) + list(model.buffers()):
+        if t.device.type == 'cpu' and not t.is_pinned():
+            t.data = t.data.pin_memory()
+            pinned += t.numel() * t.element_size()
+    return pinned
+
+
+def prepare(model, example_shapes, dtype=torch.float16, device=None, dummy=True, pin_memory=True):
+    """Warm up model for every input shape in example_shapes.
+
+    PimExecuteDummy is issued first if dummy is set and host weights are
+    pinned if pin_memory is set. Every layer with a warm(shape) method, e.g.
+    PimDense, then plans its gemm tiles and converts its weights for each
+    shape up front: the single row weight conversion of its gemv cache, the
+    strided weight tiles and the expanded bias. Layers are assumed to keep
+    the leading dims of the input. Last, every shape is run twice on zero
+    inputs, the first, cold call pays for the remaining runtime kernel setup
+    and the second shows the warm latency.
+    Returns one dict per shape with cold and warm times in seconds and the
+    number of layers prepared for it.
+    """
+    device = torch.device(device) if device is not None else _model_device(model)
+    if dummy:
+        pim_api.PimExecuteDummy()
+    if pin_memory:
+        pin_host_weights(model)
+
+    report = []
+    with torch.no_grad():
+        for shape in example_shapes:
+            plans = [m.warm(shape) for m in model.modules() if callable(getattr(m, 'warm', None))]
+            inputs = torch.zeros(shape, dtype=dtype, device=device)
+            cold = _timed(lambda: model(inputs), device)
+            warm = _timed(lambda: model(inputs), device)
+            report.append({'shape': tuple(shape), 'cold': cold, 'warm': warm, 'layers': len(plans)})
+    return report
+
+
+def format_report(report):
+    lines = ['{:>24} {:>12} {:>12}'.format('shape', 'cold ms', 'warm ms')]
+    for entry in report:
+        lines.append('{:>24} {:>12.3f} {:>12.3f}'.format(str(entry['shape']), entry['cold'] * 1e3,
+                                                        entry['warm'] * 1e3))
+    return '\n'.join(lines)
@@ -11,25 +11,43 @@ import torch
 import torch.nn as nn
 from torch.autograd import Function
 import pim_api
+from .pim_utils import HAS_FAST_PATH, alloc_output, get_pim_scratch, get_recorder
+from . import pim_metrics
 
 
 
 class PimReluFunction(Function):
     @staticmethod
+    @pim_metrics.timed('relu', pim_metrics.length_shape, pim_metrics.length_bucket)
     def forward(ctx, input):
         length = torch.numel(input)
-        out_tensor = torch.empty(
-            input.size(), dtype=torch.float16, device=input.device)
+        out_tensor = alloc_output(input.size(), input.device)
+        pim_metrics.add('executes', 'relu')
+        pim_metrics.add('copy_bytes', 'DEVICE_TO_PIM', 2 * length)
+        pim_metrics.add('copy_bytes', 'PIM_TO_DEVICE', 2 * length)
+
+        recorder = get_recorder()
+        if recorder is not None:
+            recorder.relu(out_tensor, input, length)
+            return out_tensor
+
+        scratch = get_pim_scratch()
+        if HAS_FAST_PATH and scratch is None:
+            pim_api.relu_forward(out_tensor.data_ptr(), input.data_ptr(), length)
+            return out_tensor
 
         dev_input = pim_api.PimCreateBo(
             1, 1, 1, length, pim_api.PIM_FP16, pim_api.MEM_TYPE_DEVICE, input.data_ptr(), False)
         dev_output = pim_api.PimCreateBo(
             1, 1, 1, length, pim_api.PIM_FP16, pim_api.MEM_TYPE_DEVICE, out_tensor.data_ptr(), False)
 
-        pim_input = pim_api.PimCreateBo(
-            1, 1, 1, length, pim_api.PIM_FP16, pim_api.MEM_TYPE_PIM, 0, False)
-        pim_output = pim_api.PimCreateBo(
-            1, 1, 1, length, pim_api.PIM_FP16, pim_api.MEM_TYPE_PIM, 0, False)
+        if scratch is not None:
+            pim_input, pim_output = [scratch.get(length, i) for i in range(2)]
+        else:
+            pim_input = pim_api.PimCreateBo(
+                1, 1, 1, length, pim_api.PIM_FP16, pim_api.MEM_TYPE_PIM, 0, False)
+            pim_output = pim_api.PimCreateBo(
+                1, 1, 1, length, pim_api.PIM_FP16, pim_api.MEM_TYPE_PIM, 0, False)
 
         pim_api.PimCopyMemory(pim_input, dev_input, pim_api.DEVICE_TO_PIM)
 
@@ -39,8 +57,9 @@ class PimReluFunction(Function):
 
         pim_api.PimDestroyBo(dev_input)
         pim_api.PimDestroyBo(dev_output)
-        pim_api.PimDestroyBo(pim_input)
-        pim_api.PimDestroyBo(pim_output)
+        if scratch is None:
+            pim_api.PimDestroyBo(pim_input)
+            pim_api.PimDestroyBo(pim_output)
 
         return out_tensor
 
@@ -0,0 +1,243 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import contextlib
+import fcntl
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import weakref
+import torch
+import pim_api
+from .pim_bo import _create
+from .pim_memory_planner import ALIGNMENT
+from .pim_shm import open_segment, unlink_segment
+
+# segment header: magic, reference count, dtype code, ndim, shape
+_MAGIC = 0x50494d57
+_MAX_DIMS = 8
+_HEADER = struct.Struct('<IiII{}q'.format(_MAX_DIMS))
+_REFCOUNT_OFFSET = 4
+_DATA_OFFSET = ALIGNMENT
+
+_DTYPES = [torch.float16, torch.float32, torch.bfloat16, torch.int8, torch.uint8, torch.int32]
+_PRECISIONS = {torch.float16: pim_api.PIM_FP16, torch.int8: pim_api.PIM_INT8}
+
+
+def _segment_name(namespace, name):
+    """Short POSIX shm name, some platforms limit names to 31 characters.
+
+    The namespace is hashed with the name, its readable prefix alone could
+    be shared by namespaces which lock different files.
+    """
+    digest = hashlib.sha1('{}\0{}'.format(namespace, name).encode()).hexdigest()[:16]
+    return '{}_{}'.format(namespace[:10], digest)
+
+
+@contextlib.contextmanager
+def _file_lock(namespace):
+    """Host wide lock of a namespace, serializes creation and reference counting"""
+    path = os.path.join(tempfile.gettempdir(), '{}.lock'.format(namespace))
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _add_ref(shm, delta):
+    count = struct.unpack_from('<i', shm.buf, _REFCOUNT_OFFSET)[0] + delta
+    struct.pack_into('<i', shm.buf, _REFCOUNT_OFFSET, count)
+    return count
+
+
+def _release(namespace, shm):
+    with _file_lock(namespace):
+        count = _add_ref(shm, -1)
+        try:
+            shm.close()
+        except BufferError:
+            # tensors still view the mapping, it stays until they are gone
+            pass
+        if count <= 0:
+            unlink_segment(shm)
+
+
+class _BoHold:
+    """Source of a bo over a SharedWeight, released together with the bo"""
+
+    def __init__(self, weight):
+        self.weight = weight
+
+
+class SharedWeight:
+    """Weight blob in POSIX shared memory, attached by this process.
+
+    tensor is a zero copy CPU view of the blob. The reference is dropped by
+    close() or when the object is garbage collected; the segment is unlinked
+    when the last process dropped its reference. While bos over the blob are
+    alive, close() only marks the weight closed and the mapping is released
+    with the last bo.
+    """
+
+    def __init__(self, namespace, name, shm):
+        self.namespace = namespace
+        self.name = name
+        self._shm = shm
+        magic, _, dtype, ndim, *shape = _HEADER.unpack_from(shm.buf, 0)
+        if magic != _MAGIC:
+            raise ValueError('{} is not a shared weight segment'.format(shm.name))
+        self.dtype = _DTYPES[dtype]
+        self.shape = torch.Size(shape[:ndim])
+        count = self.shape.numel()
+        self.tensor = torch.frombuffer(shm.buf, dtype=self.dtype, count=count, offset=_DATA_OFFSET).view(self.shape)
+        self.nbytes = count * self.tensor.element_size()
+        self._finalizer = weakref.finalize(self, _release, namespace, shm)
+        self._lock = threading.RLock()
+        self._live_bos = 0
+        self._closing = False
+
+    @property
+    def data_ptr(self):
+        return self.tensor.data_ptr()
+
+    @property
+    def closed(self):
+        return self._closing or not self._finalizer.alive
+
+    @property
+    def live_bos(self):
+        """Number of bos over the blob which are not destroyed yet"""
+        return self._live_bos
+
+    def refcount(self):
+        """Number of references of all processes"""
+        with _file_lock(self.namespace):
+            return struct.unpack_from('<i', self._shm.buf, _REFCOUNT_OFFSET)[0]
+
+    def bo(self, prec=None, desc=None, mflag=pim_api.ELT_OP, transposed=False):
+        """OwnedPimBo with MEM_TYPE_HOST over the shared blob, no copy. The mapping stays until the bo is destroyed."""
+        if prec is None:
+            if self.dtype not in _PRECISIONS:
+                raise ValueError('No PIM precision for {}'.format(self.dtype))
+            prec = _PRECISIONS[self.dtype]
+        with self._lock:
+            if self.closed:
+                raise ValueError('SharedWeight {!r} is closed'.format(self.name))
+            hold = _BoHold(self)
+            bo = _create(self.data_ptr, tuple(self.shape), pim_api.MEM_TYPE_HOST, prec, desc, mflag, transposed, hold)
+            self._live_bos += 1
+        # the bo drops its source when it is closed or collected
+        weakref.finalize(hold, self._bo_released)
+        return bo
+
+    def _bo_released(self):
+        with self._lock:
+            self._live_bos -= 1
+            if self._closing and not self._live_bos:
+                self._finalizer()
+
+    def close(self):
+        with self._lock:
+            # tensor views the mapping, it must be gone before the mapping is closed
+            self.tensor = None
+            self._closing = True
+            if not self._live_bos:
+                self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return 'SharedWeight({!r}, {}, {})'.format(self.name, self.dtype, tuple(self.shape))
+
+
+class PimSharedWeights:
+    """Host wide registry of converted weights in POSIX shared memory.
+
+    get(name, loader) attaches to the blob stored under name, or runs loader()
+    and publishes its result if no process did so yet. Creation is serialized
+    by a file lock, so every weight is loaded and converted once per host and
+    other processes block until it is ready. Processes sharing weights must use
+    the same namespace.
+    """
+
+    def __init__(self, namespace='pim_weights'):
+        self.namespace = namespace
+        self._weights = []
+
+    def get(self, name, loader=None):
+        """SharedWeight of name, created from the CPU tensor returned by loader() if absent"""
+        segment = _segment_name(self.namespace, name)
+        with _file_lock(self.namespace):
+            try:
+                shm = open_segment(segment)
+            except FileNotFoundError:
+                if loader is None:
+                    raise KeyError(name)
+                shm = self._publish(segment, loader())
+            else:
+                _add_ref(shm, 1)
+        weight = SharedWeight(self.namespace, name, shm)
+        self._weights.append(weight)
+        return weight
+
+    def attach(self, name):
+        """SharedWeight published by another process, KeyError if there is none"""
+        return self.get(name)
+
+    def _publish(self, segment, tensor):
+        tensor = tensor.detach().to('cpu').contiguous()
+        if tensor.dtype not in _DTYPES or tensor.ndim > _MAX_DIMS:
+            raise ValueError('Can not share a {} tensor with {} dims'.format(tensor.dtype, tensor.ndim))
+        nbytes = tensor.numel() * tensor.element_size()
+        shm = open_segment(segment, create=True, size=_DATA_OFFSET + max(nbytes, 1))
+        try:
+            shape = list(tensor.size()) + [0] * (_MAX_DIMS - tensor.ndim)
+            _HEADER.pack_into(shm.buf, 0, 0, 1, _DTYPES.index(tensor.dtype), tensor.ndim, *shape)
+            view = torch.frombuffer(shm.buf, dtype=tensor.dtype, count=tensor.numel(), offset=_DATA_OFFSET)
+            view.copy_(tensor.view(-1))
+            del view
+            # readers check the magic, so it is written last
+            struct.pack_into('<I', shm.buf, 0, _MAGIC)
+        except Exception:
+            shm.close()
+            unlink_segment(shm)
+            raise
+        return shm
+
+    def close(self):
+        """Drop the references of all weights obtained from this registry, deferred for weights with live bos"""
+        for weight in self._weights:
+            weight.close()
+        self._weights = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def unlink(name, namespace='pim_weights'):
+    """Remove the segment of name regardless of its reference count, e.g. after a worker crashed"""
+    with _file_lock(namespace):
+        try:
+            shm = open_segment(_segment_name(namespace, name))
+        except FileNotFoundError:
+            return False
+        shm.close()
+        unlink_segment(shm)
+        return True
@@ -0,0 +1,30 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import inspect
+from multiprocessing import shared_memory, resource_tracker
+
+# python 3.13 can open segments without the resource tracker, which would unlink them when this process exits
+_HAS_TRACK = 'track' in inspect.signature(shared_memory.SharedMemory).parameters
+
+
+def open_segment(name, create=False, size=0):
+    """POSIX shared memory segment which outlives this process until unlink_segment()"""
+    if _HAS_TRACK:
+        return shared_memory.SharedMemory(name, create, size, track=False)
+    shm = shared_memory.SharedMemory(name, create, size)
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def unlink_segment(shm):
+    if not _HAS_TRACK:
+        # unlink() unregisters the segment again
+        resource_tracker.register(shm._name, 'shared_memory')
+    shm.unlink()
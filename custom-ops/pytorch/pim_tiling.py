@@ -0,0 +1,56 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+from collections import namedtuple
+from functools import lru_cache
+
+# Largest gemm a single PimExecuteGemm call handles.
+# batch_channel bounds batch * channel, h_in_w bounds inout_h * in_w of one call.
+PimGemmLimits = namedtuple('PimGemmLimits', ['batch_channel', 'inout_h', 'in_w', 'out_w', 'h_in_w'])
+
+# (start, stop) ranges per dimension, the last in_w range carries bias and activation
+PimGemmPlan = namedtuple('PimGemmPlan', ['batch', 'channel', 'inout_h', 'in_w', 'out_w'])
+
+_limits = PimGemmLimits(batch_channel=64, inout_h=8, in_w=4096, out_w=4096, h_in_w=8 * 1024)
+
+
+def get_gemm_limits():
+    return _limits
+
+
+def set_gemm_limits(**kwargs):
+    """Override single call limits, e.g. set_gemm_limits(h_in_w=16 * 1024)"""
+    global _limits
+    _limits = _limits._replace(**kwargs)
+    plan_gemm.cache_clear()
+
+
+def split(size, tile):
+    return [(start, min(start + tile, size)) for start in range(0, size, tile)]
+
+
+def num_calls(plan):
+    return len(plan.batch) * len(plan.channel) * len(plan.inout_h) * len(plan.in_w) * len(plan.out_w)
+
+
+@lru_cache(maxsize=1024)
+def plan_gemm(batch, channel, inout_h, in_w, out_w, limits=None):
+    """Tile plan of a (batch, channel, inout_h, in_w) x (batch, channel, in_w, out_w) gemm.
+
+    in_w is split before inout_h so a weight tile covers as many rows as a
+    call allows. The caller runs each weight tile over all inout_h tiles
+    before moving on and accumulates partial sums of in_w splits.
+    """
+    limits = limits or _limits
+    channel_tile = min(channel, limits.batch_channel)
+    batch_tile = max(1, limits.batch_channel // channel_tile)
+    h_tile = min(inout_h, limits.inout_h)
+    k_tile = min(in_w, limits.in_w, max(1, limits.h_in_w // h_tile))
+    return PimGemmPlan(split(batch, batch_tile), split(channel, channel_tile), split(inout_h, h_tile),
+                       split(in_w, k_tile), split(out_w, limits.out_w))
@@ -0,0 +1,395 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import collections
+import threading
+import weakref
+import torch
+import pim_api
+from .pim_tiling import plan_gemm, num_calls
+from . import pim_metrics
+
+# native create/execute/destroy sequences, absent in older pim_api builds
+HAS_FAST_PATH = hasattr(pim_api, 'dense_forward')
+
+# per thread output allocator and PIM scratch pool, installed by the memory planner
+_state = threading.local()
+
+
+def set_output_allocator(allocator):
+    """allocator(size, dtype, device, zero) -> tensor, None restores torch allocation. Returns the previous one."""
+    previous = getattr(_state, 'allocator', None)
+    _state.allocator = allocator
+    return previous
+
+
+def alloc_output(size, device, dtype=torch.float16, zero=False):
+    """Output and temporary tensors of the custom ops"""
+    allocator = getattr(_state, 'allocator', None)
+    if allocator is not None:
+        return allocator(torch.Size(size), dtype, device, zero)
+    if zero:
+        return torch.zeros(size, dtype=dtype, device=device)
+    return torch.empty(size, dtype=dtype, device=device)
+
+
+def set_pim_scratch(pool):
+    """pool.get(length, index) -> persistent PIM bo, None creates PIM bo's per call. Returns the previous one."""
+    previous = getattr(_state, 'scratch', None)
+    _state.scratch = pool
+    return previous
+
+
+def get_pim_scratch():
+    return getattr(_state, 'scratch', None)
+
+
+def set_recorder(recorder):
+    """recorder with dense/eltwise/relu methods taking tensors, which records and executes the ops.
+    None executes ops directly. Returns the previous one.
+    """
+    previous = getattr(_state, 'recorder', None)
+    _state.recorder = recorder
+    return previous
+
+
+def get_recorder():
+    return getattr(_state, 'recorder', None)
+
+
+def host_op(what):
+    """Marks a torch computation on op data, which a recorded command list would not repeat"""
+    if get_recorder() is not None:
+        raise RuntimeError('{} runs on the host and can not be captured'.format(what))
+
+
+def matrix_layout(tensor):
+    """Layout of the last two dims of a tensor: 'dense' (row-major), 'transposed' (column-major) or None"""
+    rows, cols = tensor.size()[-2:]
+    row_stride, col_stride = tensor.stride()[-2:]
+    if (col_stride == 1 or cols == 1) and (row_stride == cols or rows == 1):
+        return 'dense'
+    if (row_stride == 1 or rows == 1) and (col_stride == rows or cols == 1):
+        return 'transposed'
+    return None
+
+
+def outer_packed(tensor):
+    """True if the leading dims step over the matrices without gaps"""
+    expected = tensor.size()[-2] * tensor.size()[-1]
+    for size, stride in zip(reversed(tensor.size()[:-2]), reversed(tensor.stride()[:-2])):
+        if size != 1 and stride != expected:
+            return False
+        expected *= size
+    return True
+
+
+def dense_operand(tensor):
+    """Row-major matrices of tensor, copied only when the inner matrices are not row-major"""
+    if tensor.ndim < 2:
+        return tensor.contiguous()
+    if matrix_layout(tensor) == 'dense':
+        return tensor
+    host_op('Copy of a strided operand')
+    return tensor.contiguous()
+
+
+def weight_operand(weights):
+    """(weights, transposed) to hand to PimCreateBo.
+
+    Column-major weights, e.g. weight.t() of a nn.Linear, are passed with the
+    transposed flag instead of being copied.
+    """
+    layout = matrix_layout(weights)
+    if layout == 'dense':
+        return weights, False
+    if layout == 'transposed':
+        return weights, True
+    host_op('Copy of strided weights')
+    return weights.contiguous(), False
+
+
+def select_matrix(tensor, b, c):
+    """(1, 1, h, w) view of matrix [b, c], size-1 leading dims are broadcast"""
+    if tensor is None or tensor.ndim != 4:
+        return tensor
+    b = b if tensor.size()[0] > 1 else 0
+    c = c if tensor.size()[1] > 1 else 0
+    return tensor[b:b + 1, c:c + 1]
+
+
+class PimBroadcastBiasCache:
+    """Biases expanded to the full output shape the runtime reads through GEMM_BIAS.
+
+    Entries are keyed by bias address, size, stride and output size, hold a
+    weak reference to the bias and are rebuilt when it is replaced or
+    modified in place, so an out_w-length bias is expanded once per output
+    shape instead of on every call. Changes through .data are not tracked,
+    call clear() after them. A captured PimGraph keeps the expansion it was
+    captured with.
+    """
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries = collections.OrderedDict()
+            self.expansions = 0
+
+    def get(self, bias, size):
+        source = bias._base if bias._base is not None else bias
+        key = (bias.data_ptr(), tuple(bias.size()), bias.stride(), tuple(size), bias.dtype, bias.device)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0]() is source and entry[1] == source._version:
+                self._entries.move_to_end(key)
+                return entry[2]
+        recorder = get_recorder()
+        if recorder is not None and recorder.is_dynamic(bias):
+            host_op('Expansion of a broadcast bias')
+        expanded = bias.expand(size).contiguous()
+        with self._lock:
+            self.expansions += 1
+            self._entries[key] = (weakref.ref(source), source._version, expanded)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return expanded
+
+    def stats(self):
+        with self._lock:
+            return {'expansions': self.expansions, 'entries': len(self._entries)}
+
+
+broadcast_cache = PimBroadcastBiasCache()
+
+
+def broadcast_bias(bias, out):
+    """bias as an operand of the full output shape.
+
+    The runtime reads a bias of the full output shape. A bias with as many
+    elements, e.g. an out_w-length bias of a single row, is passed as it is.
+    Smaller ones, an out_w-length or (batch, channel, 1, out_w) bias of a gemm
+    with h > 1, are expanded once into a cached buffer, see
+    PimBroadcastBiasCache, so bias and activation still run on PIM.
+    """
+    if bias is None:
+        return None
+    try:
+        broadcasts = torch.broadcast_shapes(bias.size(), out.size()) == out.size()
+    except RuntimeError:
+        broadcasts = False
+    if not broadcasts:
+        raise ValueError('Bias of size {} does not broadcast to the output size {}'.format(
+            tuple(bias.size()), tuple(out.size())))
+    if bias.numel() == out.numel():
+        return bias.reshape(out.size())
+    return broadcast_cache.get(bias, out.size())
+
+
+def fold_residual(bias, residual, act):
+    """(bias operand, residual left to add after the gemm).
+
+    Without activation the residual is accumulated through the bias slot,
+    merged with the bias if there is one. An activation is applied after the
+    bias, so the residual is then left for the caller to add to the output.
+    The merge is written into an output buffer, planned by the memory planner.
+    """
+    if residual is None:
+        return bias, None
+    if act != pim_api.NONE:
+        return bias, residual
+    if bias is None:
+        return residual, None
+    host_op('Merge of bias and residual')
+    merged = alloc_output(residual.size(), residual.device, residual.dtype)
+    torch.add(residual, bias, out=merged)
+    return merged, None
+
+
+def gemm_call(out, inputs, weights, bias, act, gemm_order, transposed, block):
+    """One PimExecuteGemm over (batch, channel, h, w) tensors with packed leading dims"""
+    batch, channel, inout_h, in_w = inputs.size()
+    out_w = out.size()[-1]
+    bias_data = 0 if bias is None else bias.data_ptr()
+    pim_metrics.add('executes', 'gemm')
+
+    recorder = get_recorder()
+    if recorder is not None:
+        recorder.dense(out, inputs, weights, bias, batch, channel, inout_h, in_w, out_w, act, gemm_order,
+                       transposed, block)
+        return
+
+    if HAS_FAST_PATH:
+        pim_api.dense_forward(out.data_ptr(), inputs.data_ptr(), weights.data_ptr(), bias_data, batch, channel,
+                              inout_h, in_w, out_w, act, gemm_order, transposed, 0, block)
+        return
+
+    pim_gemm_desc = pim_api.PimCreateGemmDesc(batch, channel, inout_h, in_w, inout_h, out_w, pim_api.PIM_FP16, gemm_order)
+    device_input = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_INPUT, inputs.data_ptr(), False)
+    device_weight = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_WEIGHT, weights.data_ptr(), transposed)
+    # without a bias the runtime would add an uninitialized bias buffer
+    device_bias = None
+    if bias is not None:
+        device_bias = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_BIAS, bias_data, False)
+    device_output = pim_api.PimCreateBo(pim_gemm_desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_OUTPUT, out.data_ptr(), False)
+    try:
+        pim_api.PimExecuteGemm(device_output, device_input, device_weight, device_bias, act, gemm_order, None, block)
+    finally:
+        pim_api.PimDestroyBo(device_input)
+        pim_api.PimDestroyBo(device_weight)
+        if device_bias is not None:
+            pim_api.PimDestroyBo(device_bias)
+        pim_api.PimDestroyBo(device_output)
+        pim_api.PimDestroyGemmDesc(pim_gemm_desc)
+
+
+def strided_gemm(out, inputs, weights, bias, act, gemm_order=pim_api.I_X_W, block=True):
+    """out = act(inputs x weights + bias) for (batch, channel, h, w) tensors within single call limits.
+
+    Operands do not need to be contiguous: transposed weights use the PIM
+    transposed flag and operands whose matrices are dense but strided along
+    batch/channel (e.g. slices) are run matrix by matrix instead of copied.
+    """
+    inputs = dense_operand(inputs)
+    weights, transposed = weight_operand(weights)
+    if bias is not None:
+        bias = dense_operand(bias)
+
+    operands = [out, inputs, weights] + ([bias] if bias is not None and bias.ndim == 4 else [])
+    if all(outer_packed(t) for t in operands):
+        gemm_call(out, inputs, weights, bias, act, gemm_order, transposed, block)
+        return out
+
+    batch, channel = inputs.size()[:2]
+    for b in range(batch):
+        for c in range(channel):
+            gemm_call(select_matrix(out, b, c), select_matrix(inputs, b, c), select_matrix(weights, b, c),
+                      select_matrix(bias, b, c), act, gemm_order, transposed, block)
+    return out
+
+
+def tile(tensor, batch, channel, rows, cols):
+    """Sub-block of a 4-D tensor, size-1 batch/channel dims are broadcast"""
+    b0, b1 = batch if tensor.size()[0] > 1 else (0, 1)
+    c0, c1 = channel if tensor.size()[1] > 1 else (0, 1)
+    return tensor[b0:b1, c0:c1, rows[0]:rows[1], cols[0]:cols[1]]
+
+
+class PimWeightTileCache:
+    """Contiguous copies of weight tiles which are not row or column-major views.
+
+    An out_w tile of a row-major weight, or an in_w tile of a column-major
+    one, is strided and can not be handed to the runtime as it is. Those
+    tiles are copied once per weight and tile plan instead of on every call.
+    Entries are dropped with their weight and rebuilt when it is modified in
+    place. Changes through .data are not tracked, call clear() after them.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self.copies = 0
+
+    def _drop(self, key, ref):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is ref:
+                del self._entries[key]
+
+    def get(self, weights, plan):
+        """{(batch, channel, in_w, out_w) ranges: copied tile} for the strided tiles of weights"""
+        source = weights._base if weights._base is not None else weights
+        key = (weights.data_ptr(), tuple(weights.size()), weights.stride(), weights.dtype, weights.device,
+               tuple(plan.batch), tuple(plan.channel), tuple(plan.in_w), tuple(plan.out_w))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0]() is source and entry[1] == source._version:
+                return entry[2]
+
+        tiles = {}
+        for b in plan.batch:
+            for c in plan.channel:
+                for k in plan.in_w:
+                    for n in plan.out_w:
+                        weights_t = tile(weights, b, c, k, n)
+                        if matrix_layout(weights_t) is None:
+                            recorder = get_recorder()
+                            if recorder is not None and recorder.is_dynamic(weights):
+                                host_op('Copy of strided weight tiles')
+                            tiles[b, c, k, n] = weights_t.contiguous()
+        with self._lock:
+            self.copies += len(tiles)
+            ref = weakref.ref(source, lambda ref, key=key: self._drop(key, ref))
+            self._entries[key] = (ref, source._version, tiles)
+        return tiles
+
+    def stats(self):
+        with self._lock:
+            return {'copies': self.copies, 'entries': len(self._entries)}
+
+
+weight_tile_cache = PimWeightTileCache()
+
+
+def pim_gemm(out, inputs, weights, bias, act, gemm_order=pim_api.I_X_W, block=True):
+    """out = act(inputs x weights + bias) for (batch, channel, h, w) tensors of any size.
+
+    Shapes beyond single call limits are split according to the cached tile
+    plan. Each weight tile is used for all row tiles before the next one, and
+    strided weight tiles come from weight_tile_cache. Partial sums of in_w
+    splits are accumulated and fed to the last split through the bias
+    operand, so bias and activation are applied once.
+    A bias smaller than out is broadcast, see broadcast_bias.
+    """
+    bias = broadcast_bias(bias, out)
+
+    batch, channel, inout_h, in_w = inputs.size()
+    out_w = out.size()[-1]
+    plan = plan_gemm(batch, channel, inout_h, in_w, out_w)
+    if num_calls(plan) == 1:
+        return strided_gemm(out, inputs, weights, bias, act, gemm_order, block)
+
+    copies = weight_tile_cache.get(weights, plan)
+    if len(plan.in_w) > 1:
+        host_op('Accumulation of gemm tiles')
+    for b in plan.batch:
+        for c in plan.channel:
+            for n in plan.out_w:
+                partial = {}
+                for k in plan.in_w:
+                    weights_t = copies.get((b, c, k, n))
+                    if weights_t is None:
+                        weights_t = tile(weights, b, c, k, n)
+                    last = k == plan.in_w[-1]
+                    for h in plan.inout_h:
+                        out_t = out[b[0]:b[1], c[0]:c[1], h[0]:h[1], n[0]:n[1]]
+                        inputs_t = tile(inputs, b, c, h, k)
+                        if not last:
+                            part = alloc_output(out_t.size(), out.device)
+                            strided_gemm(part, inputs_t, weights_t, None, pim_api.NONE, gemm_order, True)
+                            partial[h] = part.float() if h not in partial else partial[h] + part
+                            continue
+
+                        target = out_t if matrix_layout(out_t) == 'dense' else alloc_output(out_t.size(), out.device)
+                        bias_t = None if bias is None else tile(bias, b, c, h, n)
+                        if h in partial:
+                            bias_t = (partial.pop(h) if bias_t is None else partial.pop(h) + bias_t).to(out.dtype)
+                        strided_gemm(target, inputs_t, weights_t, bias_t, act, gemm_order, block or target is not out_t)
+                        if target is not out_t:
+                            host_op('Copy of a strided gemm tile')
+                            out_t.copy_(target)
+    return out
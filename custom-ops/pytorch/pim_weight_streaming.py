@@ -0,0 +1,140 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+import torch
+import torch.nn as nn
+import pim_api
+from .pim_memory_planner import align
+
+# GIL free raw copies, absent in older pim_api builds
+HAS_COPY_MEMORY = hasattr(pim_api, 'copy_memory')
+
+
+def _tensors(layer):
+    """(module, name, is_parameter, tensor) of every parameter and buffer of layer"""
+    for module in layer.modules():
+        for name, param in module._parameters.items():
+            if param is not None:
+                yield module, name, True, param
+        for name, buf in module._buffers.items():
+            if buf is not None:
+                yield module, name, False, buf
+
+
+def _assign(module, name, is_parameter, tensor):
+    if is_parameter:
+        # swap the storage in place, the Parameter object the user holds stays the same
+        module._parameters[name].data = tensor
+    else:
+        module._buffers[name] = tensor
+
+
+class _LayerWeights:
+    """Host copies of the weights of one layer and their offsets inside a device slot"""
+
+    def __init__(self, layer, pin_memory):
+        self.entries = []
+        offset = 0
+        for module, name, is_parameter, tensor in list(_tensors(layer)):
+            host = tensor.detach()
+            if host.device.type != 'cpu' or not host.is_contiguous():
+                host = host.to('cpu').contiguous()
+            if pin_memory and torch.cuda.is_available() and not host.is_pinned():
+                host = host.pin_memory()
+            _assign(module, name, is_parameter, host)
+            nbytes = host.numel() * host.element_size()
+            self.entries.append((module, name, is_parameter, host, offset, nbytes))
+            offset += align(nbytes)
+        self.nbytes = offset
+
+    def copy_to(self, slot):
+        for module, name, is_parameter, host, offset, nbytes in self.entries:
+            if not nbytes:
+                continue
+            if HAS_COPY_MEMORY:
+                pim_api.copy_memory(slot.data_ptr() + offset, host.data_ptr(), nbytes, pim_api.HOST_TO_DEVICE)
+            else:
+                slot[offset:offset + nbytes].copy_(host.view(-1).view(torch.uint8))
+
+    def bind(self, slot):
+        for module, name, is_parameter, host, offset, nbytes in self.entries:
+            view = slot[offset:offset + nbytes].view(host.dtype).view(host.size())
+            _assign(module, name, is_parameter, view)
+
+    def unbind(self):
+        for module, name, is_parameter, host, offset, nbytes in self.entries:
+            _assign(module, name, is_parameter, host)
+
+    def restore(self, device):
+        for module, name, is_parameter, host, offset, nbytes in self.entries:
+            _assign(module, name, is_parameter, host.to(device))
+
+
+class PimWeightStreamer:
+    """Runs a sequential layer stack whose weights are kept in host memory.
+
+    Weights of every layer are moved to host memory, pinned if pin_memory is
+    set (leave it unset for memory-mapped weights). Only window layers are
+    resident on the device at a time: while layer k runs, a copy thread streams
+    the weights of the next window - 1 layers into a ring of device slots.
+    Layers must finish their device work before returning, as the PIM custom
+    ops do with block=True, since their slot is refilled right after.
+    """
+
+    def __init__(self, layers, device, window=2, pin_memory=True):
+        if window < 1:
+            raise ValueError('window must be at least 1')
+        self.layers = list(layers)
+        self.device = torch.device(device)
+        self.window = min(window, len(self.layers))
+        self.weights = [_LayerWeights(layer, pin_memory) for layer in self.layers]
+        slot_bytes = max([w.nbytes for w in self.weights] + [0])
+        self.slots = [torch.empty(slot_bytes, dtype=torch.uint8, device=self.device) for _ in range(self.window)]
+        self._copier = ThreadPoolExecutor(max_workers=1, thread_name_prefix='PimWeightStreamer')
+        self.streamed_bytes = 0
+        self.copy_wait = 0.0
+
+    @property
+    def resident_bytes(self):
+        return sum(slot.numel() for slot in self.slots)
+
+    def _prefetch(self, index):
+        slot = self.slots[index % self.window]
+        self.streamed_bytes += self.weights[index].nbytes
+        return self._copier.submit(self.weights[index].copy_to, slot)
+
+    def __call__(self, x):
+        pending = {k: self._prefetch(k) for k in range(self.window)}
+        for k, layer in enumerate(self.layers):
+            start = time.perf_counter()
+            pending.pop(k).result()
+            self.copy_wait += time.perf_counter() - start
+
+            weights = self.weights[k]
+            weights.bind(self.slots[k % self.window])
+            try:
+                x = layer(x)
+            finally:
+                weights.unbind()
+            if k + self.window < len(self.layers):
+                pending[k + self.window] = self._prefetch(k + self.window)
+        return x
+
+    def stats(self):
+        return {'layers': len(self.layers), 'window': self.window, 'resident_bytes': self.resident_bytes,
+                'streamed_bytes': self.streamed_bytes, 'copy_wait': self.copy_wait}
+
+    def close(self):
+        """Stops the copy thread and copies the host weights back to device into the layers"""
+        self._copier.shutdown()
+        self.slots = []
+        for weights in self.weights:
+            weights.restore(self.device)
@@ -0,0 +1,83 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+# Throughput of a row blocked numpy gemm on PimDevicePool for growing device counts.
+#   python3 benchmark_device_pool.py --devices 1 2 4 --rows 65536 --in-w 1024 --out-w 4096
+
+import argparse
+import time
+import numpy as np
+import pim_api
+from pim_pytorch.pim_device_pool import PimDevicePool
+
+
+# inout_h limit of a single gemm call, see pim_pytorch.pim_tiling
+MAX_ROWS = 8
+
+
+def gemm_block(input, weights, output):
+    rows, in_w = input.shape
+    out_w = weights.shape[1]
+    desc = pim_api.PimCreateGemmDesc(1, 1, rows, in_w, rows, out_w, pim_api.PIM_FP16, pim_api.I_X_W)
+    host_in = pim_api.PimCreateBo(desc, pim_api.MEM_TYPE_HOST, pim_api.GEMM_INPUT, input.__array_interface__['data'][0], False)
+    host_weight = pim_api.PimCreateBo(desc, pim_api.MEM_TYPE_HOST, pim_api.GEMM_WEIGHT, weights.__array_interface__['data'][0], False)
+    host_out = pim_api.PimCreateBo(desc, pim_api.MEM_TYPE_HOST, pim_api.GEMM_OUTPUT, output.__array_interface__['data'][0], False)
+    pim_in = pim_api.PimCreateBo(desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_INPUT, 0, False)
+    pim_out = pim_api.PimCreateBo(desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_OUTPUT, 0, False)
+    pim_api.PimCopyMemory(pim_in, host_in, pim_api.HOST_TO_DEVICE)
+    pim_api.PimExecuteGemm(pim_out, pim_in, host_weight, None, pim_api.NONE, pim_api.I_X_W, None, True)
+    pim_api.PimCopyMemory(host_out, pim_out, pim_api.DEVICE_TO_HOST)
+    for bo in [host_in, host_weight, host_out, pim_in, pim_out]:
+        pim_api.PimDestroyBo(bo)
+    pim_api.PimDestroyGemmDesc(desc)
+
+
+def gemm_rows(input, weights):
+    input = np.ascontiguousarray(input)
+    output = np.empty((input.shape[0], weights.shape[1]), dtype=np.float16)
+    for start in range(0, input.shape[0], MAX_ROWS):
+        gemm_block(input[start:start + MAX_ROWS], weights, output[start:start + MAX_ROWS])
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PimDevicePool scaling over devices')
+    parser.add_argument('--devices', type=int, nargs='+', default=[1, 2])
+    parser.add_argument('--rows', type=int, default=16384)
+    parser.add_argument('--in-w', type=int, default=1024)
+    parser.add_argument('--out-w', type=int, default=4096)
+    parser.add_argument('--block-rows', type=int, default=256)
+    parser.add_argument('--iterations', type=int, default=3)
+    args = parser.parse_args()
+
+    input = np.random.uniform(-1.0, 1.0, (args.rows, args.in_w)).astype(np.float16)
+    weights = np.random.uniform(-0.05, 0.05, (args.in_w, args.out_w)).astype(np.float16)
+    base = None
+    for devices in args.devices:
+        with PimDevicePool(devices) as pool:
+            shared_input = pool.empty(input.shape, input.dtype)
+            shared_weights = pool.empty(weights.shape, weights.dtype)
+            out = pool.empty((args.rows, args.out_w), np.float16)
+            shared_input.array[...] = input
+            shared_weights.array[...] = weights
+            pool.map_rows(gemm_rows, [shared_input], [shared_weights], out, args.block_rows)  # warm up
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                pool.map_rows(gemm_rows, [shared_input], [shared_weights], out, args.block_rows)
+            rows_per_second = args.rows * args.iterations / (time.perf_counter() - start)
+            base = base or rows_per_second / devices
+            print('{:3d} devices {:12.1f} rows/s  scaling {:5.2f}  blocks {}  steals {}'.format(
+                devices, rows_per_second, rows_per_second / base, pool.last_stats['blocks'],
+                pool.last_stats['steals']))
+            for array in [shared_input, shared_weights, out]:
+                array.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import unittest
+import numpy as np
+import pim_api
+
+class TestBoStats(unittest.TestCase):
+    def setUp(self):
+        self.length = 128 * 1024
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        pim_api.PimResetBoStats()
+
+    def test_live_and_peak_bytes(self):
+        base = pim_api.PimGetBoStats()['live_bytes'][pim_api.MEM_TYPE_PIM]
+        pim_input = pim_api.PimCreateBo(self.length, 1, 1, 1, pim_api.PIM_FP16, pim_api.MEM_TYPE_PIM, 0)
+        pim_output = pim_api.PimCreateBo(self.length, 1, 1, 1, pim_api.PIM_FP16, pim_api.MEM_TYPE_PIM, 0)
+
+        stats = pim_api.PimGetBoStats()
+        self.assertGreaterEqual(stats['live_bytes'][pim_api.MEM_TYPE_PIM] - base, 2 * self.length * 2)
+        self.assertEqual(stats['num_allocs'], 2)
+
+        pim_api.PimDestroyBo(pim_input)
+        pim_api.PimDestroyBo(pim_output)
+
+        stats = pim_api.PimGetBoStats()
+        self.assertEqual(stats['live_bytes'][pim_api.MEM_TYPE_PIM], base)
+        self.assertGreaterEqual(stats['peak_bytes'][pim_api.MEM_TYPE_PIM] - base, 2 * self.length * 2)
+        self.assertEqual(stats['num_frees'], 2)
+
+    def test_user_ptr_not_counted(self):
+        input1 = np.zeros(self.length, dtype=np.float16)
+        base = pim_api.PimGetBoStats()['live_bytes'][pim_api.MEM_TYPE_HOST]
+        host_input = pim_api.PimCreateBo(self.length, 1, 1, 1, pim_api.PIM_FP16, pim_api.MEM_TYPE_HOST, input1.__array_interface__['data'][0])
+        self.assertEqual(pim_api.PimGetBoStats()['live_bytes'][pim_api.MEM_TYPE_HOST], base)
+        pim_api.PimDestroyBo(host_input)
+
+    def test_leak_report(self):
+        pim_input = pim_api.PimCreateBo(self.length, 1, 1, 1, pim_api.PIM_FP16, pim_api.MEM_TYPE_PIM, 0)
+        report = pim_api.PimGetBoLeakReport()
+        sites = [entry['call_site'] for entry in report if entry['mem_type'] == pim_api.MEM_TYPE_PIM]
+        self.assertTrue(any('test_bo_stats.py:' in site for site in sites))
+        pim_api.PimDestroyBo(pim_input)
+        self.assertEqual(len(pim_api.PimGetBoLeakReport()), len(report) - 1)
+
+    def tearDown(self):
+        pim_api.PimDeinitialize()
+
+if __name__ == '__main__':
+    unittest.main()
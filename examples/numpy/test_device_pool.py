@@ -0,0 +1,94 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import time
+import unittest
+import numpy as np
+import pim_api
+from pim_pytorch.pim_device_pool import PimDevicePool
+
+
+# inout_h limit of a single gemm call, see pim_pytorch.pim_tiling
+MAX_ROWS = 8
+
+
+def gemm_block(input, weights, output):
+    rows, in_w = input.shape
+    out_w = weights.shape[1]
+    desc = pim_api.PimCreateGemmDesc(1, 1, rows, in_w, rows, out_w, pim_api.PIM_FP16, pim_api.I_X_W)
+    host_in = pim_api.PimCreateBo(desc, pim_api.MEM_TYPE_HOST, pim_api.GEMM_INPUT, input.__array_interface__['data'][0], False)
+    host_weight = pim_api.PimCreateBo(desc, pim_api.MEM_TYPE_HOST, pim_api.GEMM_WEIGHT, weights.__array_interface__['data'][0], False)
+    host_out = pim_api.PimCreateBo(desc, pim_api.MEM_TYPE_HOST, pim_api.GEMM_OUTPUT, output.__array_interface__['data'][0], False)
+    pim_in = pim_api.PimCreateBo(desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_INPUT, 0, False)
+    pim_out = pim_api.PimCreateBo(desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_OUTPUT, 0, False)
+    pim_api.PimCopyMemory(pim_in, host_in, pim_api.HOST_TO_DEVICE)
+    pim_api.PimExecuteGemm(pim_out, pim_in, host_weight, None, pim_api.NONE, pim_api.I_X_W, None, True)
+    pim_api.PimCopyMemory(host_out, pim_out, pim_api.DEVICE_TO_HOST)
+    for bo in [host_in, host_weight, host_out, pim_in, pim_out]:
+        pim_api.PimDestroyBo(bo)
+    pim_api.PimDestroyGemmDesc(desc)
+
+
+def gemm_rows(input, weights):
+    """(rows, in_w) x (in_w, out_w) on the device of the calling worker"""
+    input = np.ascontiguousarray(input)
+    output = np.zeros((input.shape[0], weights.shape[1]), dtype=np.float16)
+    for start in range(0, input.shape[0], MAX_ROWS):
+        gemm_block(input[start:start + MAX_ROWS], weights, output[start:start + MAX_ROWS])
+    return output
+
+
+def device_rows(input):
+    device = np.array([0], dtype=np.uint32)
+    pim_api.PimGetDevice(device)
+    time.sleep(0.02)
+    return np.full(len(input), device[0], dtype=np.int64)
+
+
+def failing_rows(input):
+    raise ValueError('bad block')
+
+
+class TestDevicePool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = PimDevicePool(devices=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_map_rows(self):
+        input = np.random.uniform(-1.0, 1.0, (1000, 256)).astype(np.float16)
+        weights = np.random.uniform(-0.1, 0.1, (256, 512)).astype(np.float16)
+        output = self.pool.map_rows(gemm_rows, [input], broadcast=[weights], block_rows=64)
+        golden = np.matmul(input.astype(np.float32), weights.astype(np.float32))
+        self.assertEqual(output.shape, (1000, 512))
+        self.assertTrue(np.allclose(output, golden, atol=0.1))
+        self.assertEqual(sum(self.pool.last_stats['blocks']), 16)
+
+    def test_devices(self):
+        input = self.pool.empty((4096, 1), np.float16)
+        out = self.pool.empty((4096,), np.int64)
+        with input, out:
+            result = self.pool.map_rows(device_rows, [input], out=out, block_rows=256)
+            # every worker ran on its own device
+            self.assertEqual(set(np.unique(result)), {0, 1})
+            self.assertEqual(sum(self.pool.last_stats['blocks']), 16)
+            del result
+
+    def test_error(self):
+        with self.assertRaisesRegex(RuntimeError, 'bad block'):
+            self.pool.map_rows(failing_rows, [np.zeros((10, 2))], block_rows=2)
+        # the pool stays usable
+        self.assertEqual(len(self.pool.map_rows(device_rows, [np.zeros((10, 2))], block_rows=2)), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import os
+import tempfile
+import unittest
+import numpy as np
+import pim_api
+from pim_pytorch import pim_host_convert
+
+
+class TestHostConvert(unittest.TestCase):
+    def setUp(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+
+    def test_fp16(self):
+        src = np.random.normal(0, 100, (1 << 20) + 3).astype(np.float32)
+        src[:8] = [0.0, -0.0, 1e-8, -6e-8, 65519.0, 65520.0, np.inf, -np.inf]
+        out = pim_host_convert.to_fp16(src, threads=4)
+        with np.errstate(over='ignore'):
+            golden = src.astype(np.float16)
+        self.assertTrue(np.array_equal(out.view(np.uint16), golden.view(np.uint16)))
+        self.assertTrue(np.isnan(pim_host_convert.to_fp16(np.array([np.nan], dtype=np.float32))[0]))
+
+    def test_int8(self):
+        src = np.random.uniform(-2.0, 2.0, (1000, 257)).astype(np.float32)
+        out, scale = pim_host_convert.to_int8(src)
+        self.assertAlmostEqual(scale, np.abs(src).max() / 127.0, places=6)
+        golden = np.clip(np.rint(src / np.float32(scale)), -128, 127).astype(np.int8)
+        self.assertLessEqual(np.abs(out.astype(np.int32) - golden).max(), 1)
+        out, _ = pim_host_convert.to_int8(src, scale=0.001)
+        self.assertEqual(out.max(), 127)
+        self.assertEqual(out.min(), -128)
+
+    def test_transpose(self):
+        for dtype in [np.int8, np.float16, np.float32]:
+            src = np.random.uniform(-100, 100, (3, 130, 67)).astype(dtype)
+            self.assertTrue(np.array_equal(pim_host_convert.transpose(src), np.swapaxes(src, 1, 2)))
+
+    def test_pack_gemm_weight(self):
+        weight = np.random.uniform(-1.0, 1.0, (1, 2, 256, 512)).astype(np.float32)
+        shape = pim_host_convert.packed_weight_shape(1, 2, 256, 512)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'weight.bin')
+            out = np.memmap(path, dtype=np.float16, mode='w+', shape=tuple(shape))
+            pim_host_convert.pack_gemm_weight(weight, out=out)
+            out.flush()
+            packed = np.fromfile(path, dtype=np.float16).reshape(shape)
+            del out
+        self.assertTrue(np.array_equal(packed[:, :, :256, :512], weight.astype(np.float16)))
+        self.assertFalse(packed[:, :, 256:].any() or packed[:, :, :, 512:].any())
+
+        # nn.Linear style (out_w, in_w) weight
+        linear = np.ascontiguousarray(np.swapaxes(weight[0, 0], 0, 1)).astype(np.float16)
+        packed = pim_host_convert.pack_gemm_weight(linear, transposed=True)
+        self.assertTrue(np.array_equal(packed[0, 0, :256, :512], weight[0, 0].astype(np.float16)))
+
+        # gemm with the packed host weight
+        input = np.random.uniform(-1.0, 1.0, (1, 2, 1, 256)).astype(np.float16)
+        output = np.zeros((1, 2, 1, 512), dtype=np.float16)
+        packed = pim_host_convert.pack_gemm_weight(weight)
+        desc = pim_api.PimCreateGemmDesc(1, 2, 1, 256, 1, 512, pim_api.PIM_FP16, pim_api.I_X_W)
+        host_in = pim_api.PimCreateBo(desc, pim_api.MEM_TYPE_HOST, pim_api.GEMM_INPUT, input.__array_interface__['data'][0], False)
+        host_weight = pim_api.PimCreateBo(desc, pim_api.MEM_TYPE_HOST, pim_api.GEMM_WEIGHT, packed.__array_interface__['data'][0], False)
+        host_out = pim_api.PimCreateBo(desc, pim_api.MEM_TYPE_HOST, pim_api.GEMM_OUTPUT, output.__array_interface__['data'][0], False)
+        pim_in = pim_api.PimCreateBo(desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_INPUT, 0, False)
+        pim_out = pim_api.PimCreateBo(desc, pim_api.MEM_TYPE_DEVICE, pim_api.GEMM_OUTPUT, 0, False)
+        pim_api.PimCopyMemory(pim_in, host_in, pim_api.HOST_TO_DEVICE)
+        pim_api.PimExecuteGemm(pim_out, pim_in, host_weight, None, pim_api.NONE, pim_api.I_X_W, None, True)
+        pim_api.PimCopyMemory(host_out, pim_out, pim_api.DEVICE_TO_HOST)
+        golden = np.matmul(input.astype(np.float32), weight)
+        self.assertTrue(np.allclose(golden, output, atol=0.5))
+        for bo in [host_in, host_weight, host_out, pim_in, pim_out]:
+            pim_api.PimDestroyBo(bo)
+        pim_api.PimDestroyGemmDesc(desc)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,265 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+# GPT-style decoder stack on PimDense and PimFusedFFN, prefill followed by token by token decode.
+#   python3 benchmark_decode.py --layers 4 --d-model 1024 --prompt 32 --tokens 32
+#   python3 benchmark_decode.py --clients 8 --rate 20 --requests 64     # Poisson load generator
+#   python3 benchmark_decode.py --pim-attention                         # QK^T and PV on PIM over a PimKVCache
+# --device cpu runs on host tensors, for runtime builds computing on host memory.
+
+import argparse
+import collections
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import pim_api
+from pim_pytorch.pim_dense import PimDense
+from pim_pytorch.pim_fused_ffn import PimFusedFFN
+from pim_pytorch.pim_attention import PimKVCache, PimAttentionDecodeFunction
+
+
+def synchronize(device):
+    if device.type == 'cuda':
+        torch.cuda.synchronize(device)
+
+
+class LayerTimer:
+    """Accumulated wall time per named part of the model"""
+
+    def __init__(self, device):
+        self.device = device
+        self.enabled = False
+        self.times = collections.defaultdict(float)
+
+    def __call__(self, name, fn, *args):
+        if not self.enabled:
+            return fn(*args)
+        synchronize(self.device)
+        start = time.perf_counter()
+        out = fn(*args)
+        synchronize(self.device)
+        self.times[name] += time.perf_counter() - start
+        return out
+
+
+class DecoderLayer(nn.Module):
+    """Pre-norm decoder layer: attention with qkv and output projections, then a relu FFN"""
+
+    def __init__(self, d_model, num_heads, d_ffn, device, dtype, gemv=False):
+        super(DecoderLayer, self).__init__()
+        factory_kwargs = {'device': device, 'dtype': dtype}
+        self.num_heads = num_heads
+        self.ln1 = nn.LayerNorm(d_model, **factory_kwargs)
+        self.ln2 = nn.LayerNorm(d_model, **factory_kwargs)
+        self.qkv = PimDense(d_model, 3 * d_model, bias=False, gemv=gemv, **factory_kwargs)
+        self.proj = PimDense(d_model, d_model, bias=False, gemv=gemv, **factory_kwargs)
+        self.ffn = PimFusedFFN()
+        self.fc1_weight = nn.Parameter(torch.empty((1, 1, d_model, d_ffn), **factory_kwargs))
+        self.fc1_bias = nn.Parameter(torch.empty((1, 1, 1, d_ffn), **factory_kwargs))
+        self.fc2_weight = nn.Parameter(torch.empty((1, 1, d_ffn, d_model), **factory_kwargs))
+        self.fc2_bias = nn.Parameter(torch.empty((1, 1, 1, d_model), **factory_kwargs))
+        with torch.no_grad():
+            for weight in [self.qkv.weight, self.proj.weight, self.fc1_weight, self.fc2_weight]:
+                bound = 1 / math.sqrt(weight.size()[-2])
+                nn.init.uniform_(weight, -bound, bound)
+            nn.init.uniform_(self.fc1_bias, -0.01, 0.01)
+            nn.init.uniform_(self.fc2_bias, -0.01, 0.01)
+
+    def attention(self, qkv, cache):
+        """Causal attention of the new rows over cache + new rows, cache is a [keys, values] pair or a PimKVCache"""
+        h, width = qkv.size()
+        d_model = width // 3
+        head_dim = d_model // self.num_heads
+        q, k, v = qkv.view(h, 3, self.num_heads, head_dim).permute(1, 2, 0, 3).unbind(0)
+        if isinstance(cache, PimKVCache):
+            cache.append(k[None], v[None])
+            out = PimAttentionDecodeFunction.apply(q[None], cache.keys, cache.values, cache.length)[0]
+            return out.permute(1, 0, 2).reshape(h, d_model)
+        if cache[0] is not None:
+            k = torch.cat([cache[0], k], dim=1)
+            v = torch.cat([cache[1], v], dim=1)
+        cache[0], cache[1] = k, v
+        past = k.size(1) - h
+        scores = torch.matmul(q.float(), k.float().transpose(1, 2)) / math.sqrt(head_dim)
+        mask = torch.ones(h, k.size(1), dtype=torch.bool, device=qkv.device).tril(past)
+        scores = scores.masked_fill(~mask, float('-inf'))
+        out = torch.matmul(F.softmax(scores, dim=-1), v.float()).to(qkv.dtype)
+        return out.permute(1, 0, 2).reshape(h, d_model)
+
+    def forward(self, x, cache, timer, reference=False):
+        """x (h, d_model), returns the layer output rows"""
+        if reference:
+            qkv = torch.matmul(self.ln1(x), self.qkv.weight)
+            x = x + torch.matmul(self.attention(qkv, cache), self.proj.weight)
+            hidden = F.relu(torch.matmul(self.ln2(x), self.fc1_weight[0, 0]) + self.fc1_bias[0, 0])
+            return x + torch.matmul(hidden, self.fc2_weight[0, 0]) + self.fc2_bias[0, 0]
+
+        qkv = timer('qkv', self.qkv, self.ln1(x))
+        attn = timer('attention', self.attention, qkv, cache)
+        # residual connections are accumulated through the gemm bias slot
+        x = timer('proj', self.proj, attn, x)
+        out = timer('ffn', self.ffn, self.ln2(x)[None, None], self.fc1_weight, self.fc1_bias, self.fc2_weight,
+                    self.fc2_bias, pim_api.I_X_W, True, x[None, None])
+        return out[0, 0]
+
+
+class Decoder(nn.Module):
+    def __init__(self, args, device, dtype=torch.float16):
+        super(Decoder, self).__init__()
+        self.embed = nn.Embedding(args.vocab, args.d_model, device=device, dtype=dtype)
+        self.layers = nn.ModuleList([DecoderLayer(args.d_model, args.heads, args.d_ffn, device, dtype, args.gemv)
+                                     for _ in range(args.layers)])
+        self.ln_f = nn.LayerNorm(args.d_model, device=device, dtype=dtype)
+        self.timer = LayerTimer(device)
+        self.pim_attention = args.pim_attention
+        self.cache_shape = (args.heads, args.d_model // args.heads, args.prompt + args.tokens, device, dtype)
+
+    def new_cache(self, reference=False):
+        if self.pim_attention and not reference:
+            return [PimKVCache(1, *self.cache_shape) for _ in self.layers]
+        return [[None, None] for _ in self.layers]
+
+    def forward(self, tokens, cache, reference=False):
+        """Hidden state of the last position after feeding tokens, extending cache"""
+        x = self.embed(tokens)
+        for i, layer in enumerate(self.layers):
+            x = layer(x, cache[i], self.timer, reference)
+        return self.ln_f(x[-1:])
+
+    def next_token(self, hidden):
+        return torch.matmul(hidden.float(), self.embed.weight.float().t()).argmax(dim=-1)
+
+    def generate(self, prompt, num_tokens, reference=False):
+        """(generated tokens, prefill seconds, decode seconds)"""
+        device = prompt.device
+        cache = self.new_cache(reference)
+        synchronize(device)
+        start = time.perf_counter()
+        token = self.next_token(self(prompt, cache, reference))
+        synchronize(device)
+        prefill = time.perf_counter() - start
+        tokens = [token]
+        for _ in range(num_tokens - 1):
+            token = self.next_token(self(token, cache, reference))
+            tokens.append(token)
+        synchronize(device)
+        return torch.cat(tokens), prefill, time.perf_counter() - start - prefill
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(math.ceil(q * len(values))) - 1)] if values else 0.0
+
+
+def memory_report(model, device, prompt_len, num_tokens):
+    params = sum(p.numel() * p.element_size() for p in model.parameters())
+    d_model = model.embed.weight.size(1)
+    kv_cache = 2 * len(model.layers) * (prompt_len + num_tokens) * d_model * 2
+    report = {'parameter_bytes': params, 'kv_cache_bytes': kv_cache}
+    if device.type == 'cuda':
+        report['device_peak_bytes'] = torch.cuda.max_memory_allocated(device)
+    if hasattr(pim_api, 'PimGetBoStats'):
+        report['pim_peak_bytes'] = int(pim_api.PimGetBoStats()['peak_bytes'][pim_api.MEM_TYPE_PIM])
+    return report
+
+
+def run_single(model, args, device):
+    prompt = torch.randint(0, args.vocab, (args.prompt,), device=device)
+    with torch.no_grad():
+        model.generate(prompt, 2)  # warm up
+        ref_tokens, ref_prefill, ref_decode = model.generate(prompt, args.tokens, reference=True)
+        model.timer.enabled = True
+        model.generate(prompt, args.tokens)
+        model.timer.enabled = False
+        tokens, prefill, decode = model.generate(prompt, args.tokens)
+
+    print('prefill  {:8.2f} ms  {:10.1f} tokens/s  (torch {:8.2f} ms)'.format(
+        prefill * 1e3, args.prompt / prefill, ref_prefill * 1e3))
+    decode_steps = max(args.tokens - 1, 1)
+    print('decode   {:8.2f} ms/token  {:8.1f} tokens/s  (torch {:8.2f} ms/token)'.format(
+        decode / decode_steps * 1e3, decode_steps / decode, ref_decode / decode_steps * 1e3))
+    print('tokens matching torch reference: {}/{}'.format(int((tokens == ref_tokens).sum()), args.tokens))
+    print('time per layer part (one generate, all layers):')
+    for name, seconds in model.timer.times.items():
+        print('  {:>10} {:10.2f} ms  {:8.3f} ms/layer'.format(name, seconds * 1e3, seconds * 1e3 / args.layers))
+    for name, value in memory_report(model, device, args.prompt, args.tokens).items():
+        print('  {:>18} {:10.2f} MiB'.format(name, value / 2 ** 20))
+
+
+def run_load(model, args, device):
+    """N client threads serve requests arriving as a Poisson process, latency counts from arrival"""
+    rng = random.Random(args.seed)
+    arrivals, t = [], 0.0
+    for _ in range(args.requests):
+        t += rng.expovariate(args.rate)
+        arrivals.append(t)
+    prompts = [torch.randint(0, args.vocab, (args.prompt,), device=device) for _ in range(args.requests)]
+    latencies, lock = [], threading.Lock()
+
+    def serve(index, arrival, start):
+        with torch.no_grad():
+            model.generate(prompts[index], args.tokens)
+        with lock:
+            latencies.append(time.perf_counter() - start - arrival)
+
+    with torch.no_grad():
+        model.generate(prompts[0], 2)  # warm up
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as clients:
+        for index, arrival in enumerate(arrivals):
+            delay = start + arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            clients.submit(serve, index, arrival, start)
+    elapsed = time.perf_counter() - start
+
+    print('{} requests, {} clients, {:.1f} requests/s offered'.format(args.requests, args.clients, args.rate))
+    print('throughput {:8.1f} requests/s  {:10.1f} tokens/s'.format(
+        args.requests / elapsed, args.requests * args.tokens / elapsed))
+    print('latency    p50 {:8.2f} ms  p99 {:8.2f} ms  max {:8.2f} ms'.format(
+        percentile(latencies, 0.5) * 1e3, percentile(latencies, 0.99) * 1e3, max(latencies) * 1e3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GPT-style decode on PimDense and PimFusedFFN')
+    parser.add_argument('--layers', type=int, default=2)
+    parser.add_argument('--d-model', type=int, default=256)
+    parser.add_argument('--heads', type=int, default=4)
+    parser.add_argument('--d-ffn', type=int, default=None, help='defaults to 4 * d-model')
+    parser.add_argument('--vocab', type=int, default=1000)
+    parser.add_argument('--prompt', type=int, default=16, help='prompt tokens')
+    parser.add_argument('--tokens', type=int, default=16, help='generated tokens')
+    parser.add_argument('--clients', type=int, default=0, help='concurrent clients, 0 runs a single request')
+    parser.add_argument('--rate', type=float, default=10.0, help='mean request arrivals per second')
+    parser.add_argument('--requests', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--device', default='cuda')
+    parser.add_argument('--pim-attention', action='store_true', help='run attention with PimAttentionDecode')
+    parser.add_argument('--gemv', action='store_true', help='run single row projections on converted weights')
+    args = parser.parse_args()
+    args.d_ffn = args.d_ffn or 4 * args.d_model
+
+    torch.manual_seed(args.seed)
+    device = torch.device(args.device)
+    pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+    model = Decoder(args, device)
+    if args.clients:
+        run_load(model, args, device)
+    else:
+        run_single(model, args, device)
+    pim_api.PimDeinitialize()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+# Single row latency of PimDense on the gemm path against the gemv path with prepared weights.
+#   python3 benchmark_gemv.py --sizes 1024x4096 4096x1024 --iterations 100
+
+import argparse
+import time
+import torch
+import pim_api
+from pim_pytorch.pim_dense import PimDense
+
+
+def synchronize(device):
+    if device.type == 'cuda':
+        torch.cuda.synchronize(device)
+
+
+def measure(layer, input, iterations, device):
+    layer(input)
+    synchronize(device)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        layer(input)
+    synchronize(device)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PimDense gemm vs gemv path for single row inputs')
+    parser.add_argument('--sizes', nargs='+', default=['1024x4096', '4096x1024', '4096x4096'],
+                        help='in_features x out_features')
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--device', default='cuda')
+    args = parser.parse_args()
+
+    device = torch.device(args.device)
+    pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+    print('{:>12} {:>12} {:>12} {:>9}'.format('size', 'gemm us', 'gemv us', 'speedup'))
+    with torch.no_grad():
+        for size in args.sizes:
+            in_features, out_features = (int(v) for v in size.split('x'))
+            gemm_layer = PimDense(in_features, out_features, device=device, dtype=torch.float16)
+            torch.nn.init.uniform_(gemm_layer.weight, -0.1, 0.1)
+            torch.nn.init.zeros_(gemm_layer.bias)
+            gemv_layer = PimDense(in_features, out_features, device=device, dtype=torch.float16, gemv=True)
+            gemv_layer.weight, gemv_layer.bias = gemm_layer.weight, gemm_layer.bias
+
+            input = torch.rand(size=(1, in_features), dtype=torch.float16, device=device)
+            gemm_time = measure(gemm_layer, input, args.iterations, device)
+            gemv_time = measure(gemv_layer, input, args.iterations, device)
+            print('{:>12} {:>12.1f} {:>12.1f} {:>8.2f}x'.format(size, gemm_time * 1e6, gemv_time * 1e6,
+                                                              gemm_time / gemv_time))
+    pim_api.PimDeinitialize()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import asyncio
+import threading
+import unittest
+import torch
+import torch.nn as nn
+import pim_api
+from pim_pytorch import pim_aio
+from pim_pytorch.pim_dense import PimDense
+
+
+class PyAioTest(unittest.TestCase):
+    def test_ops(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        device = torch.device('cuda')
+        a = torch.rand(4096, dtype=torch.float16, device=device) - 0.5
+        b = torch.rand(4096, dtype=torch.float16, device=device)
+        inputs = torch.rand((1, 2, 4, 256), dtype=torch.float16, device=device) - 0.5
+        weights = torch.rand((1, 2, 256, 512), dtype=torch.float16, device=device) - 0.5
+        host = torch.empty(4096, dtype=torch.float16)
+
+        async def main():
+            return await asyncio.gather(pim_aio.add(a, b), pim_aio.mul(a, b), pim_aio.relu(a),
+                                        pim_aio.execute_gemm(inputs, weights), pim_aio.copy(host, a))
+
+        added, multiplied, activated, product, copied = asyncio.run(main())
+        self.assertTrue(torch.allclose(added, a + b, atol=0.01))
+        self.assertTrue(torch.allclose(multiplied, a * b, atol=0.01))
+        self.assertTrue(torch.allclose(activated, torch.relu(a), atol=0.01))
+        self.assertTrue(torch.allclose(product, torch.matmul(inputs, weights), atol=0.1))
+        self.assertIs(copied, host)
+        self.assertTrue(torch.equal(host, a.cpu()))
+
+    def test_concurrent_module_calls(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        device = torch.device('cuda')
+        with torch.no_grad():
+            dense = PimDense(256, 512, bias=False, device=device, dtype=torch.float16)
+            nn.init.uniform_(dense.weight, -0.05, 0.05)
+            inputs = [torch.rand((2, 256), dtype=torch.float16, device=device) for _ in range(16)]
+            true_results = [torch.matmul(x, dense.weight) for x in inputs]
+
+        executor = pim_aio.PimAioExecutor()
+        layer = pim_aio.AioModule(dense, executor)
+
+        async def main():
+            return await asyncio.gather(*[layer(x) for x in inputs])
+
+        results = asyncio.run(main())
+        executor.close()
+        for result, true_result in zip(results, true_results):
+            self.assertTrue(torch.allclose(result, true_result, atol=0.1))
+        stats = executor.stats()
+        self.assertEqual(stats['num_ops'], 16)
+        self.assertLessEqual(stats['num_syncs'], 16)
+
+    def test_closed_loop(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        device = torch.device('cuda')
+        release = threading.Event()
+
+        def slow():
+            release.wait(10)
+            return 1
+
+        async def submit():
+            return pim_aio.get_executor().run(slow)
+
+        # the loop is gone before the op completes
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(submit())
+        loop.close()
+        release.set()
+
+        a = torch.rand(4096, dtype=torch.float16, device=device) - 0.5
+
+        async def main():
+            return await asyncio.wait_for(pim_aio.relu(a), 10)
+
+        self.assertTrue(torch.allclose(asyncio.run(main()), torch.relu(a), atol=0.01))
+
+    def test_error(self):
+        async def main():
+            return await pim_aio.call(lambda: 1 / 0)
+
+        with self.assertRaises(ZeroDivisionError):
+            asyncio.run(main())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import math
+import unittest
+import torch
+import torch.nn.functional as F
+import pim_api
+from pim_pytorch.pim_attention import PimAttentionDecode
+
+
+def reference_attention(query, keys, values):
+    """Causal attention of the last query rows over all keys"""
+    num_rows, length = query.size(2), keys.size(2)
+    scores = torch.matmul(query.float(), keys.float().transpose(2, 3)) / math.sqrt(query.size(3))
+    mask = torch.ones(num_rows, length, dtype=torch.bool, device=query.device).tril(length - num_rows)
+    scores = scores.masked_fill(~mask, float('-inf'))
+    return torch.matmul(F.softmax(scores, dim=-1), values.float())
+
+
+class PyAttentionTest(unittest.TestCase):
+    def setUp(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+
+    def testAttentionDecode(self):
+        with torch.no_grad():
+            device = torch.device('cuda')
+            batch, heads, head_dim = 2, 4, 64
+            attention = PimAttentionDecode(batch, heads, head_dim, capacity=8, device=device)
+            keys = torch.rand(size=(batch, heads, 12, head_dim), dtype=torch.float16, device=device) - 0.5
+            values = torch.rand(size=(batch, heads, 12, head_dim), dtype=torch.float16, device=device) - 0.5
+            queries = torch.rand(size=(batch, heads, 12, head_dim), dtype=torch.float16, device=device) - 0.5
+
+            # prefill of 5 rows, then token by token decode growing the cache beyond its capacity
+            steps = [(0, 5)] + [(t, t + 1) for t in range(5, 12)]
+            for start, end in steps:
+                keys_ptr = attention.cache.keys.data_ptr()
+                out = attention(queries[:, :, start:end], keys[:, :, start:end], values[:, :, start:end])
+                expected = reference_attention(queries[:, :, start:end], keys[:, :, :end], values[:, :, :end])
+                self.assertEqual(out.size(), (batch, heads, end - start, head_dim))
+                self.assertTrue(torch.allclose(out.float(), expected, atol=0.05))
+                if end <= 8:
+                    # appended in place
+                    self.assertEqual(attention.cache.keys.data_ptr(), keys_ptr)
+            self.assertEqual(attention.cache.length, 12)
+            self.assertEqual(attention.cache.capacity, 16)
+
+            attention.reset()
+            out = attention(queries[:, :, :1], keys[:, :, :1], values[:, :, :1])
+            self.assertTrue(torch.allclose(out, values[:, :, :1], atol=0.01))
+
+
+if __name__ == "__main__":
+    torch.manual_seed(2)
+    unittest.main()
@@ -0,0 +1,74 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import unittest
+import threading
+import torch
+import torch.nn as nn
+import pim_api
+from pim_pytorch.pim_dense import PimDense
+from pim_pytorch.pim_batching import dense_batcher
+
+
+class PyBatchingTest(unittest.TestCase):
+    def test_dense_batching(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        device = torch.device('cuda')
+        num_requests = 16
+        with torch.no_grad():
+            dense = PimDense(256, 512, bias=False, device=device, dtype=torch.float16)
+            nn.init.uniform_(dense.weight, -0.05, 0.05)
+            inputs = [torch.rand((1, 256), dtype=torch.float16, device=device) for _ in range(num_requests)]
+            true_results = [torch.matmul(x, dense.weight) for x in inputs]
+
+            results = [None] * num_requests
+            with dense_batcher(dense, max_batch=8, max_delay=0.05) as batcher:
+                def request(i):
+                    results[i] = batcher(inputs[i])
+
+                threads = [threading.Thread(target=request, args=(i,)) for i in range(num_requests)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                stats = batcher.stats()
+
+            for pim_result, true_result in zip(results, true_results):
+                self.assertEqual(pim_result.size(), (1, 512))
+                self.assertTrue(torch.allclose(pim_result, true_result, atol=0.01))
+            self.assertEqual(stats['num_requests'], num_requests)
+            self.assertLess(stats['num_batches'], num_requests)
+            self.assertLessEqual(max(stats['batch_size_histogram']), 8)
+            self.assertLessEqual(max(stats['batch_rows_histogram']), 8)
+            self.assertEqual(sum(stats['batch_rows_histogram'].values()), stats['num_batches'])
+
+    def test_batch_rows(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        device = torch.device('cuda')
+        with torch.no_grad():
+            dense = PimDense(256, 512, bias=False, device=device, dtype=torch.float16)
+            nn.init.uniform_(dense.weight, -0.05, 0.05)
+            inputs = [torch.rand((3, 256), dtype=torch.float16, device=device) for _ in range(4)]
+
+            # two calls of 3 rows fill a batch, a third one would exceed max_batch rows
+            with dense_batcher(dense, max_batch=8, max_delay=0.5) as batcher:
+                futures = [batcher.submit(x) for x in inputs]
+                results = [f.result() for f in futures]
+                stats = batcher.stats()
+
+            for pim_result, x in zip(results, inputs):
+                self.assertTrue(torch.allclose(pim_result, torch.matmul(x, dense.weight), atol=0.01))
+            self.assertEqual(stats['batch_size_histogram'], {2: 2})
+            self.assertEqual(stats['batch_rows_histogram'], {6: 2})
+            self.assertEqual(stats['mean_batch_rows'], 6.0)
+        pim_api.PimDeinitialize()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import unittest
+import torch
+import torch.nn as nn
+import pim_api
+from pim_pytorch.pim_batchnorm import PimBatchNorm
+from pim_pytorch.pim_eltwise import PimEltwise
+
+
+class PyBatchNormTest(unittest.TestCase):
+    def make_batchnorm(self, channels, device):
+        bn = nn.BatchNorm2d(channels).to(device).eval()
+        bn.running_mean.uniform_(-1, 1)
+        bn.running_var.uniform_(0.5, 2)
+        bn.weight.uniform_(0.5, 1.5)
+        bn.bias.uniform_(-1, 1)
+        return bn
+
+    def test_batchnorm_layer(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        with torch.no_grad():
+            device = torch.device('cuda')
+            bn = self.make_batchnorm(64, device)
+            input = torch.randn((2, 64, 16, 16), device=device)
+
+            pim_bn = PimBatchNorm.from_batchnorm(bn)
+            pim_result = pim_bn(input.half())
+            true_result = bn(input)
+            self.assertTrue(torch.allclose(pim_result.float(), true_result, atol=0.05))
+
+    def test_batchnorm_fold_eltwise(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        with torch.no_grad():
+            device = torch.device('cuda')
+            bn = self.make_batchnorm(64, device)
+            input = torch.randn((2, 64, 16, 16), device=device)
+            mul = torch.rand((1, 64, 1, 1), device=device)
+            add = torch.rand((1, 64, 1, 1), device=device)
+
+            pim_bn = PimBatchNorm.from_batchnorm(bn).fold_chain([(PimEltwise(1), mul), (PimEltwise(0), add)])
+            pim_result = pim_bn(input.half())
+            true_result = bn(input) * mul + add
+            self.assertTrue(torch.allclose(pim_result.float(), true_result, atol=0.05))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,6 +14,7 @@ from torch.autograd import Function
 import pim_api
 from pim_pytorch.pim_dense import PimDenseFunction as pim_dense
 from pim_pytorch.pim_dense import PimDense
+from pim_pytorch import pim_utils
 
 
 class PyDenseTest(unittest.TestCase):
@@ -55,6 +56,35 @@ class PyDenseTest(unittest.TestCase):
             self.assertTrue(torch.allclose(pim_result, pytorch_result, atol=0.5))
 
 
+    def testDenseTransposedWeight(self):
+        with torch.no_grad():
+            pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+            n_batch = 4
+            in_size = 1024
+            out_size = 4096
+            device = torch.device('cuda')
+
+            input = torch.rand(size=(n_batch, in_size), dtype=torch.float16, device=device)
+            dense = nn.Linear(in_size, out_size, bias=False).to(device).half()
+
+            pytorch_result = dense(input)
+            bias = torch.zeros_like(pytorch_result)
+            # nn.Linear weight viewed as (in_size, out_size) is passed without a transposed copy
+            pim_result = pim_dense.apply(input, dense.weight.t(), bias)
+            self.assertTrue(torch.allclose(pim_result, pytorch_result, atol=0.5))
+
+    def testDense3D(self):
+        with torch.no_grad():
+            pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+            device = torch.device('cuda')
+            input = torch.rand(size=(2, 4, 1024), dtype=torch.float16, device=device)
+            dense = nn.Linear(1024, 4096, bias=False).to(device).half()
+
+            pytorch_result = dense(input)
+            pim_result = pim_dense.apply(input, dense.weight.t(), None)
+            self.assertEqual(pim_result.size(), pytorch_result.size())
+            self.assertTrue(torch.allclose(pim_result, pytorch_result, atol=0.5))
+
     def testDense2(self):
         pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
         in_batch = 1
@@ -87,6 +117,117 @@ class PyDenseTest(unittest.TestCase):
             #print("PIM Result:", pim_result, pim_result.shape)
             self.assertTrue(torch.allclose(pim_result, pytorch_result, atol=0.5))
 
+    def testDenseFromLinear(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        in_batch = 1
+        in_size = 1024
+        out_size = 4096
+
+        with torch.no_grad():
+            device = torch.device('cuda')
+            input = torch.rand(size=(in_batch, in_size), dtype=torch.float16, device=device)
+            dense = nn.Linear(in_size, out_size).to(device).half()
+
+            pim_dense_layer = PimDense.from_linear(dense)
+            self.assertEqual(pim_dense_layer.weight.data_ptr(), dense.weight.data_ptr())
+
+            pytorch_result = dense(input)
+            pim_result = pim_dense_layer(input)
+            self.assertTrue(torch.allclose(pim_result, pytorch_result, atol=0.5))
+
+    def testDenseBucketing(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        with torch.no_grad():
+            device = torch.device('cuda')
+            dense = nn.Linear(1024, 4096, bias=False).to(device).half()
+            pim_dense_layer = PimDense.from_linear(dense, bucketing=[1, 4, 8])
+
+            for inout_h in [3, 1, 6, 10]:
+                input = torch.rand(size=(inout_h, 1024), dtype=torch.float16, device=device)
+                pim_result = pim_dense_layer(input)
+                self.assertEqual(pim_result.size(), (inout_h, 4096))
+                self.assertTrue(torch.allclose(pim_result, dense(input), atol=0.5))
+
+            stats = pim_dense_layer.bucketing.stats()
+            self.assertEqual(stats['misses'], 1)
+            self.assertEqual(stats['bucket_calls'], {1: 1, 4: 1, 8: 1})
+
+    def testDensePrepare(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        with torch.no_grad():
+            device = torch.device('cuda')
+            dense = nn.Linear(1024, 4096).to(device).half()
+            pim_dense_layer = PimDense.from_linear(dense, gemv=True)
+
+            # weights are converted and biases expanded before the first forward
+            pim_utils.broadcast_cache.clear()
+            pim_dense_layer.warm((1, 1024))
+            pim_dense_layer.warm((4, 1024))
+            self.assertEqual(pim_dense_layer.gemv.stats()['conversions'], 1)
+            self.assertEqual(pim_utils.broadcast_cache.stats()['expansions'], 1)
+
+            report = pim_dense_layer.prepare([1, 4, 8])
+            self.assertEqual([entry['shape'] for entry in report], [(1, 1024), (4, 1024), (8, 1024)])
+            for entry in report:
+                self.assertEqual(entry['layers'], 1)
+                self.assertGreater(entry['cold'], 0.0)
+                self.assertGreater(entry['warm'], 0.0)
+            self.assertEqual(pim_dense_layer.gemv.stats()['conversions'], 1)
+            self.assertEqual(pim_utils.broadcast_cache.stats()['expansions'], 2)
+
+    def testDenseGemv(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        with torch.no_grad():
+            device = torch.device('cuda')
+            dense = nn.Linear(1024, 4096).to(device).half()
+            pim_dense_layer = PimDense.from_linear(dense, gemv=True)
+
+            for _ in range(2):
+                input = torch.rand(size=(1, 1024), dtype=torch.float16, device=device)
+                self.assertTrue(torch.allclose(pim_dense_layer(input), dense(input), atol=0.5))
+            # converted on the first single row call and reused afterwards
+            self.assertEqual(pim_dense_layer.gemv.stats()['conversions'], 1)
+
+            dense.weight.mul_(2.0)
+            input = torch.rand(size=(1, 1, 1024), dtype=torch.float16, device=device)
+            self.assertTrue(torch.allclose(pim_dense_layer(input), dense(input), atol=0.5))
+            self.assertEqual(pim_dense_layer.gemv.stats()['conversions'], 2)
+
+            # the converted copy does not keep a replaced weight alive
+            pim_dense_layer.weight = nn.Parameter(dense.weight.detach().clone())
+            del dense
+            self.assertEqual(pim_dense_layer.gemv.stats()['entries'], 0)
+            self.assertIsNone(PimDense(16, 16).gemv)
+
+    def testDenseBias(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        with torch.no_grad():
+            device = torch.device('cuda')
+            dense = nn.Linear(1024, 4096).to(device).half()
+            pim_dense_layer = PimDense.from_linear(dense)
+
+            # the out_features bias is broadcast over all rows
+            for size in [(4, 1024), (2, 3, 1024)]:
+                input = torch.rand(size=size, dtype=torch.float16, device=device)
+                self.assertTrue(torch.allclose(pim_dense_layer(input), dense(input), atol=0.5))
+            input = torch.rand(size=(4, 1024), dtype=torch.float16, device=device)
+            weights_t = self.getTranspose(dense.weight)
+            pim_result = pim_dense.apply(input, weights_t, None)
+            self.assertTrue(torch.allclose(pim_result, torch.matmul(input, weights_t), atol=0.5))
+
+    def testDenseResidual(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        with torch.no_grad():
+            device = torch.device('cuda')
+            dense = nn.Linear(1024, 4096, bias=False).to(device).half()
+            pim_dense_layer = PimDense.from_linear(dense)
+
+            for h in [1, 4]:
+                input = torch.rand(size=(h, 1024), dtype=torch.float16, device=device)
+                residual = torch.rand(size=(h, 4096), dtype=torch.float16, device=device)
+                pim_result = pim_dense_layer(input, residual)
+                self.assertTrue(torch.allclose(pim_result, dense(input) + residual, atol=0.5))
+
 
 if __name__ == "__main__":
     torch.manual_seed(2)
@@ -29,15 +29,10 @@ out_size = 32
 
 class Net(nn.Module):
 
-    def getTranspose(self, weights):
-        weights_t = weights.clone().detach()
-        weights_t = torch.transpose(weights_t, 0, 1).contiguous()
-        return weights_t
-        
     def __init__(self):
         super(Net, self).__init__()
         self.net1 = nn.Linear(inp_size, out_size, bias=False)
-        self.pim_net1 = PimDense(inp_size, out_size, bias=False)
+        self.pim_net1 = PimDense.from_linear(self.net1)  # shares net1 weights, no transposed copy
         self.relu = nn.ReLU()
 
     def forward(self, x, use_pim=0):
@@ -47,11 +42,6 @@ class Net(nn.Module):
         else:
             return self.pim_net1(x)
 
-    def set_pim_weights(self):
-        weights = self.net1.weight  # Weight copy to be used in PIM computation.
-        self.pim_net1.weight.copy_(self.getTranspose(weights))
-        self.pim_net1.bias = None
-
 
 def demo_basic(rank, world_size, model):
     #print(f"Running basic DDP example on rank {rank}.")
@@ -83,8 +73,7 @@ def run_demo(demo_fn, world_size):
     golden = model(input)
 
     with torch.no_grad():
-        model.net1.weight.fill_(0.2)
-        model.set_pim_weights() #Todo where to set weights ??
+        model.net1.weight.fill_(0.2)  # also seen by pim_net1 which shares the storage
 
     mp.spawn(demo_fn,
              args=(world_size,model,),
@@ -0,0 +1,57 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import unittest
+import torch
+import torch.nn as nn
+import pim_api
+from pim_pytorch import pim_metrics
+from pim_pytorch.pim_fused_linear import PimFusedLinear
+
+
+class PyFusedLinearTest(unittest.TestCase):
+    def setUp(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+
+    def testFromLinears(self):
+        with torch.no_grad():
+            device = torch.device('cuda')
+            linears = [nn.Linear(256, 256).to(device).half(), nn.Linear(256, 128, bias=False).to(device).half(),
+                       nn.Linear(256, 64).to(device).half()]
+            fused = PimFusedLinear.from_linears(linears)
+            self.assertEqual(fused.split_sizes, [256, 128, 64])
+
+            for size in [(1, 256), (4, 256), (2, 3, 256)]:
+                input = torch.rand(size=size, dtype=torch.float16, device=device)
+                pim_metrics.reset()
+                outputs = fused(input)
+                _, counters = pim_metrics.snapshot()
+                self.assertEqual(counters.get(('executes', 'gemm'), 0) + counters.get(('executes', 'gemv'), 0), 1)
+
+                self.assertEqual(len(outputs), 3)
+                for output, linear in zip(outputs, linears):
+                    self.assertTrue(torch.allclose(output, linear(input), atol=0.5))
+                # views of one output buffer
+                storage = outputs[0].untyped_storage().data_ptr()
+                self.assertTrue(all(output.untyped_storage().data_ptr() == storage for output in outputs))
+
+    def testInOutLayout(self):
+        with torch.no_grad():
+            device = torch.device('cuda')
+            fused = PimFusedLinear(256, [128, 128], bias=False, device=device, dtype=torch.float16)
+            nn.init.uniform_(fused.weight, -0.1, 0.1)
+            input = torch.rand(size=(4, 256), dtype=torch.float16, device=device)
+            gate, up = fused(input)
+            self.assertTrue(torch.allclose(gate, torch.matmul(input, fused.weight[:, :128]), atol=0.5))
+            self.assertTrue(torch.allclose(up, torch.matmul(input, fused.weight[:, 128:]), atol=0.5))
+
+
+if __name__ == "__main__":
+    torch.manual_seed(2)
+    unittest.main()
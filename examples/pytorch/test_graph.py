@@ -0,0 +1,80 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import unittest
+import torch
+import torch.nn as nn
+import pim_api
+from pim_pytorch.pim_dense import PimDense
+from pim_pytorch.pim_relu import PimRelu
+from pim_pytorch.pim_eltwise import PimEltwise
+from pim_pytorch.pim_graph import capture
+
+
+class ResidualStack(nn.Module):
+    def __init__(self, num_layers, features, device):
+        super(ResidualStack, self).__init__()
+        self.layers = nn.ModuleList(
+            [PimDense(features, features, bias=False, device=device, dtype=torch.float16) for _ in range(num_layers)])
+        for layer in self.layers:
+            nn.init.uniform_(layer.weight, -0.005, 0.005)
+        self.relu = PimRelu()
+        self.add = PimEltwise(0)
+
+    def forward(self, x):
+        for layer in self.layers:
+            x = self.add(self.relu(layer(x)), x)
+        return x
+
+
+class PyGraphTest(unittest.TestCase):
+    def test_capture_replay(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        device = torch.device('cuda')
+        with torch.no_grad():
+            model = ResidualStack(4, 256, device)
+            example = torch.rand((4, 256), dtype=torch.float16, device=device) / 16
+            graph = capture(model, example)
+            self.assertEqual(len(graph), 4 * (1 + 3 + 4))
+
+            for _ in range(2):
+                inputs = torch.rand((4, 256), dtype=torch.float16, device=device) / 16
+                true_result = model(inputs)
+                pim_result = graph.replay(inputs)
+                self.assertTrue(torch.allclose(pim_result, true_result, atol=0.01))
+
+            with self.assertRaises(ValueError):
+                graph.replay(inputs[:2])
+
+    def test_capture_bias(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        device = torch.device('cuda')
+        with torch.no_grad():
+            dense = PimDense(256, 256, device=device, dtype=torch.float16)
+            nn.init.uniform_(dense.weight, -0.05, 0.05)
+            nn.init.uniform_(dense.bias, -1.0, 1.0)
+            # the out_features bias is expanded over the rows once, at capture
+            graph = capture(dense, torch.rand((4, 256), dtype=torch.float16, device=device))
+            self.assertEqual(len(graph), 1)
+            inputs = torch.rand((4, 256), dtype=torch.float16, device=device)
+            true_result = dense(inputs)
+            self.assertTrue(torch.allclose(graph.replay(inputs), true_result, atol=0.01))
+
+    def test_capture_host_op(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        device = torch.device('cuda')
+        with torch.no_grad():
+            dense = PimDense(256, 256, bias=False, device=device, dtype=torch.float16)
+            example = torch.rand((256, 4), dtype=torch.float16, device=device)
+            with self.assertRaises(RuntimeError):
+                capture(dense, example.t())
+
+
+if __name__ == '__main__':
+    unittest.main()
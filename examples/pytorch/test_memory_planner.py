@@ -0,0 +1,79 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import unittest
+import torch
+import torch.nn as nn
+import pim_api
+from pim_pytorch.pim_dense import PimDense
+from pim_pytorch.pim_relu import PimRelu
+from pim_pytorch.pim_eltwise import PimEltwise
+from pim_pytorch.pim_memory_planner import PimMemoryPlanner
+
+
+class ResidualStack(nn.Module):
+    def __init__(self, num_layers, features, device):
+        super(ResidualStack, self).__init__()
+        self.layers = nn.ModuleList(
+            [PimDense(features, features, bias=False, device=device, dtype=torch.float16) for _ in range(num_layers)])
+        for layer in self.layers:
+            nn.init.uniform_(layer.weight, -0.005, 0.005)
+        self.relu = PimRelu()
+        self.add = PimEltwise(0)
+
+    def forward(self, x):
+        for layer in self.layers:
+            x = self.add(self.relu(layer(x)), x)
+        return x
+
+
+class PyMemoryPlannerTest(unittest.TestCase):
+    def test_planned_forward(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        device = torch.device('cuda')
+        with torch.no_grad():
+            model = ResidualStack(6, 256, device)
+            inputs = torch.rand((4, 256), dtype=torch.float16, device=device) / 16
+            true_result = model(inputs)
+
+            plan = PimMemoryPlanner(model).plan(inputs)
+            self.assertTrue(plan.validate())
+            self.assertLess(plan.arena_bytes, plan.naive_bytes)
+            self.assertGreaterEqual(plan.arena_bytes, plan.peak_bytes)
+            self.assertIn('device arena', plan.report())
+
+            for _ in range(2):
+                pim_result = plan.run(inputs)
+                self.assertTrue(torch.allclose(pim_result, true_result, atol=0.01))
+
+            with self.assertRaises(RuntimeError):
+                plan.run(inputs[:2])
+            plan.close()
+        pim_api.PimDeinitialize()
+
+    def test_planned_residual(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        device = torch.device('cuda')
+        with torch.no_grad():
+            dense = PimDense(256, 256, device=device, dtype=torch.float16)
+            nn.init.uniform_(dense.weight, -0.05, 0.05)
+            nn.init.uniform_(dense.bias, -1.0, 1.0)
+            inputs = torch.rand((4, 256), dtype=torch.float16, device=device)
+            true_result = dense(inputs, inputs)
+
+            # the merged bias and residual is planned next to the output
+            plan = PimMemoryPlanner(dense).plan(inputs, inputs)
+            self.assertEqual([tuple(t.size) for t in plan.tensors], [(4, 256), (1, 1, 4, 256)])
+            self.assertTrue(torch.allclose(plan.run(inputs, inputs), true_result, atol=0.01))
+            plan.close()
+        pim_api.PimDeinitialize()
+
+
+if __name__ == '__main__':
+    unittest.main()
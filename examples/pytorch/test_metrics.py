@@ -0,0 +1,83 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import os
+import tempfile
+import time
+import unittest
+import urllib.request
+import torch
+import pim_api
+from pim_pytorch import pim_metrics
+from pim_pytorch.pim_eltwise import PimEltwise
+from pim_pytorch.pim_gemm import PimGemmFunction
+from pim_pytorch.pim_relu import PimRelu
+
+
+class PyMetricsTest(unittest.TestCase):
+    def setUp(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        pim_metrics.reset()
+
+    def test_op_metrics(self):
+        device = torch.device('cuda')
+        with torch.no_grad():
+            a = torch.rand(1000, dtype=torch.float16, device=device)
+            for _ in range(3):
+                PimEltwise(0)(a, a)
+            PimEltwise(1)(a, a[:1])
+            PimRelu()(a)
+            inputs = torch.rand((1, 2, 4, 256), dtype=torch.float16, device=device)
+            weights = torch.rand((1, 2, 256, 512), dtype=torch.float16, device=device)
+            PimGemmFunction.apply(inputs, weights, None, pim_api.NONE)
+
+        latency, counters = pim_metrics.snapshot()
+        self.assertEqual(sum(latency[('eltwise', (1024,))][:-1]), 4)
+        self.assertEqual(sum(latency[('gemm', (2, 4, 256, 512))][:-1]), 1)
+        self.assertEqual(counters[('executes', 'add')], 3)
+        self.assertEqual(counters[('fallbacks', 'eltwise')], 1)
+        self.assertEqual(counters[('copy_bytes', 'DEVICE_TO_PIM')], 3 * 4000 + 2000)
+        self.assertGreater(pim_metrics.quantile(0.99, 'eltwise'), 0.0)
+        self.assertIsNone(pim_metrics.quantile(0.5, 'dense'))
+
+        text = pim_metrics.render()
+        self.assertIn('pim_op_latency_seconds_count{op="eltwise",shape="1024"} 4', text)
+        self.assertIn('pim_op_latency_seconds_bucket{op="relu",shape="1024",le="+Inf"} 1', text)
+        self.assertIn('pim_executes_total{op="gemm"} 1', text)
+        self.assertIn('pim_fallbacks_total{op="eltwise"} 1', text)
+
+    def test_export(self):
+        pim_metrics.add('executes', 'add', 5)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'pim.prom')
+            pim_metrics.write(path)
+            with open(path) as f:
+                self.assertIn('pim_executes_total{op="add"} 5', f.read())
+
+        server = pim_metrics.serve(0)
+        try:
+            url = 'http://127.0.0.1:{}/metrics'.format(server.server_address[1])
+            with urllib.request.urlopen(url) as response:
+                self.assertIn('pim_executes_total{op="add"} 5', response.read().decode())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_overhead(self):
+        iterations = 100000
+        start = time.perf_counter()
+        for _ in range(iterations):
+            pim_metrics.observe('dense', (8, 1024, 4096), time.perf_counter_ns())
+            pim_metrics.add('executes', 'gemm')
+        per_call = (time.perf_counter() - start) / iterations
+        self.assertLess(per_call, 5e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import unittest
+import torch
+import torch.nn.functional as F
+import pim_api
+from pim_pytorch.pim_moe import PimMoEFFN
+
+
+def moe_reference(moe, inputs, expert_indices, expert_weights):
+    tokens = inputs.reshape(-1, moe.in_features).float()
+    expert_indices = expert_indices.reshape(tokens.size()[0], -1)
+    expert_weights = expert_weights.reshape(tokens.size()[0], -1).float()
+    result = torch.zeros((tokens.size()[0], moe.out_features), device=inputs.device)
+    for t in range(tokens.size()[0]):
+        for k in range(expert_indices.size()[1]):
+            e = expert_indices[t, k]
+            hidden = F.relu(tokens[t] @ moe.fc1_weight[0, e].float() + moe.fc1_bias[0, e, 0].float())
+            out = hidden @ moe.fc2_weight[0, e].float() + moe.fc2_bias[0, e, 0].float()
+            result[t] += expert_weights[t, k] * out
+    return result.reshape(inputs.size()[:-1] + (moe.out_features,))
+
+
+class PyMoETest(unittest.TestCase):
+    def test_moe_ffn(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        device = torch.device('cuda')
+        with torch.no_grad():
+            moe = PimMoEFFN(128, 256, num_experts=4, capacity_factor=4.0, device=device, dtype=torch.float16)
+            inputs = torch.rand((2, 6, 128), dtype=torch.float16, device=device) - 0.5
+            expert_indices, expert_weights = moe.route(torch.randn((2, 6, 4), device=device), top_k=2)
+
+            pim_result = moe(inputs, expert_indices, expert_weights)
+            true_result = moe_reference(moe, inputs, expert_indices, expert_weights)
+            self.assertEqual(pim_result.size(), (2, 6, 128))
+            self.assertEqual(int(moe.dropped), 0)
+            self.assertTrue(torch.allclose(pim_result.float(), true_result, atol=0.05))
+
+    def test_moe_capacity(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        device = torch.device('cuda')
+        with torch.no_grad():
+            moe = PimMoEFFN(128, 256, num_experts=2, capacity=2, device=device, dtype=torch.float16)
+            inputs = torch.rand((4, 128), dtype=torch.float16, device=device) - 0.5
+            expert_indices = torch.zeros((4, 1), dtype=torch.long, device=device)
+            expert_weights = torch.ones((4, 1), device=device)
+
+            pim_result = moe(inputs, expert_indices, expert_weights)
+            true_result = moe_reference(moe, inputs[:2], expert_indices[:2], expert_weights[:2])
+            self.assertEqual(int(moe.dropped), 2)
+            self.assertTrue(torch.allclose(pim_result[:2].float(), true_result, atol=0.05))
+            self.assertEqual(int(torch.count_nonzero(pim_result[2:])), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
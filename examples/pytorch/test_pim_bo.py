@@ -0,0 +1,76 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import gc
+import unittest
+import torch
+import numpy as np
+import pim_api
+from pim_pytorch import pim_bo
+
+
+class PyPimBoTest(unittest.TestCase):
+    def setUp(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+
+    def live_count(self, mem):
+        return pim_api.PimGetBoStats()['live_count'][mem]
+
+    def test_context_manager(self):
+        input = torch.rand((128, 1024), dtype=torch.float16, device=torch.device(0))
+        base = self.live_count(pim_api.MEM_TYPE_DEVICE)
+        with pim_bo.as_pim_bo(input) as dev_input:
+            self.assertEqual(dev_input.bo.mem_type, pim_api.MEM_TYPE_DEVICE)
+            self.assertEqual(dev_input.bo.data_ptr, input.data_ptr())
+            self.assertEqual(self.live_count(pim_api.MEM_TYPE_DEVICE), base + 1)
+        self.assertTrue(dev_input.closed)
+        self.assertEqual(self.live_count(pim_api.MEM_TYPE_DEVICE), base)
+
+    def test_finalizer(self):
+        base = self.live_count(pim_api.MEM_TYPE_HOST)
+        host_input = pim_bo.from_buffer(np.ones(1024, dtype=np.float16))
+        self.assertEqual(self.live_count(pim_api.MEM_TYPE_HOST), base + 1)
+        del host_input
+        gc.collect()
+        self.assertEqual(self.live_count(pim_api.MEM_TYPE_HOST), base)
+
+    def test_source_kept_alive(self):
+        dev_input = pim_bo.from_dlpack(torch.ones(1024, dtype=torch.float16, device=torch.device(0)))
+        gc.collect()
+        self.assertTrue(torch.equal(torch.from_dlpack(dev_input).flatten().cpu(), torch.ones(1024, dtype=torch.float16)))
+        dev_input.close()
+
+    def test_validation(self):
+        input = torch.rand((64, 32), dtype=torch.float16, device=torch.device(0))
+        with self.assertRaises(ValueError):
+            pim_bo.as_pim_bo(input.t())
+        with self.assertRaises(TypeError):
+            pim_bo.as_pim_bo(input.float())
+        with self.assertRaises(TypeError):
+            pim_bo.from_buffer(np.ones(16, dtype=np.float32))
+
+    def test_dlpack_export(self):
+        pim_out = pim_api.PimCreateBo(1, 1, 4, 256, pim_api.PIM_FP16, pim_api.MEM_TYPE_DEVICE, 0)
+        with pim_bo.OwnedPimBo(pim_out) as out:
+            tensor = torch.from_dlpack(out)
+            self.assertEqual(tuple(tensor.shape), (1, 1, 4, 256))
+            self.assertEqual(tensor.device.type, 'cuda')
+            del tensor
+
+        pim_data = pim_api.PimCreateBo(1, 1, 1, 256, pim_api.PIM_FP16, pim_api.MEM_TYPE_PIM, 0)
+        with pim_bo.OwnedPimBo(pim_data) as data:
+            with self.assertRaises(ValueError):
+                torch.from_dlpack(data)
+
+    def tearDown(self):
+        pim_api.PimDeinitialize()
+
+
+if __name__ == "__main__":
+    unittest.main()
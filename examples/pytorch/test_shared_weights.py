@@ -0,0 +1,106 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import multiprocessing
+import unittest
+import torch
+import pim_api
+from pim_pytorch.pim_shared_weights import PimSharedWeights, unlink
+
+NAMESPACE = 'pim_test_weights'
+
+
+def _worker(name, queue):
+    registry = PimSharedWeights(NAMESPACE)
+    weight = registry.attach(name)
+    queue.put((float(weight.tensor.float().sum()), weight.refcount()))
+    registry.close()
+
+
+class PySharedWeightsTest(unittest.TestCase):
+    def setUp(self):
+        unlink('fc1', NAMESPACE)
+        unlink('fc1', NAMESPACE + '_v2')
+
+    def test_share_across_processes(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        source = torch.rand((256, 512), dtype=torch.float16)
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return source
+
+        with PimSharedWeights(NAMESPACE) as registry:
+            weight = registry.get('fc1', loader)
+            again = registry.get('fc1', loader)
+            self.assertEqual(len(loads), 1)
+            self.assertEqual(weight.refcount(), 2)
+            self.assertTrue(torch.equal(weight.tensor, source))
+            self.assertTrue(torch.equal(again.tensor, source))
+
+            with weight.bo() as bo:
+                self.assertEqual(bo.bo.mem_type, pim_api.MEM_TYPE_HOST)
+
+            context = multiprocessing.get_context('spawn')
+            queue = context.Queue()
+            workers = [context.Process(target=_worker, args=('fc1', queue)) for _ in range(2)]
+            for w in workers:
+                w.start()
+            results = [queue.get(timeout=60) for _ in workers]
+            for w in workers:
+                w.join()
+            for total, refcount in results:
+                self.assertAlmostEqual(total, float(source.float().sum()), places=1)
+                self.assertGreaterEqual(refcount, 3)
+            self.assertEqual(weight.refcount(), 2)
+
+        # the last reference unlinked the segment
+        with self.assertRaises(KeyError):
+            PimSharedWeights(NAMESPACE).attach('fc1')
+
+    def test_close_with_live_bo(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        source = torch.rand((64, 64), dtype=torch.float16)
+        registry = PimSharedWeights(NAMESPACE)
+        weight = registry.get('fc1', lambda: source)
+        bo = weight.bo()
+        ptr = weight.data_ptr
+        registry.close()
+
+        # the mapping stays while the bo points into it
+        self.assertTrue(weight.closed)
+        self.assertEqual(weight.live_bos, 1)
+        self.assertEqual(weight.refcount(), 1)
+        self.assertTrue(torch.equal(torch.utils.dlpack.from_dlpack(bo).view(-1), source.view(-1)))
+        self.assertEqual(bo.bo.data_ptr, ptr)
+        with self.assertRaises(ValueError):
+            weight.bo()
+
+        bo.close()
+        self.assertEqual(weight.live_bos, 0)
+        with self.assertRaises(KeyError):
+            PimSharedWeights(NAMESPACE).attach('fc1')
+        pim_api.PimDeinitialize()
+
+    def test_namespaces(self):
+        # namespaces with a common prefix do not share segments
+        first = torch.zeros((16, 16), dtype=torch.float16)
+        second = torch.ones((16, 16), dtype=torch.float16)
+        with PimSharedWeights(NAMESPACE) as registry, PimSharedWeights(NAMESPACE + '_v2') as other:
+            weight = registry.get('fc1', lambda: first)
+            other_weight = other.get('fc1', lambda: second)
+            self.assertEqual(weight.refcount(), 1)
+            self.assertEqual(other_weight.refcount(), 1)
+            self.assertTrue(torch.equal(weight.tensor, first))
+            self.assertTrue(torch.equal(other_weight.tensor, second))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+# Copyright (C) 2021 Samsung Electronics Co. LTD
+
+# This software is a property of Samsung Electronics.
+# No part of this software, either material or conceptual may be copied or distributed, transmitted,
+# transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+# electronic, mechanical, manual or otherwise, or disclosed
+# to third parties without the express written permission of Samsung Electronics.
+# (Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+
+import unittest
+import torch
+import torch.nn as nn
+import pim_api
+from pim_pytorch.pim_dense import PimDense
+from pim_pytorch.pim_weight_streaming import PimWeightStreamer
+
+
+class PyWeightStreamingTest(unittest.TestCase):
+    def test_streamed_stack(self):
+        pim_api.PimInitialize(pim_api.RT_TYPE_HIP, pim_api.PIM_FP16)
+        device = torch.device('cuda')
+        num_layers = 5
+        with torch.no_grad():
+            layers = [PimDense(256, 256, bias=False, device=device, dtype=torch.float16) for _ in range(num_layers)]
+            for layer in layers:
+                nn.init.uniform_(layer.weight, -0.05, 0.05)
+            inputs = torch.rand((4, 256), dtype=torch.float16, device=device)
+            true_result = inputs
+            for layer in layers:
+                true_result = layer(true_result)
+
+            params = [layer.weight for layer in layers]
+            values = [layer.weight.clone() for layer in layers]
+            allocated = torch.cuda.memory_allocated() if device.type == 'cuda' else 0
+            streamer = PimWeightStreamer(layers, device, window=2)
+            self.assertEqual(layers[0].weight.device.type, 'cpu')
+            if device.type == 'cuda':
+                # the original device weights are freed, only the slots stay resident
+                model_bytes = num_layers * 256 * 256 * 2
+                self.assertEqual(allocated - torch.cuda.memory_allocated(), model_bytes - streamer.resident_bytes)
+            self.assertEqual(streamer.resident_bytes, 2 * 256 * 256 * 2)
+            for _ in range(2):
+                pim_result = streamer(inputs)
+                self.assertTrue(torch.allclose(pim_result, true_result, atol=0.01))
+            self.assertEqual(streamer.stats()['streamed_bytes'], 2 * num_layers * 256 * 256 * 2)
+            self.assertTrue(all(layer.weight is param for layer, param in zip(layers, params)))
+            streamer.close()
+            self.assertTrue(all(layer.weight is param for layer, param in zip(layers, params)))
+            for layer, value in zip(layers, values):
+                self.assertEqual(layer.weight.device, value.device)
+                self.assertTrue(torch.equal(layer.weight, value))
+
+
+if __name__ == '__main__':
+    unittest.main()
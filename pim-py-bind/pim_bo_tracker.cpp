@@ -0,0 +1,183 @@
+/*
+Copyright (C) 2021 Samsung Electronics Co. LTD
+
+This software is a property of Samsung Electronics.
+No part of this software, either material or conceptual may be copied or distributed, transmitted,
+transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+electronic, mechanical, manual or otherwise, or disclosed
+to third parties without the express written permission of Samsung Electronics.
+(Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+*/
+
+#include "pim_bo_tracker.h"
+#include <chrono>
+#include <iostream>
+#include <map>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+
+namespace
+{
+const int kNumMemTypes = MEM_TYPE_PIM + 1;
+
+struct PimBoRecord {
+    PimMemType mem_type;
+    PimPrecision precision;
+    PimMemFlag mem_flag;
+    size_t size;
+    bool use_user_ptr;
+    std::string call_site;
+    std::chrono::steady_clock::time_point created;
+};
+
+struct PimBoTracker {
+    std::mutex lock;
+    bool enabled = true;
+    std::unordered_map<PimBo*, PimBoRecord> live;
+    size_t live_bytes[kNumMemTypes] = {0};
+    size_t peak_bytes[kNumMemTypes] = {0};
+    size_t live_count[kNumMemTypes] = {0};
+    size_t num_allocs = 0;
+    size_t num_frees = 0;
+    std::chrono::steady_clock::time_point since = std::chrono::steady_clock::now();
+};
+
+PimBoTracker& GetTracker()
+{
+    static PimBoTracker tracker;
+    return tracker;
+}
+
+/* bytes owned by the runtime, bo's wrapping a user pointer do not consume runtime memory */
+size_t OwnedBytes(const PimBoRecord& rec) { return rec.use_user_ptr ? 0 : rec.size; }
+
+std::string GetCallSite()
+{
+    PyFrameObject* frame = PyEval_GetFrame();
+    if (frame == nullptr) return "<native>";
+    py::handle f((PyObject*)frame);
+    return py::str(f.attr("f_code").attr("co_filename")).cast<std::string>() + ":" +
+           std::to_string(f.attr("f_lineno").cast<int>());
+}
+}  // namespace
+
+void PimTrackBo(PimBo* bo)
+{
+    auto& tracker = GetTracker();
+    if (bo == nullptr || !tracker.enabled) return;
+
+    PimBoRecord rec{bo->mem_type,        bo->precision, bo->mem_flag, bo->size,
+                    bo->use_user_ptr,    GetCallSite(), std::chrono::steady_clock::now()};
+
+    std::lock_guard<std::mutex> guard(tracker.lock);
+    tracker.live[bo] = rec;
+    tracker.live_bytes[rec.mem_type] += OwnedBytes(rec);
+    tracker.live_count[rec.mem_type]++;
+    if (tracker.live_bytes[rec.mem_type] > tracker.peak_bytes[rec.mem_type])
+        tracker.peak_bytes[rec.mem_type] = tracker.live_bytes[rec.mem_type];
+    tracker.num_allocs++;
+}
+
+void PimUntrackBo(PimBo* bo)
+{
+    auto& tracker = GetTracker();
+    std::lock_guard<std::mutex> guard(tracker.lock);
+    auto it = tracker.live.find(bo);
+    if (it == tracker.live.end()) return;
+
+    const PimBoRecord& rec = it->second;
+    tracker.live_bytes[rec.mem_type] -= OwnedBytes(rec);
+    tracker.live_count[rec.mem_type]--;
+    tracker.num_frees++;
+    tracker.live.erase(it);
+}
+
+void PimSetBoTracking(bool enable) { GetTracker().enabled = enable; }
+
+bool PimGetBoTracking() { return GetTracker().enabled; }
+
+py::dict PimGetBoStats()
+{
+    auto& tracker = GetTracker();
+    std::lock_guard<std::mutex> guard(tracker.lock);
+
+    py::dict live_bytes, peak_bytes, live_count;
+    for (int i = 0; i < kNumMemTypes; i++) {
+        py::object mem = py::cast(static_cast<PimMemType>(i));
+        live_bytes[mem] = tracker.live_bytes[i];
+        peak_bytes[mem] = tracker.peak_bytes[i];
+        live_count[mem] = tracker.live_count[i];
+    }
+    double elapsed =
+        std::chrono::duration<double>(std::chrono::steady_clock::now() - tracker.since).count();
+
+    py::dict stats;
+    stats["live_bytes"] = live_bytes;
+    stats["peak_bytes"] = peak_bytes;
+    stats["live_count"] = live_count;
+    stats["num_allocs"] = tracker.num_allocs;
+    stats["num_frees"] = tracker.num_frees;
+    stats["alloc_rate"] = elapsed > 0.0 ? tracker.num_allocs / elapsed : 0.0;
+    return stats;
+}
+
+py::list PimGetBoLeakReport()
+{
+    auto& tracker = GetTracker();
+    std::lock_guard<std::mutex> guard(tracker.lock);
+
+    auto now = std::chrono::steady_clock::now();
+    py::list report;
+    for (auto& item : tracker.live) {
+        const PimBoRecord& rec = item.second;
+        py::dict entry;
+        entry["mem_type"] = rec.mem_type;
+        entry["precision"] = rec.precision;
+        entry["mem_flag"] = rec.mem_flag;
+        entry["size"] = rec.size;
+        entry["use_user_ptr"] = rec.use_user_ptr;
+        entry["call_site"] = rec.call_site;
+        entry["age"] = std::chrono::duration<double>(now - rec.created).count();
+        report.append(entry);
+    }
+    return report;
+}
+
+void PimResetBoStats()
+{
+    auto& tracker = GetTracker();
+    std::lock_guard<std::mutex> guard(tracker.lock);
+    for (int i = 0; i < kNumMemTypes; i++) tracker.peak_bytes[i] = tracker.live_bytes[i];
+    tracker.num_allocs = 0;
+    tracker.num_frees = 0;
+    tracker.since = std::chrono::steady_clock::now();
+}
+
+void PimReportAndClearBoLeaks()
+{
+    static const char* mem_names[kNumMemTypes] = {"MEM_TYPE_HOST", "MEM_TYPE_DEVICE", "MEM_TYPE_PIM"};
+    auto& tracker = GetTracker();
+    std::lock_guard<std::mutex> guard(tracker.lock);
+    if (tracker.live.empty()) return;
+
+    /* group by (call site, mem type) so the report points at the leaking code */
+    std::map<std::pair<std::string, int>, std::pair<size_t, size_t>> sites;
+    for (auto& item : tracker.live) {
+        auto& site = sites[{item.second.call_site, item.second.mem_type}];
+        site.first++;
+        site.second += item.second.size;
+    }
+
+    std::cerr << "[PimPyLib] " << tracker.live.size() << " PimBo(s) not destroyed before PimDeinitialize" << std::endl;
+    for (auto& site : sites) {
+        std::cerr << "  " << site.first.first << " " << mem_names[site.first.second] << " count " << site.second.first
+                  << " bytes " << site.second.second << std::endl;
+    }
+
+    tracker.live.clear();
+    for (int i = 0; i < kNumMemTypes; i++) {
+        tracker.live_bytes[i] = 0;
+        tracker.live_count[i] = 0;
+    }
+}
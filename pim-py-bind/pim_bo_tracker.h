@@ -0,0 +1,42 @@
+/*
+Copyright (C) 2021 Samsung Electronics Co. LTD
+
+This software is a property of Samsung Electronics.
+No part of this software, either material or conceptual may be copied or distributed, transmitted,
+transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+electronic, mechanical, manual or otherwise, or disclosed
+to third parties without the express written permission of Samsung Electronics.
+(Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+*/
+
+#ifndef _PIM_BO_TRACKER_H_
+#define _PIM_BO_TRACKER_H_
+
+#include <pim_runtime_api.h>
+#include <pybind11/pybind11.h>
+
+namespace py = pybind11;
+
+/* Records a newly created bo along with the python call site which created it.
+ * Must be called with the GIL held. */
+void PimTrackBo(PimBo* bo);
+
+/* Drops the record of a bo which is about to be destroyed. Unknown bo's are ignored. */
+void PimUntrackBo(PimBo* bo);
+
+void PimSetBoTracking(bool enable);
+bool PimGetBoTracking();
+
+/* Live/peak bytes per PimMemType, allocation counters and rate since the last reset. */
+py::dict PimGetBoStats();
+
+/* One entry per bo which has been created but not yet destroyed. */
+py::list PimGetBoLeakReport();
+
+/* Resets peak usage and allocation counters. Live bo records are kept. */
+void PimResetBoStats();
+
+/* Prints live bo's grouped by call site and forgets them, used on PimDeinitialize. */
+void PimReportAndClearBoLeaks();
+
+#endif
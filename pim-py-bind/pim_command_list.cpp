@@ -0,0 +1,176 @@
+/*
+Copyright (C) 2021 Samsung Electronics Co. LTD
+
+This software is a property of Samsung Electronics.
+No part of this software, either material or conceptual may be copied or distributed, transmitted,
+transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+electronic, mechanical, manual or otherwise, or disclosed
+to third parties without the express written permission of Samsung Electronics.
+(Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+*/
+
+#include "pim_command_list.h"
+#include <stdexcept>
+#include <string>
+
+namespace
+{
+void* ToPtr(uintptr_t ptr) { return (ptr == 0) ? nullptr : (void*)ptr; }
+
+void Check(int ret, const char* what)
+{
+    if (ret != 0) throw std::runtime_error(std::string(what) + " failed with status " + std::to_string(ret));
+}
+}  // namespace
+
+PimCommandList::~PimCommandList()
+{
+    for (PimBo* bo : bos_) PimDestroyBo(bo);
+    for (PimGemmDesc* desc : gemm_descs_) PimDestroyGemmDesc(desc);
+}
+
+int PimCommandList::AddSlot(uintptr_t base, size_t nbytes)
+{
+    slots_.push_back({base, nbytes});
+    return (int)slots_.size() - 1;
+}
+
+PimBo* PimCommandList::Keep(PimBo* bo)
+{
+    if (bo == nullptr) throw std::runtime_error("PimCreateBo failed");
+    bos_.push_back(bo);
+    return bo;
+}
+
+/* keeps a bo over a device pointer and remembers it for patching if the pointer lies in a slot */
+PimBo* PimCommandList::DeviceBo(PimBo* bo, uintptr_t ptr)
+{
+    Keep(bo);
+    if (ptr == 0) return bo;
+    for (size_t i = 0; i < slots_.size(); i++) {
+        if (ptr >= slots_[i].base && ptr < slots_[i].base + slots_[i].nbytes) {
+            patches_.push_back({bo, (int)i, ptr - slots_[i].base});
+            break;
+        }
+    }
+    return bo;
+}
+
+void PimCommandList::Issue(const Command& cmd)
+{
+    switch (cmd.type) {
+        case CMD_GEMM:
+            Check(PimExecuteGemm(cmd.out, cmd.in1, cmd.in2, cmd.bias, cmd.act, cmd.gemm_order, cmd.stream, cmd.block),
+                  "PimExecuteGemm");
+            break;
+        case CMD_ADD:
+            Check(PimExecuteAdd(cmd.out, cmd.in1, cmd.in2, cmd.stream, cmd.block), "PimExecuteAdd");
+            break;
+        case CMD_MUL:
+            Check(PimExecuteMul(cmd.out, cmd.in1, cmd.in2, cmd.stream, cmd.block), "PimExecuteMul");
+            break;
+        case CMD_RELU:
+            Check(PimExecuteRelu(cmd.out, cmd.in1, cmd.stream, cmd.block), "PimExecuteRelu");
+            break;
+        case CMD_COPY:
+            Check(PimCopyMemory(cmd.out, cmd.in1, cmd.copy_type), "PimCopyMemory");
+            break;
+    }
+}
+
+void PimCommandList::Record(const Command& cmd)
+{
+    Issue(cmd);
+    commands_.push_back(cmd);
+}
+
+void PimCommandList::RecordDense(uintptr_t out_ptr, uintptr_t in_ptr, uintptr_t w_ptr, uintptr_t bias_ptr, int n,
+                                 int c, int h, int in_w, int out_w, PimActFunc act, PimGemmOrder gemm_order,
+                                 bool transposed, uintptr_t stream, bool block)
+{
+    PimGemmDesc* desc = PimCreateGemmDesc(n, c, h, in_w, h, out_w, PIM_FP16, gemm_order);
+    if (desc == nullptr) throw std::runtime_error("PimCreateGemmDesc failed");
+    gemm_descs_.push_back(desc);
+
+    Command cmd{CMD_GEMM};
+    cmd.in1 = DeviceBo(PimCreateBo(desc, MEM_TYPE_DEVICE, GEMM_INPUT, ToPtr(in_ptr), false), in_ptr);
+    cmd.in2 = DeviceBo(PimCreateBo(desc, MEM_TYPE_DEVICE, GEMM_WEIGHT, ToPtr(w_ptr), transposed), w_ptr);
+    if (bias_ptr != 0)
+        cmd.bias = DeviceBo(PimCreateBo(desc, MEM_TYPE_DEVICE, GEMM_BIAS, ToPtr(bias_ptr), false), bias_ptr);
+    cmd.out = DeviceBo(PimCreateBo(desc, MEM_TYPE_DEVICE, GEMM_OUTPUT, ToPtr(out_ptr), false), out_ptr);
+    cmd.act = act;
+    cmd.gemm_order = gemm_order;
+    cmd.stream = ToPtr(stream);
+    cmd.block = block;
+    Record(cmd);
+}
+
+void PimCommandList::RecordEltwise(uintptr_t out_ptr, uintptr_t in1_ptr, uintptr_t in2_ptr, int length, PimOpType op,
+                                   uintptr_t stream, bool block)
+{
+    if (op != OP_ELT_ADD && op != OP_ELT_MUL) throw std::invalid_argument("op must be OP_ELT_ADD or OP_ELT_MUL");
+
+    PimBo* dev_input1 = DeviceBo(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_DEVICE, ToPtr(in1_ptr)), in1_ptr);
+    PimBo* dev_input2 = DeviceBo(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_DEVICE, ToPtr(in2_ptr)), in2_ptr);
+    PimBo* dev_output = DeviceBo(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_DEVICE, ToPtr(out_ptr)), out_ptr);
+    PimBo* pim_input1 = Keep(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_PIM));
+    PimBo* pim_input2 = Keep(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_PIM));
+    PimBo* pim_output = Keep(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_PIM));
+
+    Command copy{CMD_COPY};
+    copy.copy_type = DEVICE_TO_PIM;
+    copy.out = pim_input1;
+    copy.in1 = dev_input1;
+    Record(copy);
+    copy.out = pim_input2;
+    copy.in1 = dev_input2;
+    Record(copy);
+
+    Command cmd{op == OP_ELT_ADD ? CMD_ADD : CMD_MUL};
+    cmd.out = pim_output;
+    cmd.in1 = pim_input1;
+    cmd.in2 = pim_input2;
+    cmd.stream = ToPtr(stream);
+    cmd.block = block;
+    Record(cmd);
+
+    copy.copy_type = PIM_TO_DEVICE;
+    copy.out = dev_output;
+    copy.in1 = pim_output;
+    Record(copy);
+}
+
+void PimCommandList::RecordRelu(uintptr_t out_ptr, uintptr_t in_ptr, int length, uintptr_t stream, bool block)
+{
+    PimBo* dev_input = DeviceBo(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_DEVICE, ToPtr(in_ptr)), in_ptr);
+    PimBo* dev_output = DeviceBo(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_DEVICE, ToPtr(out_ptr)), out_ptr);
+    PimBo* pim_input = Keep(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_PIM));
+    PimBo* pim_output = Keep(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_PIM));
+
+    Command copy{CMD_COPY};
+    copy.copy_type = DEVICE_TO_PIM;
+    copy.out = pim_input;
+    copy.in1 = dev_input;
+    Record(copy);
+
+    Command cmd{CMD_RELU};
+    cmd.out = pim_output;
+    cmd.in1 = pim_input;
+    cmd.stream = ToPtr(stream);
+    cmd.block = block;
+    Record(cmd);
+
+    copy.copy_type = PIM_TO_DEVICE;
+    copy.out = dev_output;
+    copy.in1 = pim_output;
+    Record(copy);
+}
+
+void PimCommandList::Replay(const std::vector<uintptr_t>& bases)
+{
+    if (bases.size() != slots_.size())
+        throw std::invalid_argument("Expected " + std::to_string(slots_.size()) + " slot addresses, got " +
+                                    std::to_string(bases.size()));
+    for (const Patch& patch : patches_) patch.bo->data = (void*)(bases[patch.slot] + patch.offset);
+    for (const Command& cmd : commands_) Issue(cmd);
+}
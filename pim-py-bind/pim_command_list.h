@@ -0,0 +1,91 @@
+/*
+Copyright (C) 2021 Samsung Electronics Co. LTD
+
+This software is a property of Samsung Electronics.
+No part of this software, either material or conceptual may be copied or distributed, transmitted,
+transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+electronic, mechanical, manual or otherwise, or disclosed
+to third parties without the express written permission of Samsung Electronics.
+(Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+*/
+
+#ifndef _PIM_COMMAND_LIST_H_
+#define _PIM_COMMAND_LIST_H_
+
+#include <pim_runtime_api.h>
+#include <cstdint>
+#include <vector>
+
+/* Recorded sequence of custom op executions which can be re-issued in one call.
+ *
+ * Descriptors and bo's are created once while recording and kept until the list
+ * is destroyed. Device pointers inside a registered slot are stored relative to
+ * the slot, Replay() moves them to new slot base addresses by patching the data
+ * pointer of the affected bo's. All other pointers are replayed unchanged.
+ * Record and Replay throw std::runtime_error on failure. */
+class PimCommandList
+{
+   public:
+    PimCommandList() = default;
+    PimCommandList(const PimCommandList&) = delete;
+    PimCommandList& operator=(const PimCommandList&) = delete;
+    ~PimCommandList();
+
+    /* Registers [base, base + nbytes) as patchable slot, returns the slot index */
+    int AddSlot(uintptr_t base, size_t nbytes);
+
+    /* Record and execute, arguments as PimDenseForward/PimEltwiseForward/PimReluForward */
+    void RecordDense(uintptr_t out_ptr, uintptr_t in_ptr, uintptr_t w_ptr, uintptr_t bias_ptr, int n, int c, int h,
+                     int in_w, int out_w, PimActFunc act, PimGemmOrder gemm_order, bool transposed, uintptr_t stream,
+                     bool block);
+    void RecordEltwise(uintptr_t out_ptr, uintptr_t in1_ptr, uintptr_t in2_ptr, int length, PimOpType op,
+                       uintptr_t stream, bool block);
+    void RecordRelu(uintptr_t out_ptr, uintptr_t in_ptr, int length, uintptr_t stream, bool block);
+
+    /* Re-issues every command with slot i moved to bases[i] */
+    void Replay(const std::vector<uintptr_t>& bases);
+
+    size_t NumCommands() const { return commands_.size(); }
+    size_t NumSlots() const { return slots_.size(); }
+    size_t NumPatches() const { return patches_.size(); }
+
+   private:
+    enum CommandType { CMD_GEMM, CMD_ADD, CMD_MUL, CMD_RELU, CMD_COPY };
+
+    struct Command {
+        CommandType type;
+        PimBo* out;
+        PimBo* in1;
+        PimBo* in2;
+        PimBo* bias;
+        PimActFunc act;
+        PimGemmOrder gemm_order;
+        PimMemCpyType copy_type;
+        void* stream;
+        bool block;
+    };
+
+    struct Slot {
+        uintptr_t base;
+        size_t nbytes;
+    };
+
+    struct Patch {
+        PimBo* bo;
+        int slot;
+        size_t offset;
+    };
+
+    PimBo* Keep(PimBo* bo);
+    PimBo* DeviceBo(PimBo* bo, uintptr_t ptr);
+    void Issue(const Command& cmd);
+    void Record(const Command& cmd);
+
+    std::vector<Command> commands_;
+    std::vector<Slot> slots_;
+    std::vector<Patch> patches_;
+    std::vector<PimBo*> bos_;
+    std::vector<PimGemmDesc*> gemm_descs_;
+};
+
+#endif
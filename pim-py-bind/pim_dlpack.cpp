@@ -0,0 +1,120 @@
+/*
+Copyright (C) 2021 Samsung Electronics Co. LTD
+
+This software is a property of Samsung Electronics.
+No part of this software, either material or conceptual may be copied or distributed, transmitted,
+transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+electronic, mechanical, manual or otherwise, or disclosed
+to third parties without the express written permission of Samsung Electronics.
+(Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+*/
+
+#include "pim_dlpack.h"
+
+namespace
+{
+struct PimDLPackContext {
+    DLManagedTensor tensor;
+    int64_t shape[4];
+    int64_t strides[4];
+    PyObject* owner;
+};
+
+void DeletePimDLPackContext(DLManagedTensor* self)
+{
+    auto* ctx = static_cast<PimDLPackContext*>(self->manager_ctx);
+    {
+        py::gil_scoped_acquire gil;
+        Py_XDECREF(ctx->owner);
+    }
+    delete ctx;
+}
+
+void DeleteDLPackCapsule(PyObject* capsule)
+{
+    /* a consumer renames the capsule to "used_dltensor" and takes over the deleter */
+    if (!PyCapsule_IsValid(capsule, "dltensor")) return;
+    auto* tensor = static_cast<DLManagedTensor*>(PyCapsule_GetPointer(capsule, "dltensor"));
+    if (tensor != nullptr && tensor->deleter != nullptr) tensor->deleter(tensor);
+}
+}  // namespace
+
+void PimBoLayout(PimBo* bo, int64_t shape[4], int64_t strides[4])
+{
+    shape[0] = bo->bshape.n;
+    shape[1] = bo->bshape.c;
+    shape[2] = bo->bshape.h;
+    shape[3] = bo->bshape.w;
+    if (bo->transposed) {
+        strides[2] = 1;
+        strides[3] = shape[2];
+    } else {
+        strides[3] = 1;
+        strides[2] = shape[3];
+    }
+    strides[1] = shape[2] * shape[3];
+    strides[0] = shape[1] * strides[1];
+}
+
+py::tuple PimBoDLPackDevice(PimBo* bo)
+{
+    switch (bo->mem_type) {
+        case MEM_TYPE_HOST:
+            return py::make_tuple((int)kDLCPU, 0);
+        case MEM_TYPE_DEVICE: {
+            unsigned int device_id = 0;
+            PimGetDevice(&device_id);
+            return py::make_tuple((int)kDLROCM, device_id);
+        }
+        default:
+            throw py::value_error("PIM memory bo can not be exported through DLPack, copy it to device first");
+    }
+}
+
+py::capsule PimBoToDLPack(PimBo* bo, py::object owner)
+{
+    py::tuple device = PimBoDLPackDevice(bo);
+
+    auto* ctx = new PimDLPackContext();
+    PimBoLayout(bo, ctx->shape, ctx->strides);
+    ctx->owner = owner.inc_ref().ptr();
+
+    DLTensor& t = ctx->tensor.dl_tensor;
+    t.data = bo->data;
+    t.device.device_type = device[0].cast<int32_t>();
+    t.device.device_id = device[1].cast<int32_t>();
+    t.ndim = 4;
+    if (bo->precision == PIM_INT8)
+        t.dtype = {kDLInt, 8, 1};
+    else
+        t.dtype = {kDLFloat, 16, 1};
+    t.shape = ctx->shape;
+    t.strides = ctx->strides;
+    t.byte_offset = 0;
+    ctx->tensor.manager_ctx = ctx;
+    ctx->tensor.deleter = DeletePimDLPackContext;
+
+    return py::reinterpret_steal<py::capsule>(PyCapsule_New(&ctx->tensor, "dltensor", DeleteDLPackCapsule));
+}
+
+py::dict PimDLPackInfo(py::capsule capsule)
+{
+    if (!PyCapsule_IsValid(capsule.ptr(), "dltensor"))
+        throw py::value_error("Expected an unconsumed \"dltensor\" capsule");
+    auto* tensor = static_cast<DLManagedTensor*>(PyCapsule_GetPointer(capsule.ptr(), "dltensor"));
+    const DLTensor& t = tensor->dl_tensor;
+
+    py::list shape, strides;
+    for (int i = 0; i < t.ndim; i++) {
+        shape.append(t.shape[i]);
+        if (t.strides != nullptr) strides.append(t.strides[i]);
+    }
+
+    py::dict info;
+    info["data"] = reinterpret_cast<uintptr_t>(t.data) + t.byte_offset;
+    info["shape"] = py::tuple(shape);
+    info["strides"] = t.strides != nullptr ? py::object(py::tuple(strides)) : py::object(py::none());
+    info["dtype"] = py::make_tuple((int)t.dtype.code, (int)t.dtype.bits, (int)t.dtype.lanes);
+    info["device"] = py::make_tuple((int)t.device.device_type, (int)t.device.device_id);
+    return info;
+}
@@ -0,0 +1,64 @@
+/*
+Copyright (C) 2021 Samsung Electronics Co. LTD
+
+This software is a property of Samsung Electronics.
+No part of this software, either material or conceptual may be copied or distributed, transmitted,
+transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+electronic, mechanical, manual or otherwise, or disclosed
+to third parties without the express written permission of Samsung Electronics.
+(Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+*/
+
+#ifndef _PIM_DLPACK_H_
+#define _PIM_DLPACK_H_
+
+#include <pim_runtime_api.h>
+#include <pybind11/pybind11.h>
+#include <cstdint>
+
+namespace py = pybind11;
+
+/* Subset of the DLPack ABI (dlpack.h v0.6) needed to exchange tensors with other frameworks */
+typedef enum { kDLCPU = 1, kDLCUDA = 2, kDLCUDAHost = 3, kDLROCM = 10, kDLROCMHost = 11 } DLDeviceType;
+typedef enum { kDLInt = 0, kDLUInt = 1, kDLFloat = 2 } DLDataTypeCode;
+
+typedef struct {
+    int32_t device_type;
+    int32_t device_id;
+} DLDevice;
+
+typedef struct {
+    uint8_t code;
+    uint8_t bits;
+    uint16_t lanes;
+} DLDataType;
+
+typedef struct {
+    void* data;
+    DLDevice device;
+    int32_t ndim;
+    DLDataType dtype;
+    int64_t* shape;
+    int64_t* strides;
+    uint64_t byte_offset;
+} DLTensor;
+
+typedef struct DLManagedTensor {
+    DLTensor dl_tensor;
+    void* manager_ctx;
+    void (*deleter)(struct DLManagedTensor* self);
+} DLManagedTensor;
+
+/* NCHW shape and element strides of a bo, transposed bo's store each h x w matrix column-major */
+void PimBoLayout(PimBo* bo, int64_t shape[4], int64_t strides[4]);
+
+/* Exports a host or device bo as a "dltensor" capsule. owner is kept alive until the consumer releases it. */
+py::capsule PimBoToDLPack(PimBo* bo, py::object owner);
+
+/* (device_type, device_id) of a bo as defined by the __dlpack_device__ protocol */
+py::tuple PimBoDLPackDevice(PimBo* bo);
+
+/* Reads data pointer, shape, strides, dtype and device of a "dltensor" capsule without consuming it */
+py::dict PimDLPackInfo(py::capsule capsule);
+
+#endif
@@ -0,0 +1,134 @@
+/*
+Copyright (C) 2021 Samsung Electronics Co. LTD
+
+This software is a property of Samsung Electronics.
+No part of this software, either material or conceptual may be copied or distributed, transmitted,
+transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+electronic, mechanical, manual or otherwise, or disclosed
+to third parties without the express written permission of Samsung Electronics.
+(Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+*/
+
+#include "pim_fast_path.h"
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+namespace
+{
+void* ToPtr(uintptr_t ptr) { return (ptr == 0) ? nullptr : (void*)ptr; }
+
+/* destroys every bo and descriptor it was handed on scope exit */
+class PimScope
+{
+   public:
+    ~PimScope()
+    {
+        for (PimBo* bo : bos_) PimDestroyBo(bo);
+        if (gemm_desc_ != nullptr) PimDestroyGemmDesc(gemm_desc_);
+    }
+
+    PimBo* Add(PimBo* bo)
+    {
+        if (bo == nullptr) throw std::runtime_error("PimCreateBo failed");
+        bos_.push_back(bo);
+        return bo;
+    }
+
+    PimGemmDesc* Add(PimGemmDesc* desc)
+    {
+        if (desc == nullptr) throw std::runtime_error("PimCreateGemmDesc failed");
+        gemm_desc_ = desc;
+        return desc;
+    }
+
+   private:
+    std::vector<PimBo*> bos_;
+    PimGemmDesc* gemm_desc_ = nullptr;
+};
+
+void Check(int ret, const char* what)
+{
+    if (ret != 0) throw std::runtime_error(std::string(what) + " failed with status " + std::to_string(ret));
+}
+}  // namespace
+
+int PimDenseForward(uintptr_t out_ptr, uintptr_t in_ptr, uintptr_t w_ptr, uintptr_t bias_ptr, int n, int c, int h,
+                    int in_w, int out_w, PimActFunc act, PimGemmOrder gemm_order, bool transposed, uintptr_t stream,
+                    bool block)
+{
+    PimScope scope;
+    PimGemmDesc* desc = scope.Add(PimCreateGemmDesc(n, c, h, in_w, h, out_w, PIM_FP16, gemm_order));
+    PimBo* input = scope.Add(PimCreateBo(desc, MEM_TYPE_DEVICE, GEMM_INPUT, ToPtr(in_ptr), false));
+    PimBo* weight = scope.Add(PimCreateBo(desc, MEM_TYPE_DEVICE, GEMM_WEIGHT, ToPtr(w_ptr), transposed));
+    PimBo* output = scope.Add(PimCreateBo(desc, MEM_TYPE_DEVICE, GEMM_OUTPUT, ToPtr(out_ptr), false));
+    /* without a bias pointer the runtime would allocate an uninitialized bias buffer and add it */
+    PimBo* bias = nullptr;
+    if (bias_ptr != 0) bias = scope.Add(PimCreateBo(desc, MEM_TYPE_DEVICE, GEMM_BIAS, ToPtr(bias_ptr), false));
+    Check(PimExecuteGemm(output, input, weight, bias, act, gemm_order, ToPtr(stream), block), "PimExecuteGemm");
+    return 0;
+}
+
+int PimEltwiseForward(uintptr_t out_ptr, uintptr_t in1_ptr, uintptr_t in2_ptr, int length, PimOpType op,
+                      uintptr_t stream, bool block)
+{
+    if (op != OP_ELT_ADD && op != OP_ELT_MUL) throw std::invalid_argument("op must be OP_ELT_ADD or OP_ELT_MUL");
+
+    PimScope scope;
+    PimBo* dev_input1 = scope.Add(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_DEVICE, ToPtr(in1_ptr)));
+    PimBo* dev_input2 = scope.Add(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_DEVICE, ToPtr(in2_ptr)));
+    PimBo* dev_output = scope.Add(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_DEVICE, ToPtr(out_ptr)));
+    PimBo* pim_input1 = scope.Add(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_PIM));
+    PimBo* pim_input2 = scope.Add(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_PIM));
+    PimBo* pim_output = scope.Add(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_PIM));
+
+    Check(PimCopyMemory(pim_input1, dev_input1, DEVICE_TO_PIM), "PimCopyMemory");
+    Check(PimCopyMemory(pim_input2, dev_input2, DEVICE_TO_PIM), "PimCopyMemory");
+    if (op == OP_ELT_ADD)
+        Check(PimExecuteAdd(pim_output, pim_input1, pim_input2, ToPtr(stream), block), "PimExecuteAdd");
+    else
+        Check(PimExecuteMul(pim_output, pim_input1, pim_input2, ToPtr(stream), block), "PimExecuteMul");
+    Check(PimCopyMemory(dev_output, pim_output, PIM_TO_DEVICE), "PimCopyMemory");
+    return 0;
+}
+
+int PimReluForward(uintptr_t out_ptr, uintptr_t in_ptr, int length, uintptr_t stream, bool block)
+{
+    PimScope scope;
+    PimBo* dev_input = scope.Add(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_DEVICE, ToPtr(in_ptr)));
+    PimBo* dev_output = scope.Add(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_DEVICE, ToPtr(out_ptr)));
+    PimBo* pim_input = scope.Add(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_PIM));
+    PimBo* pim_output = scope.Add(PimCreateBo(1, 1, 1, length, PIM_FP16, MEM_TYPE_PIM));
+
+    Check(PimCopyMemory(pim_input, dev_input, DEVICE_TO_PIM), "PimCopyMemory");
+    Check(PimExecuteRelu(pim_output, pim_input, ToPtr(stream), block), "PimExecuteRelu");
+    Check(PimCopyMemory(dev_output, pim_output, PIM_TO_DEVICE), "PimCopyMemory");
+    return 0;
+}
+
+int PimBatchNormForward(uintptr_t out_ptr, uintptr_t in_ptr, int n, int c, int h, int w, uintptr_t beta_ptr,
+                        uintptr_t gamma_ptr, uintptr_t mean_ptr, uintptr_t var_ptr, double epsilon, uintptr_t stream,
+                        bool block)
+{
+    PimScope scope;
+    PimBo* dev_input = scope.Add(PimCreateBo(n, c, h, w, PIM_FP16, MEM_TYPE_DEVICE, ToPtr(in_ptr)));
+    PimBo* dev_output = scope.Add(PimCreateBo(n, c, h, w, PIM_FP16, MEM_TYPE_DEVICE, ToPtr(out_ptr)));
+    PimBo* pim_input = scope.Add(PimCreateBo(n, c, h, w, PIM_FP16, MEM_TYPE_PIM));
+    PimBo* pim_output = scope.Add(PimCreateBo(n, c, h, w, PIM_FP16, MEM_TYPE_PIM));
+    PimBo* beta = scope.Add(PimCreateBo(1, c, 1, 1, PIM_FP16, MEM_TYPE_HOST, ToPtr(beta_ptr)));
+    PimBo* gamma = scope.Add(PimCreateBo(1, c, 1, 1, PIM_FP16, MEM_TYPE_HOST, ToPtr(gamma_ptr)));
+    PimBo* mean = scope.Add(PimCreateBo(1, c, 1, 1, PIM_FP16, MEM_TYPE_HOST, ToPtr(mean_ptr)));
+    PimBo* variance = scope.Add(PimCreateBo(1, c, 1, 1, PIM_FP16, MEM_TYPE_HOST, ToPtr(var_ptr)));
+
+    Check(PimCopyMemory(pim_input, dev_input, DEVICE_TO_PIM), "PimCopyMemory");
+    Check(PimExecuteBN(pim_output, pim_input, beta, gamma, mean, variance, epsilon, ToPtr(stream), block),
+          "PimExecuteBN");
+    Check(PimCopyMemory(dev_output, pim_output, PIM_TO_DEVICE), "PimCopyMemory");
+    return 0;
+}
+
+int PimCopyForward(uintptr_t dst_ptr, uintptr_t src_ptr, size_t nbytes, PimMemCpyType type)
+{
+    Check(PimCopyMemory(ToPtr(dst_ptr), ToPtr(src_ptr), nbytes, type), "PimCopyMemory");
+    return 0;
+}
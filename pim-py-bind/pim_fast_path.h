@@ -0,0 +1,38 @@
+/*
+Copyright (C) 2021 Samsung Electronics Co. LTD
+
+This software is a property of Samsung Electronics.
+No part of this software, either material or conceptual may be copied or distributed, transmitted,
+transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+electronic, mechanical, manual or otherwise, or disclosed
+to third parties without the express written permission of Samsung Electronics.
+(Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+*/
+
+#ifndef _PIM_FAST_PATH_H_
+#define _PIM_FAST_PATH_H_
+
+#include <pim_runtime_api.h>
+#include <cstdint>
+
+/* Complete create/execute/destroy sequences of the custom ops in one call.
+ * Pointers are device addresses, a zero bias pointer means no bias.
+ * They run without the GIL and throw std::runtime_error on failure. */
+
+int PimDenseForward(uintptr_t out_ptr, uintptr_t in_ptr, uintptr_t w_ptr, uintptr_t bias_ptr, int n, int c, int h,
+                    int in_w, int out_w, PimActFunc act, PimGemmOrder gemm_order, bool transposed, uintptr_t stream,
+                    bool block);
+
+int PimEltwiseForward(uintptr_t out_ptr, uintptr_t in1_ptr, uintptr_t in2_ptr, int length, PimOpType op,
+                      uintptr_t stream, bool block);
+
+int PimReluForward(uintptr_t out_ptr, uintptr_t in_ptr, int length, uintptr_t stream, bool block);
+
+/* Batch norm of an (n, c, h, w) device tensor, the per-channel parameters are c element host arrays */
+int PimBatchNormForward(uintptr_t out_ptr, uintptr_t in_ptr, int n, int c, int h, int w, uintptr_t beta_ptr,
+                        uintptr_t gamma_ptr, uintptr_t mean_ptr, uintptr_t var_ptr, double epsilon, uintptr_t stream,
+                        bool block);
+
+int PimCopyForward(uintptr_t dst_ptr, uintptr_t src_ptr, size_t nbytes, PimMemCpyType type);
+
+#endif
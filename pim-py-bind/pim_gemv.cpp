@@ -0,0 +1,79 @@
+/*
+Copyright (C) 2021 Samsung Electronics Co. LTD
+
+This software is a property of Samsung Electronics.
+No part of this software, either material or conceptual may be copied or distributed, transmitted,
+transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+electronic, mechanical, manual or otherwise, or disclosed
+to third parties without the express written permission of Samsung Electronics.
+(Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+*/
+
+#include "pim_gemv.h"
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+namespace
+{
+void* ToPtr(uintptr_t ptr) { return (ptr == 0) ? nullptr : (void*)ptr; }
+
+void Check(int ret, const char* what)
+{
+    if (ret != 0) throw std::runtime_error(std::string(what) + " failed with status " + std::to_string(ret));
+}
+
+/* destroys the per call bo's on scope exit */
+class BoScope
+{
+   public:
+    ~BoScope()
+    {
+        for (PimBo* bo : bos_) PimDestroyBo(bo);
+    }
+
+    PimBo* Add(PimBo* bo)
+    {
+        if (bo == nullptr) throw std::runtime_error("PimCreateBo failed");
+        bos_.push_back(bo);
+        return bo;
+    }
+
+   private:
+    std::vector<PimBo*> bos_;
+};
+}  // namespace
+
+PimGemvWeight::PimGemvWeight(uintptr_t w_ptr, int in_w, int out_w, bool transposed, PimGemmOrder gemm_order)
+    : in_w_(in_w), out_w_(out_w), gemm_order_(gemm_order)
+{
+    desc_ = PimCreateGemmDesc(1, 1, 1, in_w, 1, out_w, PIM_FP16, gemm_order);
+    if (desc_ == nullptr) throw std::runtime_error("PimCreateGemmDesc failed");
+
+    PimBo* source = PimCreateBo(desc_, MEM_TYPE_DEVICE, GEMM_WEIGHT, ToPtr(w_ptr), transposed);
+    if (source != nullptr) {
+        weight_ = PimConvertGemmWeight(source, gemm_order);
+        PimDestroyBo(source);
+    }
+    if (weight_ == nullptr) {
+        PimDestroyGemmDesc(desc_);
+        throw std::runtime_error("PimConvertGemmWeight failed");
+    }
+}
+
+PimGemvWeight::~PimGemvWeight()
+{
+    PimDestroyBo(weight_);
+    PimDestroyGemmDesc(desc_);
+}
+
+void PimGemvWeight::Forward(uintptr_t out_ptr, uintptr_t in_ptr, uintptr_t bias_ptr, PimActFunc act,
+                            uintptr_t stream, bool block)
+{
+    BoScope scope;
+    PimBo* input = scope.Add(PimCreateBo(desc_, MEM_TYPE_DEVICE, GEMM_INPUT, ToPtr(in_ptr), false));
+    PimBo* output = scope.Add(PimCreateBo(desc_, MEM_TYPE_DEVICE, GEMM_OUTPUT, ToPtr(out_ptr), false));
+    PimBo* bias = nullptr;
+    if (bias_ptr != 0) bias = scope.Add(PimCreateBo(desc_, MEM_TYPE_DEVICE, GEMM_BIAS, ToPtr(bias_ptr), false));
+    Check(PimExecuteGemm(output, input, weight_, bias, act, gemm_order_, ToPtr(stream), block), "PimExecuteGemm");
+}
@@ -0,0 +1,47 @@
+/*
+Copyright (C) 2021 Samsung Electronics Co. LTD
+
+This software is a property of Samsung Electronics.
+No part of this software, either material or conceptual may be copied or distributed, transmitted,
+transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+electronic, mechanical, manual or otherwise, or disclosed
+to third parties without the express written permission of Samsung Electronics.
+(Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+*/
+
+#ifndef _PIM_GEMV_H_
+#define _PIM_GEMV_H_
+
+#include <pim_runtime_api.h>
+#include <cstdint>
+
+/* Weight of a single row gemm, converted once into the runtime's aligned layout.
+ *
+ * The (1, 1, 1, in_w) x (in_w, out_w) descriptor and the converted weight are
+ * kept for the lifetime of the object, Forward() only wraps the input, output
+ * and bias pointers. The source weight is copied on construction, later
+ * changes to it are not seen. Throws std::runtime_error on failure. */
+class PimGemvWeight
+{
+   public:
+    PimGemvWeight(uintptr_t w_ptr, int in_w, int out_w, bool transposed, PimGemmOrder gemm_order);
+    PimGemvWeight(const PimGemvWeight&) = delete;
+    PimGemvWeight& operator=(const PimGemvWeight&) = delete;
+    ~PimGemvWeight();
+
+    /* out = act(in x weight + bias), a zero bias pointer skips the bias */
+    void Forward(uintptr_t out_ptr, uintptr_t in_ptr, uintptr_t bias_ptr, PimActFunc act, uintptr_t stream,
+                 bool block);
+
+    int InW() const { return in_w_; }
+    int OutW() const { return out_w_; }
+
+   private:
+    int in_w_;
+    int out_w_;
+    PimGemmOrder gemm_order_;
+    PimGemmDesc* desc_ = nullptr;
+    PimBo* weight_ = nullptr;
+};
+
+#endif
@@ -0,0 +1,207 @@
+/*
+Copyright (C) 2021 Samsung Electronics Co. LTD
+
+This software is a property of Samsung Electronics.
+No part of this software, either material or conceptual may be copied or distributed, transmitted,
+transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+electronic, mechanical, manual or otherwise, or disclosed
+to third parties without the express written permission of Samsung Electronics.
+(Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+*/
+
+#include "pim_host_convert.h"
+#include <algorithm>
+#include <cmath>
+#include <cstring>
+#include <mutex>
+#include <stdexcept>
+#include <thread>
+
+namespace
+{
+/* elements per thread below which splitting further does not pay off */
+const size_t kGrain = 1 << 16;
+const size_t kTile = 64;
+
+/* fn(begin, end) over [0, count) split into one contiguous range per thread */
+template <typename F>
+void ParallelFor(size_t count, size_t grain, int threads, F fn)
+{
+    size_t workers = threads > 0 ? threads : std::max(1u, std::thread::hardware_concurrency());
+    workers = std::max<size_t>(1, std::min(workers, (count + grain - 1) / grain));
+    if (workers == 1) {
+        if (count > 0) fn(0, count);
+        return;
+    }
+    size_t chunk = (count + workers - 1) / workers;
+    std::vector<std::thread> pool;
+    for (size_t begin = chunk; begin < count; begin += chunk) {
+        pool.emplace_back(fn, begin, std::min(count, begin + chunk));
+    }
+    fn(0, chunk);
+    for (auto& thread : pool) thread.join();
+}
+
+uint32_t Bits(float value)
+{
+    uint32_t bits;
+    std::memcpy(&bits, &value, sizeof(bits));
+    return bits;
+}
+
+float FromBits(uint32_t bits)
+{
+    float value;
+    std::memcpy(&value, &bits, sizeof(value));
+    return value;
+}
+
+uint16_t FloatToHalf(float value)
+{
+    const uint32_t f16_max = (127 + 16) << 23;
+    const uint32_t denorm_magic = ((127 - 15) + (23 - 10) + 1) << 23;
+    uint32_t bits = Bits(value);
+    uint32_t sign = (bits >> 16) & 0x8000;
+    bits &= 0x7fffffff;
+
+    uint16_t half;
+    if (bits >= f16_max) {
+        // inf, or nan kept quiet
+        half = bits > 0x7f800000 ? 0x7e00 : 0x7c00;
+    } else if (bits < (113 << 23)) {
+        // subnormal or zero, the fp32 addition rounds to nearest even
+        half = static_cast<uint16_t>(Bits(FromBits(bits) + FromBits(denorm_magic)) - denorm_magic);
+    } else {
+        uint32_t mantissa_odd = (bits >> 13) & 1;
+        bits += (static_cast<uint32_t>(15 - 127) << 23) + 0xfff + mantissa_odd;
+        half = static_cast<uint16_t>(bits >> 13);
+    }
+    return half | sign;
+}
+
+uint16_t HalfAt(const void* src, size_t index, bool src_fp32)
+{
+    if (src_fp32) return FloatToHalf(static_cast<const float*>(src)[index]);
+    return static_cast<const uint16_t*>(src)[index];
+}
+
+template <typename T>
+void TransposeTiles(T* dst, const T* src, size_t batch, size_t rows, size_t cols, int threads)
+{
+    size_t row_tiles = (rows + kTile - 1) / kTile;
+    size_t grain = std::max<size_t>(1, kGrain / (kTile * std::max<size_t>(cols, 1)));
+    ParallelFor(batch * row_tiles, grain, threads, [=](size_t begin, size_t end) {
+        for (size_t unit = begin; unit < end; ++unit) {
+            size_t b = unit / row_tiles;
+            size_t r0 = (unit % row_tiles) * kTile;
+            size_t r1 = std::min(rows, r0 + kTile);
+            const T* in = src + b * rows * cols;
+            T* out = dst + b * rows * cols;
+            for (size_t c0 = 0; c0 < cols; c0 += kTile) {
+                size_t c1 = std::min(cols, c0 + kTile);
+                for (size_t r = r0; r < r1; ++r) {
+                    for (size_t c = c0; c < c1; ++c) out[c * rows + r] = in[r * cols + c];
+                }
+            }
+        }
+    });
+}
+}  // namespace
+
+void PimConvertFp32ToFp16(uintptr_t dst_ptr, uintptr_t src_ptr, size_t count, int threads)
+{
+    uint16_t* dst = reinterpret_cast<uint16_t*>(dst_ptr);
+    const float* src = reinterpret_cast<const float*>(src_ptr);
+    ParallelFor(count, kGrain, threads, [=](size_t begin, size_t end) {
+        for (size_t i = begin; i < end; ++i) dst[i] = FloatToHalf(src[i]);
+    });
+}
+
+float PimAbsMaxFp32(uintptr_t src_ptr, size_t count, int threads)
+{
+    const float* src = reinterpret_cast<const float*>(src_ptr);
+    float result = 0.0f;
+    std::mutex lock;
+    ParallelFor(count, kGrain, threads, [&](size_t begin, size_t end) {
+        float local = 0.0f;
+        for (size_t i = begin; i < end; ++i) local = std::max(local, std::fabs(src[i]));
+        std::lock_guard<std::mutex> guard(lock);
+        result = std::max(result, local);
+    });
+    return result;
+}
+
+void PimConvertFp32ToInt8(uintptr_t dst_ptr, uintptr_t src_ptr, size_t count, float scale, int threads)
+{
+    if (!(scale > 0.0f)) throw std::invalid_argument("int8 scale must be positive");
+    int8_t* dst = reinterpret_cast<int8_t*>(dst_ptr);
+    const float* src = reinterpret_cast<const float*>(src_ptr);
+    float inverse = 1.0f / scale;
+    ParallelFor(count, kGrain, threads, [=](size_t begin, size_t end) {
+        for (size_t i = begin; i < end; ++i) {
+            float value = std::nearbyint(src[i] * inverse);
+            if (std::isnan(value)) value = 0.0f;
+            dst[i] = static_cast<int8_t>(std::min(127.0f, std::max(-128.0f, value)));
+        }
+    });
+}
+
+void PimTranspose(uintptr_t dst_ptr, uintptr_t src_ptr, size_t batch, size_t rows, size_t cols, size_t elem_size,
+                  int threads)
+{
+    switch (elem_size) {
+        case 1:
+            TransposeTiles(reinterpret_cast<uint8_t*>(dst_ptr), reinterpret_cast<const uint8_t*>(src_ptr), batch,
+                           rows, cols, threads);
+            break;
+        case 2:
+            TransposeTiles(reinterpret_cast<uint16_t*>(dst_ptr), reinterpret_cast<const uint16_t*>(src_ptr), batch,
+                           rows, cols, threads);
+            break;
+        case 4:
+            TransposeTiles(reinterpret_cast<uint32_t*>(dst_ptr), reinterpret_cast<const uint32_t*>(src_ptr), batch,
+                           rows, cols, threads);
+            break;
+        default:
+            throw std::invalid_argument("elem_size must be 1, 2 or 4");
+    }
+}
+
+std::vector<uint32_t> PimPackedWeightShape(int n, int c, int in_w, int out_w, PimGemmOrder gemm_order)
+{
+    PimGemmDesc* desc = PimCreateGemmDesc(n, c, 1, in_w, 1, out_w, PIM_FP16, gemm_order);
+    if (desc == nullptr) throw std::runtime_error("PimCreateGemmDesc failed");
+    PimBShape shape = desc->wei_bshape;
+    PimDestroyGemmDesc(desc);
+    return {shape.n, shape.c, shape.h, shape.w};
+}
+
+void PimPackGemmWeight(uintptr_t dst_ptr, uintptr_t src_ptr, bool src_fp32, int n, int c, int in_w, int out_w,
+                       bool transposed, PimGemmOrder gemm_order, int threads)
+{
+    PimGemmDesc* desc = PimCreateGemmDesc(n, c, 1, in_w, 1, out_w, PIM_FP16, gemm_order);
+    if (desc == nullptr) throw std::runtime_error("PimCreateGemmDesc failed");
+    PimBShape padded = desc->wei_bshape;
+    PimBShape real = desc->wei_bshape_r;
+    PimDestroyGemmDesc(desc);
+
+    uint16_t* dst = reinterpret_cast<uint16_t*>(dst_ptr);
+    const void* src = reinterpret_cast<const void*>(src_ptr);
+    size_t rows = padded.h, cols = padded.w, real_rows = real.h, real_cols = real.w;
+    size_t matrices = static_cast<size_t>(padded.n) * padded.c;
+    size_t grain = std::max<size_t>(1, kGrain / std::max<size_t>(cols, 1));
+    ParallelFor(matrices * rows, grain, threads, [=](size_t begin, size_t end) {
+        for (size_t unit = begin; unit < end; ++unit) {
+            size_t m = unit / rows;
+            size_t r = unit % rows;
+            uint16_t* out = dst + unit * cols;
+            size_t valid = (r < real_rows) ? real_cols : 0;
+            size_t base = m * real_rows * real_cols;
+            for (size_t col = 0; col < valid; ++col) {
+                size_t index = transposed ? base + col * real_rows + r : base + r * real_cols + col;
+                out[col] = HalfAt(src, index, src_fp32);
+            }
+            std::fill(out + valid, out + cols, static_cast<uint16_t>(0));
+        }
+    });
+}
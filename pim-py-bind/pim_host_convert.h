@@ -0,0 +1,46 @@
+/*
+Copyright (C) 2021 Samsung Electronics Co. LTD
+
+This software is a property of Samsung Electronics.
+No part of this software, either material or conceptual may be copied or distributed, transmitted,
+transcribed, stored in a retrieval system, or translated into any human or computer language in any form by any means,
+electronic, mechanical, manual or otherwise, or disclosed
+to third parties without the express written permission of Samsung Electronics.
+(Use of the Software is restricted to non-commercial, personal or academic, research purpose only)
+*/
+
+#ifndef _PIM_HOST_CONVERT_H_
+#define _PIM_HOST_CONVERT_H_
+
+#include <pim_runtime_api.h>
+#include <cstddef>
+#include <cstdint>
+#include <vector>
+
+/* Host side weight preparation split over threads, threads == 0 uses all hardware threads.
+ * Pointers are host addresses of C-contiguous buffers, e.g. numpy arrays or memmaps; results
+ * are written straight into the destination. They run without the GIL. */
+
+/* fp32 -> fp16, round to nearest even */
+void PimConvertFp32ToFp16(uintptr_t dst_ptr, uintptr_t src_ptr, size_t count, int threads);
+
+/* largest absolute value of count fp32 values, e.g. for an int8 scale */
+float PimAbsMaxFp32(uintptr_t src_ptr, size_t count, int threads);
+
+/* fp32 -> int8 as round(src / scale) saturated to [-128, 127] */
+void PimConvertFp32ToInt8(uintptr_t dst_ptr, uintptr_t src_ptr, size_t count, float scale, int threads);
+
+/* batch (rows, cols) matrices of elem_size byte elements into (cols, rows) matrices */
+void PimTranspose(uintptr_t dst_ptr, uintptr_t src_ptr, size_t batch, size_t rows, size_t cols, size_t elem_size,
+                  int threads);
+
+/* (n, c, h, w) of the zero padded GEMM_WEIGHT buffer the runtime expects for the gemm */
+std::vector<uint32_t> PimPackedWeightShape(int n, int c, int in_w, int out_w, PimGemmOrder gemm_order);
+
+/* Writes a fp32 or fp16 weight with the unpadded GEMM_WEIGHT shape of the gemm, (n, c, in_w, out_w) for
+ * I_X_W, or its transpose if transposed, as fp16 into a zero padded buffer of PimPackedWeightShape.
+ * The result is the GEMM_WEIGHT input of PimExecuteGemm and PimConvertGemmWeight. */
+void PimPackGemmWeight(uintptr_t dst_ptr, uintptr_t src_ptr, bool src_fp32, int n, int c, int in_w, int out_w,
+                       bool transposed, PimGemmOrder gemm_order, int threads);
+
+#endif
@@ -14,25 +14,57 @@ to third parties without the express written permission of Samsung Electronics.
 #include <pybind11/numpy.h>
 #include <iostream>
 #include "half.hpp"
+#include "pim_bo_tracker.h"
+#include "pim_command_list.h"
+#include "pim_dlpack.h"
+#include "pim_fast_path.h"
+#include "pim_gemv.h"
+#include "pim_host_convert.h"
 
 namespace py = pybind11;
 
 PimBo* PyWrapperPimCreateBoNCHW(int n, int c, int h, int w, PimPrecision prec, PimMemType mem, uintptr_t usr_ptr, bool transposed)
 {
     void* user = (usr_ptr == 0) ? nullptr : (void*)usr_ptr;
-    return PimCreateBo(n, c, h, w, prec, mem, user, transposed);
+    PimBo* bo = PimCreateBo(n, c, h, w, prec, mem, user, transposed);
+    PimTrackBo(bo);
+    return bo;
 }
 
 PimBo* PyWrapperPimCreateBoDesc(PimDesc* desc, PimMemType mem, PimMemFlag mflag, uintptr_t usr_ptr, bool transposed)
 {
     void* user = (usr_ptr == 0) ? nullptr : (void*)usr_ptr;
-    return PimCreateBo(desc, mem, mflag, user, transposed);
+    PimBo* bo = PimCreateBo(desc, mem, mflag, user, transposed);
+    PimTrackBo(bo);
+    return bo;
 }
 
 PimBo* PyWrapperPimCreateBoGemmDesc(PimGemmDesc* desc, PimMemType mem, PimMemFlag mflag, uintptr_t usr_ptr, bool transposed)
 {
     void* user = (usr_ptr == 0) ? nullptr : (void*)usr_ptr;
-    return PimCreateBo(desc, mem, mflag, user, transposed);
+    PimBo* bo = PimCreateBo(desc, mem, mflag, user, transposed);
+    PimTrackBo(bo);
+    return bo;
+}
+
+int PyWrapperPimDestroyBo(PimBo* bo)
+{
+    PimUntrackBo(bo);
+    return PimDestroyBo(bo);
+}
+
+PimBo* PyWrapperPimConvertGemmWeight(PimBo* src, PimGemmOrder gemm_order, bool reorder_on_device, void* stream,
+                                     bool save_for_reuse)
+{
+    PimBo* bo = PimConvertGemmWeight(src, gemm_order, reorder_on_device, stream, save_for_reuse);
+    PimTrackBo(bo);
+    return bo;
+}
+
+int PyWrapperPimDeinitialize()
+{
+    PimReportAndClearBoLeaks();
+    return PimDeinitialize();
 }
 
 int PyWrapperPimAllocMemory(uintptr_t usr_ptr, size_t size, PimMemType mem)
@@ -117,20 +149,30 @@ PYBIND11_MODULE(pim_api, api_interface)
         .def_readwrite("w", &PimBShape::w);
 
     py::class_<PimBo>(api_interface, "PimBo", py::buffer_protocol()).def_buffer([](PimBo& bo) -> py::buffer_info {
-        py::capsule FreePimBo(bo.data, [](void* py_usr_ptr) {});
+        int64_t shape[4], strides[4];
+        PimBoLayout(&bo, shape, strides);
+        bool is_int8 = bo.precision == PIM_INT8;
+        ssize_t itemsize = is_int8 ? sizeof(int8_t) : sizeof(half_float::half);
         return py::buffer_info(
-            bo.data,                                                              /* Pointer to buffer */
-            sizeof(half_float::half),                                             /* Size of one scalar */
-            "e",                                                                  /* Python struct-style format descriptor */
-            4,                                                                    /* Number of dimensions */
-            { bo.bshape.n, bo.bshape.c, bo.bshape.h, bo.bshape.w },               /* Buffer dimensions */
-            {
-              sizeof(half_float::half) * bo.bshape.c * bo.bshape.h * bo.bshape.w, /* Strides (in bytes) for each index */
-              sizeof(half_float::half) * bo.bshape.h * bo.bshape.w,
-              sizeof(half_float::half) * bo.bshape.w,
-              sizeof(half_float::half)
-            });
-    });
+            bo.data,                                                  /* Pointer to buffer */
+            itemsize,                                                 /* Size of one scalar */
+            is_int8 ? "b" : "e",                                      /* Python struct-style format descriptor */
+            4,                                                        /* Number of dimensions */
+            { shape[0], shape[1], shape[2], shape[3] },               /* Buffer dimensions */
+            { itemsize * strides[0], itemsize * strides[1],           /* Strides (in bytes) for each index */
+              itemsize * strides[2], itemsize * strides[3] });
+    })
+        .def_readonly("mem_type", &PimBo::mem_type)
+        .def_readonly("bshape", &PimBo::bshape)
+        .def_readonly("precision", &PimBo::precision)
+        .def_readonly("mem_flag", &PimBo::mem_flag)
+        .def_readonly("size", &PimBo::size)
+        .def_readonly("use_user_ptr", &PimBo::use_user_ptr)
+        .def_readonly("transposed", &PimBo::transposed)
+        .def_property_readonly("data_ptr", [](PimBo& bo) { return reinterpret_cast<uintptr_t>(bo.data); })
+        .def("__dlpack__", [](py::object self, py::object stream) { return PimBoToDLPack(self.cast<PimBo*>(), self); },
+             "Export a host or device bo as a DLPack capsule", py::arg("stream") = py::none())
+        .def("__dlpack_device__", &PimBoDLPackDevice);
 
     py::class_<PimDesc>(api_interface, "PimDesc")
         .def(py::init<>())
@@ -154,7 +196,8 @@ PYBIND11_MODULE(pim_api, api_interface)
 
     api_interface.def("PimInitialize", &PimInitialize, "For initialization of pim data",
                       py::arg("rt_type") = RT_TYPE_HIP, py::arg("PimPrecision") = PIM_FP16);
-    api_interface.def("PimDeinitialize", &PimDeinitialize, "For de initialization of pim data");
+    api_interface.def("PimDeinitialize", &PyWrapperPimDeinitialize,
+                      "For de initialization of pim data, reports PimBo's which were not destroyed");
     api_interface.def("PimCreateBo", &PyWrapperPimCreateBoNCHW,
 		      py::return_value_policy::reference, "For Creating PimBo memory object using nchw values" ,
           py::arg("n"), py::arg("c"), py::arg("h"), py::arg("w"), py::arg("prec"), py::arg("mem"), py::arg("usr_ptr")=0, py::arg("transposed") = false);
@@ -164,7 +207,7 @@ PYBIND11_MODULE(pim_api, api_interface)
     api_interface.def("PimCreateBo", &PyWrapperPimCreateBoGemmDesc,
                       py::return_value_policy::reference, "For Creating PimBo memory object", py::arg("desc"),
                       py::arg("mem"), py::arg("mflag"), py::arg("usr_ptr") = 0, py::arg("transposed") = false);
-    api_interface.def("PimDestroyBo", static_cast<int (*)(PimBo*)>(&PimDestroyBo));
+    api_interface.def("PimDestroyBo", &PyWrapperPimDestroyBo);
     api_interface.def("PimCreateDesc", &PimCreateDesc, py::return_value_policy::reference);
     api_interface.def("PimCreateGemmDesc", &PimCreateGemmDesc, py::return_value_policy::reference);
     api_interface.def("PimDestroyDesc", &PimDestroyDesc);
@@ -180,15 +223,117 @@ PYBIND11_MODULE(pim_api, api_interface)
     api_interface.def("PimExecuteMul", static_cast<int (*)(PimBo*, PimBo*, PimBo*, void*, bool)>(&PimExecuteMul));
     api_interface.def("PimExecuteMul", static_cast<int (*)(PimBo*, void*, PimBo*, void*, bool)>(&PimExecuteMul));
     api_interface.def("PimExecuteRelu", static_cast<int (*)(PimBo*, PimBo*, void*, bool)>(&PimExecuteRelu));
+    api_interface.def("PimExecuteBN", &PimExecuteBN);
     api_interface.def("PimExecuteGemm",
 		      static_cast<int (*)(PimBo*, PimBo*, PimBo*, PimBo*, PimActFunc, PimGemmOrder, void*, bool)>(&PimExecuteGemm));
-    api_interface.def("PimConvertGemmWeight",
-		      static_cast<PimBo* (*)(PimBo*, PimGemmOrder, bool, void*, bool)>(&PimConvertGemmWeight));
+    api_interface.def("PimConvertGemmWeight", &PyWrapperPimConvertGemmWeight, py::return_value_policy::reference);
     api_interface.def("PimSetDevice", static_cast<int (*)(unsigned int)>(&PimSetDevice));
     api_interface.def("PimGetDevice", [](py::array_t<unsigned int> buffer){
                       py::buffer_info info = buffer.request();
                       PimGetDevice(static_cast<unsigned int *>(info.ptr));});
-    api_interface.def("PimSynchronize", &PimSynchronize);
+    api_interface.def("PimSynchronize", &PimSynchronize, py::call_guard<py::gil_scoped_release>());
     api_interface.def("PimExecuteDummy", &PimExecuteDummy);
     api_interface.def("PimCreateStream", static_cast<void* (*)(PimRuntimeType)>(&PimCreateStream));
+
+    api_interface.def("PimSetBoTracking", &PimSetBoTracking, "Enable or disable PimBo allocation tracking",
+                      py::arg("enable"));
+    api_interface.def("PimGetBoTracking", &PimGetBoTracking);
+    api_interface.def("PimGetBoStats", &PimGetBoStats,
+                      "Live and peak bytes per PimMemType, allocation counts and allocation rate");
+    api_interface.def("PimGetBoLeakReport", &PimGetBoLeakReport,
+                      "List of live PimBo's with memory type, precision, size and creating call site");
+    api_interface.def("PimResetBoStats", &PimResetBoStats, "Reset peak usage and allocation counters");
+
+    api_interface.def("dense_forward", &PimDenseForward, py::call_guard<py::gil_scoped_release>(),
+                      "Create descriptor and bo's, execute gemm and clean up in one call", py::arg("out_ptr"),
+                      py::arg("in_ptr"), py::arg("w_ptr"), py::arg("bias_ptr"), py::arg("n"), py::arg("c"), py::arg("h"),
+                      py::arg("in_w"), py::arg("out_w"), py::arg("act") = NONE, py::arg("gemm_order") = I_X_W,
+                      py::arg("transposed") = false, py::arg("stream") = 0, py::arg("block") = true);
+    api_interface.def("eltwise_forward", &PimEltwiseForward, py::call_guard<py::gil_scoped_release>(),
+                      "Copy device inputs to PIM, execute add or mul and copy the result back in one call",
+                      py::arg("out_ptr"), py::arg("in1_ptr"), py::arg("in2_ptr"), py::arg("length"), py::arg("op"),
+                      py::arg("stream") = 0, py::arg("block") = true);
+    api_interface.def("relu_forward", &PimReluForward, py::call_guard<py::gil_scoped_release>(),
+                      "Copy device input to PIM, execute relu and copy the result back in one call", py::arg("out_ptr"),
+                      py::arg("in_ptr"), py::arg("length"), py::arg("stream") = 0, py::arg("block") = true);
+    api_interface.def("batchnorm_forward", &PimBatchNormForward, py::call_guard<py::gil_scoped_release>(),
+                      "Copy device input to PIM, execute batch norm and copy the result back in one call",
+                      py::arg("out_ptr"), py::arg("in_ptr"), py::arg("n"), py::arg("c"), py::arg("h"), py::arg("w"),
+                      py::arg("beta_ptr"), py::arg("gamma_ptr"), py::arg("mean_ptr"), py::arg("var_ptr"),
+                      py::arg("epsilon"), py::arg("stream") = 0, py::arg("block") = true);
+    api_interface.def("copy_memory", &PimCopyForward, py::call_guard<py::gil_scoped_release>(),
+                      "Copy nbytes between raw addresses, e.g. host to device, without the GIL", py::arg("dst_ptr"),
+                      py::arg("src_ptr"), py::arg("nbytes"), py::arg("type"));
+
+    py::class_<PimCommandList>(api_interface, "PimCommandList")
+        .def(py::init<>())
+        .def("add_slot", &PimCommandList::AddSlot, "Register a patchable device address range, returns its index",
+             py::arg("base"), py::arg("nbytes"))
+        .def("dense", &PimCommandList::RecordDense, py::call_guard<py::gil_scoped_release>(),
+             "Record and execute a gemm, arguments as dense_forward", py::arg("out_ptr"), py::arg("in_ptr"),
+             py::arg("w_ptr"), py::arg("bias_ptr"), py::arg("n"), py::arg("c"), py::arg("h"), py::arg("in_w"),
+             py::arg("out_w"), py::arg("act") = NONE, py::arg("gemm_order") = I_X_W, py::arg("transposed") = false,
+             py::arg("stream") = 0, py::arg("block") = true)
+        .def("eltwise", &PimCommandList::RecordEltwise, py::call_guard<py::gil_scoped_release>(),
+             "Record and execute an add or mul, arguments as eltwise_forward", py::arg("out_ptr"), py::arg("in1_ptr"),
+             py::arg("in2_ptr"), py::arg("length"), py::arg("op"), py::arg("stream") = 0, py::arg("block") = true)
+        .def("relu", &PimCommandList::RecordRelu, py::call_guard<py::gil_scoped_release>(),
+             "Record and execute a relu, arguments as relu_forward", py::arg("out_ptr"), py::arg("in_ptr"),
+             py::arg("length"), py::arg("stream") = 0, py::arg("block") = true)
+        .def(
+            "replay",
+            [](PimCommandList& list, py::sequence bases) {
+                std::vector<uintptr_t> addrs;
+                for (auto base : bases) addrs.push_back(base.cast<uintptr_t>());
+                py::gil_scoped_release release;
+                list.Replay(addrs);
+            },
+            "Re-issue all recorded commands with slot i moved to bases[i]", py::arg("bases"))
+        .def("__len__", &PimCommandList::NumCommands)
+        .def_property_readonly("num_slots", &PimCommandList::NumSlots)
+        .def_property_readonly("num_patches", &PimCommandList::NumPatches);
+
+    py::class_<PimGemvWeight>(api_interface, "PimGemvWeight")
+        .def(py::init<uintptr_t, int, int, bool, PimGemmOrder>(), py::call_guard<py::gil_scoped_release>(),
+             "Convert a (in_w, out_w) fp16 device weight once for single row gemms", py::arg("w_ptr"), py::arg("in_w"),
+             py::arg("out_w"), py::arg("transposed") = false, py::arg("gemm_order") = I_X_W)
+        .def("forward", &PimGemvWeight::Forward, py::call_guard<py::gil_scoped_release>(),
+             "out = act(in x weight + bias) for one in_w row, a zero bias_ptr skips the bias", py::arg("out_ptr"),
+             py::arg("in_ptr"), py::arg("bias_ptr"), py::arg("act") = NONE, py::arg("stream") = 0,
+             py::arg("block") = true)
+        .def_property_readonly("in_w", &PimGemvWeight::InW)
+        .def_property_readonly("out_w", &PimGemvWeight::OutW);
+
+    api_interface.def("convert_fp32_to_fp16", &PimConvertFp32ToFp16, py::call_guard<py::gil_scoped_release>(),
+                      "Convert count fp32 values to fp16 on all cores, threads 0 uses every hardware thread",
+                      py::arg("dst_ptr"), py::arg("src_ptr"), py::arg("count"), py::arg("threads") = 0);
+    api_interface.def("abs_max_fp32", &PimAbsMaxFp32, py::call_guard<py::gil_scoped_release>(),
+                      "Largest absolute value of count fp32 values", py::arg("src_ptr"), py::arg("count"),
+                      py::arg("threads") = 0);
+    api_interface.def("convert_fp32_to_int8", &PimConvertFp32ToInt8, py::call_guard<py::gil_scoped_release>(),
+                      "Quantize count fp32 values to int8 as round(src / scale), saturated", py::arg("dst_ptr"),
+                      py::arg("src_ptr"), py::arg("count"), py::arg("scale"), py::arg("threads") = 0);
+    api_interface.def("transpose", &PimTranspose, py::call_guard<py::gil_scoped_release>(),
+                      "Transpose batch (rows, cols) matrices of elem_size byte elements", py::arg("dst_ptr"),
+                      py::arg("src_ptr"), py::arg("batch"), py::arg("rows"), py::arg("cols"), py::arg("elem_size"),
+                      py::arg("threads") = 0);
+    api_interface.def(
+        "packed_weight_shape",
+        [](int n, int c, int in_w, int out_w, PimGemmOrder gemm_order) {
+            std::vector<uint32_t> shape = PimPackedWeightShape(n, c, in_w, out_w, gemm_order);
+            return py::make_tuple(shape[0], shape[1], shape[2], shape[3]);
+        },
+        "(n, c, h, w) of the zero padded fp16 GEMM_WEIGHT buffer of a gemm", py::arg("n"), py::arg("c"),
+        py::arg("in_w"), py::arg("out_w"), py::arg("gemm_order") = I_X_W);
+    api_interface.def("pack_gemm_weight", &PimPackGemmWeight, py::call_guard<py::gil_scoped_release>(),
+                      "Write a fp32 or fp16 weight as zero padded fp16 GEMM_WEIGHT data into dst on all cores",
+                      py::arg("dst_ptr"), py::arg("src_ptr"), py::arg("src_fp32"), py::arg("n"), py::arg("c"),
+                      py::arg("in_w"), py::arg("out_w"), py::arg("transposed") = false,
+                      py::arg("gemm_order") = I_X_W, py::arg("threads") = 0);
+
+    api_interface.def("PimBoToDLPack", &PimBoToDLPack,
+                      "Export a host or device bo as a DLPack capsule which keeps owner alive", py::arg("bo"),
+                      py::arg("owner"));
+    api_interface.def("PimDLPackInfo", &PimDLPackInfo,
+                      "Data pointer, shape, strides, dtype and device of a DLPack capsule", py::arg("capsule"));
 }